@@ -187,7 +187,9 @@ def process(args):
     repo_push_url = abdi_repoargs.get_repo_push_url(repo_params)
 
     with fs.lockfile_context():
-        with abdi_repo.setup_repo_context(repo_url, repo_path, repo_push_url):
+        object_pool = abdi_repo.get_object_pool(repo_params)
+        with abdi_repo.setup_repo_context(
+                repo_url, repo_path, repo_push_url, object_pool):
             fs.create_repo_config(repo_name, config)
 
 
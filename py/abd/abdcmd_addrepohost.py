@@ -41,6 +41,11 @@ _CONFIG_BRANCH_URL_FORMAT = """
 {branch_url_format}
 """.strip()
 
+_CONFIG_OBJECT_POOL_FORMAT = """
+--object-pool
+{object_pool}
+""".strip()
+
 _CONFIG_ADMIN_EMAILS_FORMAT = """
 --admin-emails
 {admin_emails}
@@ -101,6 +106,13 @@ def process(args):
             _CONFIG_BRANCH_URL_FORMAT.format(
                 branch_url_format=args.branch_url_format)])
 
+    if args.object_pool:
+        abdt_fs.raise_if_config_name_not_valid(args.object_pool)
+        config = '\n'.join([
+            config,
+            _CONFIG_OBJECT_POOL_FORMAT.format(
+                object_pool=args.object_pool)])
+
     if args.admin_emails:
         config = '\n'.join([
             config,
@@ -20,6 +20,10 @@ minimal user workflow:
     .. Reviewer accepts the change ..
     .. Arcyd squashes the 'arcyd-review' branch onto master and deletes it ..
 
+Arcyd lands revisions without touching the working tree of its clones if git
+2.38 or later is installed. Older versions of git are supported, Arcyd checks
+out the base branch and uses 'git merge --squash' instead.
+
 """
 # =============================================================================
 # CONTENTS
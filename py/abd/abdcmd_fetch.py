@@ -95,7 +95,9 @@ def process(args):
                     url_watcher_wrapper.watcher,
                     snoop_url,
                     abd_repo,
-                    repo_config.repo_desc)
+                    repo_config.repo_desc,
+                    abdi_processrepoarglist.make_fetch_object_pool(
+                        repo_config))
 
                 if did_fetch:
                     print('fetched')
@@ -20,6 +20,7 @@ from __future__ import print_function
 import os
 
 import phlgitx_ignoreattributes
+import phlgitx_objectpool
 import phlsys_git
 import phlsys_pid
 import phlsys_subprocess
@@ -140,6 +141,8 @@ def _check_repo_name_config_list(args, repo_name_config_list):
         if not _check_repo_cloned(args, repo_name, repo_config):
             all_ok = False
         else:
+            if not _check_repo_object_pool(args, repo_name, repo_config):
+                all_ok = False
             if not _check_repo_ignoring_attributes(args, repo_config):
                 all_ok = False
             if args.remote:
@@ -168,10 +171,14 @@ def _check_repo_cloned(args, repo_name, repo_config):
         if args.fix:
             repo_url = abdi_repoargs.get_repo_url(repo_config)
             repo_push_url = abdi_repoargs.get_repo_push_url(repo_config)
+            object_pool = abdi_repo.get_object_pool(repo_config)
             print("cloning '{}' ..".format(repo_url))
             try:
                 abdi_repo.setup_repo(
-                    repo_url, repo_config.repo_path, repo_push_url)
+                    repo_url,
+                    repo_config.repo_path,
+                    repo_push_url,
+                    object_pool)
             except phlsys_subprocess.CalledProcessError as e:
                 all_ok = False
                 _print_indented(4, e.stdout)
@@ -183,6 +190,68 @@ def _check_repo_cloned(args, repo_name, repo_config):
     return all_ok
 
 
+def _check_repo_object_pool(args, repo_name, repo_config):
+    """Return False if the supplied repo isn't borrowing objects as expected.
+
+    Will print details of errors found. Will continue when errors are found,
+    unless they interfere with the operation of fsck.
+
+    :args: argeparse arguments to arcyd fsck
+    :repo_name: string name of the repository
+    :repo_config: argparse namespace of the repo's config
+    :returns: True or False
+
+    """
+    all_ok = True
+    repo_path = repo_config.repo_path
+    repo_url = abdi_repoargs.get_repo_url(repo_config)
+    object_pool = abdi_repo.get_object_pool(repo_config)
+
+    broken = phlgitx_objectpool.get_broken_alternates(repo_path)
+    is_unlinked = object_pool is not None and not object_pool.is_linked(
+        repo_path)
+
+    if broken:
+        print("'{}' is borrowing objects from missing '{}'".format(
+            repo_name, "', '".join(broken)))
+    elif is_unlinked:
+        print("'{}' is not borrowing objects from pool '{}'".format(
+            repo_name, repo_config.object_pool))
+    else:
+        return all_ok
+
+    if not args.fix:
+        return False
+
+    if object_pool is None:
+        # without a pool we can't get the missing objects back, the repo
+        # needs to be cloned again
+        print("remove '{}' and use '--fix' again to clone it".format(
+            repo_path))
+        return False
+
+    print("linking '{}' to pool '{}' ..".format(
+        repo_name, repo_config.object_pool))
+    try:
+        abdi_repo.fetch_object_pool(object_pool, repo_url, repo_path)
+        object_pool.link(repo_path)
+
+        repo = phlsys_git.Repo(repo_path)
+        if broken:
+            # make sure that the pool has all the objects that were missing
+            repo('fsck', '--connectivity-only', '--no-dangling')
+        else:
+            # remove the objects that we can now borrow from the pool
+            object_pool.repack(repo_path)
+    except phlsys_subprocess.CalledProcessError as e:
+        all_ok = False
+        _print_indented(4, e.stdout)
+        _print_indented(4, e.stderr)
+        print()
+
+    return all_ok
+
+
 def _check_repo_ignoring_attributes(args, repo_config):
     """Return False if the supplied repo isn't ignoring attributes config.
 
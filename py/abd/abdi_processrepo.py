@@ -320,6 +320,13 @@ def process_abandoned_branch(conduit, branch):
 
 
 def process_branches(branches, conduit, mailer):
+
+    # get the states of all the reviews up-front in a few bulk queries,
+    # rather than one query for each review as they're needed
+    review_id_set = set(b.review_id_or_none() for b in branches)
+    review_id_set.discard(None)
+    conduit.prefetch_review_states(review_id_set)
+
     for branch in branches:
         if branch.is_abandoned():
             process_abandoned_branch(conduit, branch)
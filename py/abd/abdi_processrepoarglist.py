@@ -8,6 +8,7 @@
 #   do
 #   determine_max_workers_default
 #   fetch_if_needed
+#   make_fetch_object_pool
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -21,14 +22,17 @@ import json
 import logging
 import multiprocessing
 import os
+import threading
 import time
 
 import phlcon_reviewstatecache
 import phlgitx_refcache
 import phlmp_cyclingpool
 import phlsys_conduit
+import phlsys_diskcache
 import phlsys_fs
 import phlsys_git
+import phlsys_metrics
 import phlsys_strtotime
 import phlsys_subprocess
 import phlsys_timer
@@ -49,11 +53,15 @@ import abdt_tryloop
 
 import abdi_processexitcodes
 import abdi_processrepo
+import abdi_repo
 import abdi_repoargs
+import abdi_reposcheduler
 
 
 _LOGGER = logging.getLogger(__name__)
 
+_CYCLE_SECONDS_METRIC = 'arcyd_cycle_seconds'
+
 
 def do(
         repo_configs,
@@ -63,13 +71,40 @@ def do(
         external_report_command,
         mail_sender,
         max_workers,
-        overrun_secs):
-
-    conduit_manager = _ConduitManager()
+        overrun_secs,
+        persistent_workers=False,
+        worker_max_jobs=None,
+        worker_max_rss_mb=None,
+        idle_repo_sweep_secs=0,
+        snoop_connections_per_host=1,
+        snoop_timeout_secs=None,
+        diff_cache_max_mb=0,
+        metrics_port=None,
+        conduit_manager=None):
+
+    # a stand-in for the connections to Phabricator may be supplied, e.g. to
+    # benchmark arcyd offline, it must be usable from a single process only
+    if conduit_manager is None:
+        conduit_manager = _ConduitManager()
 
     fs_accessor = abdt_fs.make_default_accessor()
+
+    # the metrics of all the repos are gathered here, they are written to a
+    # file each cycle and may also be served over http
+    metrics = abdt_logging.get_metrics()
+    if metrics_port is not None:
+        phlsys_metrics.start_http_server(metrics, metrics_port)
+
+    # the stored diffs are keyed by commit, so all the repos can share them
+    diff_store = None
+    if diff_cache_max_mb:
+        diff_store = phlsys_diskcache.DiskCache(
+            fs_accessor.layout.diff_cache_dir,
+            diff_cache_max_mb * 1024 * 1024)
     url_watcher_wrapper = phlurl_watcher.FileCacheWatcherWrapper(
-        fs_accessor.layout.urlwatcher_cache_path)
+        fs_accessor.layout.urlwatcher_cache_path,
+        max_connections_per_host=snoop_connections_per_host,
+        timeout=snoop_timeout_secs)
 
     # decide max workers based on number of CPUs if no value is specified
     if max_workers == 0:
@@ -84,15 +119,41 @@ def do(
                 conduit_manager,
                 url_watcher_wrapper,
                 sys_admin_emails,
-                mail_sender))
+                mail_sender,
+                diff_store))
 
     # if we always overrun half our workers then the loop is sustainable, if we
     # overrun more than that then we'll be lagging too far behind. In the event
     # that we only have one worker then we can't overrun any.
     max_overrun_workers = max_workers // 2
 
-    pool = phlmp_cyclingpool.CyclingPool(
-        repo_list, max_workers, max_overrun_workers)
+    if persistent_workers:
+        pool = phlmp_cyclingpool.PersistentCyclingPool(
+            repo_list,
+            max_workers,
+            max_overrun_workers,
+            max_jobs_per_worker=worker_max_jobs,
+            max_worker_rss_mb=worker_max_rss_mb)
+    else:
+        pool = phlmp_cyclingpool.CyclingPool(
+            repo_list, max_workers, max_overrun_workers)
+
+    # if we're sweeping idle repos then only process repos when they have
+    # work to do, otherwise process every repo every cycle
+    scheduler = None
+    sweep_delta = datetime.timedelta(seconds=idle_repo_sweep_secs)
+    if idle_repo_sweep_secs:
+        scheduler = abdi_reposcheduler.RepoScheduler(
+            len(repo_list), datetime.datetime.utcnow())
+
+    def reschedule(index):
+        if scheduler is not None:
+            repo = repo_list[index]
+            due_time = repo.calc_next_due_time(sweep_delta)
+            if due_time is None:
+                scheduler.set_never_due(index)
+            else:
+                scheduler.set_due(index, due_time)
 
     cycle_timer = phlsys_timer.Timer()
     cycle_timer.start()
@@ -108,24 +169,56 @@ def do(
         # refresh git snoops
         with abdt_logging.remote_io_read_event_context(
                 'refresh-git-snoop', ''):
-            abdt_tryloop.critical_tryloop(
+            failed_urls = abdt_tryloop.critical_tryloop(
                 url_watcher_wrapper.watcher.refresh,
                 abdt_errident.GIT_SNOOP,
                 '')
 
+        # the repos for these urls will be fetched as if the urls changed, so
+        # the problem will be reported against the repos if it persists
+        for url, error in failed_urls:
+            _LOGGER.warning(
+                "failed to refresh git snoop url: {}, {}".format(url, error))
+
+        # repos which aren't processed this cycle won't mark their reviews as
+        # active, make sure that they are refreshed anyway
+        if scheduler is not None:
+            for repo in repo_list:
+                repo.keep_reviews_active()
+
         with abdt_logging.remote_io_read_event_context('refresh-conduit', ''):
             conduit_manager.refresh_conduits()
 
+        job_index_set = None
+        if scheduler is not None:
+            now = datetime.datetime.utcnow()
+            for i, repo in enumerate(repo_list):
+                due_time = scheduler.next_due_time(i)
+                if due_time is not None and due_time <= now:
+                    continue
+                if repo.has_pending_work():
+                    scheduler.set_due(i, now)
+            job_index_set = scheduler.get_due(now)
+            num_scheduled_repos = len(job_index_set)
+        else:
+            num_scheduled_repos = len(repo_list)
+
         with abdt_logging.misc_operation_event_context(
                 'process-repos',
-                '{} workers, {} repos'.format(max_workers, len(repo_list))):
+                '{} workers, {} repos, {} scheduled'.format(
+                    max_workers, len(repo_list), num_scheduled_repos)):
             if max_workers > 1:
-                for i, res in pool.cycle_results(overrun_secs=overrun_secs):
+                for i, res in pool.cycle_results(
+                        overrun_secs=overrun_secs,
+                        job_index_set=job_index_set):
                     repo = repo_list[i]
                     repo.merge_from_worker(res)
+                    reschedule(i)
             else:
-                for r in repo_list:
-                    r()
+                for i, r in enumerate(repo_list):
+                    if job_index_set is None or i in job_index_set:
+                        r()
+                        reschedule(i)
 
         # important to do this before stopping arcyd and as soon as possible
         # after doing fetches
@@ -135,8 +228,24 @@ def do(
         report = {
             "cycle_time_secs": cycle_timer.restart(),
             "overrun_jobs": pool.num_active_jobs,
+            "scheduled_repos": num_scheduled_repos,
+            "process_stats": _make_process_stats_report(
+                phlsys_subprocess.get_process_stats()),
         }
+        phlsys_subprocess.reset_process_stats()
         _LOGGER.debug("cycle-stats: {}".format(report))
+        metrics.observe(
+            _CYCLE_SECONDS_METRIC, {}, report["cycle_time_secs"])
+        phlsys_fs.write_text_file_atomic(
+            fs_accessor.layout.metrics,
+            json.dumps(metrics.to_summary(), sort_keys=True, indent=1))
+
+        # these include the calls made by the workers, see 'merge_from_worker'
+        conduit_stats = phlsys_conduit.get_call_stats()
+        for method, stats in sorted(conduit_stats.iteritems()):
+            _LOGGER.debug("conduit-stats: {}: {}".format(
+                method, dict(stats._asdict())))
+        phlsys_conduit.reset_call_stats()
         if external_report_command:
             report_json = json.dumps(report)
             full_path = os.path.abspath(external_report_command)
@@ -178,6 +287,7 @@ def do(
     for i, res in pool.finish_results():
         repo = repo_list[i]
         repo.merge_from_worker(res)
+        reschedule(i)
 
     # important to do this before stopping arcyd and as soon as
     # possible after doing fetches
@@ -274,13 +384,15 @@ class _ArcydManagedRepository(object):
             conduit_manager,
             url_watcher_wrapper,
             sys_admin_emails,
-            mail_sender):
+            mail_sender,
+            diff_store=None):
 
         self._active_state = _RepoActiveRetryState(
             retry_timestr_list=["10 seconds", "10 minutes", "1 hours"])
-        sys_repo = phlsys_git.Repo(repo_args.repo_path)
-        self._refcache_repo = phlgitx_refcache.Repo(sys_repo)
-        self._differ_cache = abdt_differresultcache.Cache(self._refcache_repo)
+        self._sys_repo = phlsys_git.Repo(repo_args.repo_path)
+        self._refcache_repo = phlgitx_refcache.Repo(self._sys_repo)
+        self._differ_cache = abdt_differresultcache.Cache(
+            self._refcache_repo, diff_store)
         self._abd_repo = abdt_git.Repo(
             self._refcache_repo,
             self._differ_cache,
@@ -300,10 +412,47 @@ class _ArcydManagedRepository(object):
         self._on_exception = abdt_exhandlers.make_exception_delay_handler(
             sys_admin_emails, repo_name)
 
+        # the reviews that were touched during the last run, and the states
+        # they were in, so that we can tell if the repo has work to do
+        self._review_ids = set()
+        self._last_review_states = {}
+
     def __call__(self):
         watcher = _RecordingWatcherWrapper(
             self._url_watcher_wrapper.watcher)
 
+        # the stats of the worker process may include earlier jobs, so only
+        # pass back the difference made by this one
+        process_stats = phlsys_subprocess.get_process_stats()
+
+        # jobs are run in worker processes, which may have inherited conduit
+        # stats from the parent or kept those of earlier jobs. we can't
+        # subtract the 'max_secs' of the old stats, so forget them instead.
+        phlsys_conduit.reset_call_stats()
+
+        with abdt_logging.repo_metrics_context(self._name) as metrics:
+            try:
+                self._process(watcher)
+            finally:
+                # don't keep a 'git cat-file' process and its pipes alive for
+                # every repo between jobs, there may be hundreds of repos
+                self._sys_repo.close_object_readers()
+        process_stats = _subtract_process_stats(
+            phlsys_subprocess.get_process_stats(), process_stats)
+
+        return (
+            self._review_ids,
+            self._arcyd_conduit.get_known_authors(self._review_ids),
+            self._active_state,
+            watcher.get_data_for_merging(),
+            self._refcache_repo.peek_hash_ref_pairs(),
+            self._differ_cache.get_cache(),
+            metrics.get_data_for_merging(),
+            process_stats,
+            phlsys_conduit.get_call_stats(),
+        )
+
+    def _process(self, watcher):
         old_active_reviews = set(self._review_cache.active_reviews)
 
         was_active = self._active_state.is_active
@@ -328,37 +477,128 @@ class _ArcydManagedRepository(object):
                 self._on_exception(retry_delay)
             else:
                 self._active_state.reset_retries()
+
+            self._review_ids = (
+                self._review_cache.active_reviews - old_active_reviews)
         else:
             _LOGGER.debug(
                 'repo-status: {} is inactive until {}'.format(
                     self._name, self._active_state.reactivate_time))
 
-        return (
-            self._review_cache.active_reviews - old_active_reviews,
-            self._active_state,
-            watcher.get_data_for_merging(),
-            self._refcache_repo.peek_hash_ref_pairs(),
-            self._differ_cache.get_cache()
-        )
-
     def merge_from_worker(self, results):
 
         (
             active_reviews,
+            review_authors,
             active_state,
             watcher_data,
             hash_ref_pairs,
-            differ_cache
+            differ_cache,
+            metrics_data,
+            process_stats,
+            conduit_stats,
         ) = results
 
         self._review_cache.merge_additional_active_reviews(active_reviews)
+        self._arcyd_conduit.merge_known_authors(review_authors)
         self._active_state = active_state
         self._refcache_repo.set_hash_ref_pairs(hash_ref_pairs)
         self._differ_cache.set_cache(differ_cache)
+        abdt_logging.get_metrics().merge_data(metrics_data)
+        phlsys_subprocess.merge_process_stats(process_stats)
+        phlsys_conduit.merge_call_stats(conduit_stats)
 
         # merge in the consumed urls from the worker
         self._url_watcher_wrapper.watcher.merge_data_consume_only(watcher_data)
 
+        self._review_ids = set(active_reviews)
+
+    def keep_reviews_active(self):
+        """Make sure the reviews of this repo are refreshed with the cache."""
+        self._review_cache.merge_additional_active_reviews(self._review_ids)
+
+    def has_pending_work(self):
+        """Return True if this repo may have work to do since the last run.
+
+        That is when the snoop url has changed or the state of one of the
+        reviews has changed. Repos without a snoop url always have work to do.
+
+        Inactive repos never have pending work, they will be processed when
+        they are due to be retried, see 'calc_next_due_time'.
+
+        """
+        if not self._active_state.is_active:
+            return False
+
+        snoop_url = abdi_repoargs.get_repo_snoop_url(self._args)
+        if not snoop_url:
+            return True
+
+        watcher = self._url_watcher_wrapper.watcher
+        if watcher.peek_has_url_recently_changed(snoop_url):
+            return True
+
+        review_states = self._review_cache.get_known_states(self._review_ids)
+        return review_states != self._last_review_states
+
+    def calc_next_due_time(self, sweep_delta):
+        """Return the datetime this repo should next be processed, or None.
+
+        Also note the current state of the repo's reviews, so that we can
+        tell in 'has_pending_work' if they have changed.
+
+        :sweep_delta: the timedelta after which to process an idle repo
+        :returns: a datetime.datetime or None
+
+        """
+        self._last_review_states = self._review_cache.get_known_states(
+            self._review_ids)
+
+        if not self._active_state.is_active:
+            return self._active_state.reactivate_time
+
+        return datetime.datetime.utcnow() + sweep_delta
+
+    def get_data_for_worker(self, is_worker_current):
+
+        watcher_data = {}
+        snoop_url = abdi_repoargs.get_repo_snoop_url(self._args)
+        if snoop_url:
+            watcher = self._url_watcher_wrapper.watcher
+            all_watcher_data = watcher.get_data_for_merging()
+            if snoop_url in all_watcher_data:
+                watcher_data[snoop_url] = all_watcher_data[snoop_url]
+
+        review_states = self._review_cache.get_known_states(self._review_ids)
+        review_authors = self._arcyd_conduit.get_known_authors(
+            self._review_ids)
+
+        # only send our copy of the repo state if the worker's copy is stale,
+        # this is the state that the worker would otherwise keep warm
+        repo_state = None
+        if not is_worker_current:
+            repo_state = (
+                self._active_state,
+                self._refcache_repo.peek_hash_ref_pairs(),
+                self._differ_cache.get_cache()
+            )
+
+        return watcher_data, review_states, review_authors, repo_state
+
+    def merge_from_parent(self, data):
+
+        watcher_data, review_states, review_authors, repo_state = data
+
+        self._url_watcher_wrapper.watcher.merge_data_overwrite(watcher_data)
+        self._review_cache.reset_known_states(review_states)
+        self._arcyd_conduit.merge_known_authors(review_authors)
+
+        if repo_state is not None:
+            active_state, hash_ref_pairs, differ_cache = repo_state
+            self._active_state = active_state
+            self._refcache_repo.set_hash_ref_pairs(hash_ref_pairs)
+            self._differ_cache.set_cache(differ_cache)
+
 
 class _ConduitManager(object):
 
@@ -403,19 +643,45 @@ class _ConduitManager(object):
         return arcyd_conduit, cache
 
     def refresh_conduits(self):
-        for conduit, cache in self._conduits_caches.itervalues():
+
+        def refresh(conduit, cache):
             abdt_tryloop.critical_tryloop(
                 cache.refresh_active_reviews,
                 abdt_errident.CONDUIT_REFRESH,
                 conduit.describe())
 
+        conduits_caches = self._conduits_caches.values()
+        if len(conduits_caches) == 1:
+            refresh(*conduits_caches[0])
+            return
+
+        # refresh each instance in its own thread, so that the total time is
+        # that of the slowest instance rather than the sum of them all
+        thread_list = [
+            threading.Thread(target=refresh, args=conduit_cache)
+            for conduit_cache in conduits_caches
+        ]
+        for thread in thread_list:
+            thread.daemon = True
+            thread.start()
+        for thread in thread_list:
+            thread.join()
 
-def fetch_if_needed(url_watcher, snoop_url, repo, repo_desc):
+
+def fetch_if_needed(
+        url_watcher, snoop_url, repo, repo_desc, fetch_object_pool=None):
 
     did_fetch = False
 
     # fetch only if we need to
     if not snoop_url or url_watcher.peek_has_url_recently_changed(snoop_url):
+        # fetch into the shared pool first, so that the repo can borrow the
+        # new objects instead of downloading them again
+        if fetch_object_pool is not None:
+            abdt_tryloop.tryloop(
+                fetch_object_pool,
+                abdt_errident.FETCH_OBJECT_POOL,
+                repo_desc)
         abdt_tryloop.tryloop(
             repo.checkout_master_fetch_prune,
             abdt_errident.FETCH_PRUNE,
@@ -429,6 +695,26 @@ def fetch_if_needed(url_watcher, snoop_url, repo, repo_desc):
     return did_fetch
 
 
+def make_fetch_object_pool(repo_args):
+    """Return a callable to fetch the repo into its object pool, or None.
+
+    :repo_args: argparse namespace of the repo's config
+    :returns: a callable that takes no arguments, or None
+
+    """
+    object_pool = abdi_repo.get_object_pool(repo_args)
+    if object_pool is None:
+        return None
+
+    def fetch_object_pool():
+        abdi_repo.fetch_object_pool(
+            object_pool,
+            abdi_repoargs.get_repo_url(repo_args),
+            repo_args.repo_path)
+
+    return fetch_object_pool
+
+
 def _process_repo(
         repo,
         unused_repo_name,
@@ -441,7 +727,8 @@ def _process_repo(
         url_watcher,
         abdi_repoargs.get_repo_snoop_url(args),
         repo,
-        args.repo_desc)
+        args.repo_desc,
+        make_fetch_object_pool(args))
 
     admin_emails = set(_flatten_list(args.admin_emails))
 
@@ -470,7 +757,37 @@ def _process_repo(
         branch_naming,
         branch_url_callable)
 
-    abdi_processrepo.process_branches(branches, arcyd_conduit, mailer)
+    # push the changes to trackers and archives all at once, rather than
+    # talking to the remote for each of the branches
+    with repo.push_batch_context():
+        abdi_processrepo.process_branches(branches, arcyd_conduit, mailer)
+
+
+def _subtract_process_stats(key_to_stats, key_to_old_stats):
+    key_to_new_stats = {}
+    for key, stats in key_to_stats.iteritems():
+        old_stats = key_to_old_stats.get(key)
+        if old_stats is not None:
+            stats = phlsys_subprocess.ProcessStats(
+                *[a - b for a, b in zip(stats, old_stats)])
+        if stats.count:
+            key_to_new_stats[key] = stats
+    return key_to_new_stats
+
+
+def _make_process_stats_report(key_to_stats):
+    """Return a JSON-friendly list of the stats, the most costly first."""
+    report = []
+    for key, stats in key_to_stats.iteritems():
+        if isinstance(key, tuple) and len(key) == 2:
+            working_dir, command = key
+        else:
+            working_dir, command = '', str(key)
+        entry = {"working_dir": working_dir, "command": command}
+        entry.update(stats._asdict())
+        report.append(entry)
+    report.sort(key=lambda entry: entry["wall_secs"], reverse=True)
+    return report
 
 
 def _flatten_list(hierarchy):
@@ -98,6 +98,68 @@ def setupParser(parser):
         default=60,
         help="number of seconds to wait before starting the next cycle and "
              "leaving active jobs behind.")
+    parser.add_argument(
+        '--persistent-workers',
+        action='store_true',
+        help="keep worker processes alive between cycles instead of forking "
+             "new ones each cycle, repos will tend to be processed by the "
+             "same worker each time so that cached state is kept warm.")
+    parser.add_argument(
+        '--worker-max-jobs',
+        metavar="COUNT",
+        type=int,
+        default=None,
+        help="with '--persistent-workers', replace a worker after it has "
+             "processed this many repos.")
+    parser.add_argument(
+        '--worker-max-rss-mb',
+        metavar="MEGABYTES",
+        type=int,
+        default=None,
+        help="with '--persistent-workers', replace a worker after its peak "
+             "resident set size exceeds this many megabytes.")
+    parser.add_argument(
+        '--idle-repo-sweep-secs',
+        metavar="SECONDS",
+        type=int,
+        default=0,
+        help="only process repos when they have work to do, i.e. when their "
+             "snoop url or one of their reviews has changed, or when they "
+             "are due to be retried. Repos are also processed if they have "
+             "been idle for this many seconds. Set to 0 to process every "
+             "repo every cycle, this is the default.")
+    parser.add_argument(
+        '--snoop-connections-per-host',
+        metavar="COUNT",
+        type=int,
+        default=4,
+        help="maximum number of concurrent connections to each host when "
+             "refreshing snoop urls, each host is refreshed concurrently.")
+    parser.add_argument(
+        '--snoop-timeout-secs',
+        metavar="SECONDS",
+        type=int,
+        default=60,
+        help="number of seconds to wait for each snoop url request before "
+             "considering it failed, repos with failed snoop urls are "
+             "fetched as if the url had changed.")
+    parser.add_argument(
+        '--diff-cache-max-mb',
+        metavar="MEGABYTES",
+        type=int,
+        default=256,
+        help="maximum size of the on-disk cache of diffs, which saves making "
+             "the same diffs again after a restart. Set to 0 to disable the "
+             "cache.")
+    parser.add_argument(
+        '--metrics-port',
+        metavar="PORT",
+        type=int,
+        default=None,
+        help="serve the timing metrics of arcyd's operations on this port "
+             "of localhost at '/metrics', in the Prometheus text format. "
+             "A summary is always written to 'var/run/metrics.json' each "
+             "cycle.")
 
 
 def process(args, repo_configs):
@@ -138,7 +200,15 @@ def _processrepolist(
             args.external_report_command,
             mail_sender,
             args.max_workers,
-            args.overrun_secs)
+            args.overrun_secs,
+            persistent_workers=args.persistent_workers,
+            worker_max_jobs=args.worker_max_jobs,
+            worker_max_rss_mb=args.worker_max_rss_mb,
+            idle_repo_sweep_secs=args.idle_repo_sweep_secs,
+            snoop_connections_per_host=args.snoop_connections_per_host,
+            snoop_timeout_secs=args.snoop_timeout_secs,
+            diff_cache_max_mb=args.diff_cache_max_mb,
+            metrics_port=args.metrics_port)
     except BaseException:
         on_exception("Arcyd will now stop")
         print("stopping")
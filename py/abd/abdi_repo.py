@@ -7,6 +7,8 @@
 # Public Functions:
 #   setup_repo
 #   setup_repo_context
+#   get_object_pool
+#   fetch_object_pool
 #   try_push_special_refs
 #   is_remote_reserve_branch_present
 #   ensure_reserve_branch
@@ -21,6 +23,7 @@ from __future__ import division
 from __future__ import print_function
 
 import contextlib
+import os
 import shutil
 
 import phlgit_branch
@@ -29,9 +32,11 @@ import phlgit_commit
 import phlgit_push
 import phlgitu_ref
 import phlgitx_ignoreattributes
+import phlgitx_objectpool
 import phlsys_git
 import phlsys_subprocess
 
+import abdt_fs
 import abdt_git
 
 
@@ -51,37 +56,42 @@ being created.
 """.strip()
 
 
-def setup_repo(repo_url, repo_path, repo_push_url=None):
+def setup_repo(repo_url, repo_path, repo_push_url=None, object_pool=None):
     """Setup a repository, if an exception is raised then remove the repo.
 
     :repo_url: string url of the repo to clone
     :repo_path: string path to clone the repo to
     :repo_push_url: string url to push to, or None
+    :object_pool: phlgitx_objectpool.ObjectPool to borrow objects from, or None
     :returns: None
 
     """
-    with setup_repo_context(repo_url, repo_path, repo_push_url):
+    with setup_repo_context(repo_url, repo_path, repo_push_url, object_pool):
         pass
 
 
 @contextlib.contextmanager
-def setup_repo_context(repo_url, repo_path, repo_push_url=None):
+def setup_repo_context(
+        repo_url, repo_path, repo_push_url=None, object_pool=None):
     """Setup a repository, if an exception is raised then remove the repo.
 
     :repo_url: string url of the repo to clone
     :repo_path: string path to clone the repo to
     :repo_push_url: string url to push to, or None
+    :object_pool: phlgitx_objectpool.ObjectPool to borrow objects from, or None
     :returns: None
 
     """
-    # if there's any failure after cloning then we should remove the repo
+    clone_args = []
     if repo_push_url is not None:
-        phlsys_subprocess.run(
-            'git', 'clone', repo_url, repo_path,
-            '--config', 'remote.origin.pushurl=' + repo_push_url)
+        clone_args += ['--config', 'remote.origin.pushurl=' + repo_push_url]
+
+    # if there's any failure after cloning then we should remove the repo
+    if object_pool is not None:
+        fetch_object_pool(object_pool, repo_url, repo_path)
+        object_pool.clone(repo_url, repo_path, *clone_args)
     else:
-        phlsys_subprocess.run(
-            'git', 'clone', repo_url, repo_path)
+        phlsys_subprocess.run('git', 'clone', repo_url, repo_path, *clone_args)
 
     try:
         repo = phlsys_git.Repo(repo_path)
@@ -112,6 +122,35 @@ def setup_repo_context(repo_url, repo_path, repo_push_url=None):
         raise
 
 
+def get_object_pool(repo_args):
+    """Return the phlgitx_objectpool.ObjectPool for the repo, or None.
+
+    :repo_args: argparse namespace of the repo's config
+    :returns: a phlgitx_objectpool.ObjectPool or None
+
+    """
+    if not repo_args.object_pool:
+        return None
+    return phlgitx_objectpool.ObjectPool(
+        abdt_fs.Layout.object_pool(repo_args.object_pool))
+
+
+def fetch_object_pool(object_pool, repo_url, repo_path):
+    """Fetch the objects for the repo at 'repo_path' into 'object_pool'.
+
+    Do this before fetching the repo itself, so that it already has the
+    objects that it would otherwise download.
+
+    :object_pool: the phlgitx_objectpool.ObjectPool to fetch into
+    :repo_url: string url of the repo to fetch
+    :repo_path: string path to the repo, its name is used in the pool
+    :returns: None
+
+    """
+    name = os.path.basename(os.path.normpath(repo_path))
+    object_pool.fetch(name, repo_url)
+
+
 def try_push_special_refs(repo):
     """Try pushing to the special refs that arcyd uses.
 
@@ -234,6 +234,16 @@ def setup_repohost_parser(parser):
              "'--repo-url' argument. "
              "the result will be used on the dashboard to link to branches.")
 
+    parser.add_argument(
+        '--object-pool',
+        type=str,
+        metavar='NAME',
+        help="name of a pool of git objects to share between the repos, "
+             "e.g. for many forks of the same repository. the objects of "
+             "each repo are fetched into the pool first and the repos "
+             "borrow them from there, saving disk space and fetch time. "
+             "repos from different repohosts may share the same pool.")
+
 
 # -----------------------------------------------------------------------------
 # Copyright (C) 2014-2015 Bloomberg Finance L.P.
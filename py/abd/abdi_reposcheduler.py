@@ -0,0 +1,106 @@
+"""Decide which repositories are due to be processed each cycle."""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# abdi_reposcheduler
+#
+# Public Classes:
+#   RepoScheduler
+#    .set_due
+#    .set_never_due
+#    .get_due
+#    .next_due_time
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import heapq
+
+
+class RepoScheduler(object):
+
+    """Keep track of when each of a list of repos is next due to be processed.
+
+    Repos are identified by their index in the list. Due times are kept in a
+    priority queue so that finding the due repos costs in proportion to the
+    number of due repos, rather than to the total number of repos.
+
+    A repo stays due until it is given a new due time, this means that repos
+    which could not be processed when due will be returned again next time.
+
+    All repos are initially due at 'start_time'.
+
+    """
+
+    def __init__(self, num_repos, start_time):
+        super(RepoScheduler, self).__init__()
+        self._index_to_due_time = {i: start_time for i in xrange(num_repos)}
+        self._heap = [(start_time, i) for i in xrange(num_repos)]
+        heapq.heapify(self._heap)
+
+    def set_due(self, index, due_time):
+        """Set the repo at 'index' to be due at 'due_time'.
+
+        :index: the index of the repo to schedule
+        :due_time: the datetime at which the repo is due
+        :returns: None
+
+        """
+        self._index_to_due_time[index] = due_time
+        heapq.heappush(self._heap, (due_time, index))
+
+    def set_never_due(self, index):
+        """Set the repo at 'index' to never be due, until 'set_due' is called.
+
+        :index: the index of the repo to unschedule
+        :returns: None
+
+        """
+        self._index_to_due_time.pop(index, None)
+
+    def get_due(self, now):
+        """Return the set of repo indices which are due at 'now'.
+
+        :now: the datetime to consider as the current time
+        :returns: a set of int
+
+        """
+        due = set()
+        while self._heap and self._heap[0][0] <= now:
+            due_time, index = heapq.heappop(self._heap)
+
+            # skip entries that have been superseded by a later 'set_due'
+            if self._index_to_due_time.get(index) == due_time:
+                due.add(index)
+
+        # the repos remain due until they are rescheduled
+        for index in due:
+            heapq.heappush(self._heap, (self._index_to_due_time[index], index))
+
+        return due
+
+    def next_due_time(self, index):
+        """Return the datetime that the repo at 'index' is due, or None."""
+        return self._index_to_due_time.get(index)
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
@@ -0,0 +1,86 @@
+"""Test suite for abdi_reposcheduler."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] all repos are due at the start time
+# [ A] repos are not due before their due time
+# [ A] repos remain due until they are rescheduled
+# [ A] rescheduled repos are due at their new time only
+# [ B] repos set never due are not due, even if previously scheduled
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] test_A_Breathing
+# [ B] test_B_NeverDue
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import datetime
+import unittest
+
+import abdi_reposcheduler
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.start = datetime.datetime(2017, 1, 1)
+        self.second = datetime.timedelta(seconds=1)
+
+    def test_A_Breathing(self):
+        scheduler = abdi_reposcheduler.RepoScheduler(3, self.start)
+
+        # [ A] repos are not due before their due time
+        self.assertSetEqual(
+            scheduler.get_due(self.start - self.second), set())
+
+        # [ A] all repos are due at the start time
+        self.assertSetEqual(scheduler.get_due(self.start), {0, 1, 2})
+
+        # [ A] repos remain due until they are rescheduled
+        self.assertSetEqual(scheduler.get_due(self.start), {0, 1, 2})
+
+        later = self.start + 10 * self.second
+        scheduler.set_due(1, later)
+        self.assertSetEqual(scheduler.get_due(self.start), {0, 2})
+
+        # [ A] rescheduled repos are due at their new time only
+        self.assertSetEqual(scheduler.get_due(later), {0, 1, 2})
+        scheduler.set_due(1, self.start + 20 * self.second)
+        self.assertSetEqual(scheduler.get_due(later), {0, 2})
+        self.assertEqual(
+            scheduler.next_due_time(1), self.start + 20 * self.second)
+
+    def test_B_NeverDue(self):
+        scheduler = abdi_reposcheduler.RepoScheduler(2, self.start)
+
+        # [ B] repos set never due are not due, even if previously scheduled
+        scheduler.set_never_due(0)
+        self.assertSetEqual(scheduler.get_due(self.start), {1})
+        self.assertIsNone(scheduler.next_due_time(0))
+
+        scheduler.set_due(0, self.start)
+        self.assertSetEqual(scheduler.get_due(self.start), {0, 1})
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
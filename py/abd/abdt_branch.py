@@ -53,8 +53,6 @@ from __future__ import division
 from __future__ import print_function
 
 import phlgit_log
-import phlgit_push
-import phlgit_revparse
 import phlgitu_ref
 import phlsys_textconvert
 
@@ -245,8 +243,7 @@ class Branch(object):
         Useful if 'get_author_names_emails' fails.
 
         """
-        if phlgit_revparse.get_sha1_or_none(
-                self._repo, self._review_branch.remote_base) is None:
+        if self._repo.resolve_ref(self._review_branch.remote_base) is None:
             hashes = phlgit_log.get_last_n_commit_hashes_from_ref(
                 self._repo, 1, self._review_branch.remote_branch)
         else:
@@ -365,23 +362,17 @@ class Branch(object):
     def get_commit_message_from_tip(self):
         """Return string commit message from latest commit on branch."""
         hashes = self._get_commit_hashes()
-        revision = phlgit_log.make_revision_from_hash(self._repo, hashes[-1])
+        revision = self._repo.make_revisions_from_hashes([hashes[-1]])[0]
         message = revision.subject + "\n"
         message += "\n"
         message += revision.message + "\n"
         return phlsys_textconvert.ensure_ascii(message)
 
     def _push_delete_review_branch(self):
-        def action():
-            self._repo.push_delete(self._review_branch.branch)
-
-        self._tryloop(action, abdt_errident.PUSH_DELETE_REVIEW)
+        self._repo.push_delete(self._review_branch.branch)
 
     def _push_delete_tracking_branch(self):
-        def action():
-            self._repo.push_delete(self._tracking_branch.branch)
-
-        self._tryloop(action, abdt_errident.PUSH_DELETE_TRACKING)
+        self._repo.push_delete(self._tracking_branch.branch)
 
     def abandon(self):
         """Remove information associated with the abandoned review branch."""
@@ -397,21 +388,8 @@ class Branch(object):
             self.review_branch_name(),
             self._tracking_branch.base)
 
-        # push the abandoned archive, don't escalate if it fails to push
-        try:
-            # XXX: oddly pylint complains if we call push_landed() directly:
-            #      "Using method (_tryloop) as an attribute (not invoked)"
-            def push_abandoned():
-                self._repo.push_abandoned()
-
-            self._tryloop(
-                push_abandoned,
-                abdt_errident.PUSH_ABANDONED_ARCHIVE)
-        except Exception:
-            # XXX: don't worry if we can't push the landed, this is most
-            #      likely a permissioning issue but not a showstopper.
-            #      we should probably nag on the review instead.
-            pass
+        # note that the repo doesn't escalate if the archive fails to push
+        self._repo.push_abandoned()
 
         self._push_delete_review_branch()
         self._push_delete_tracking_branch()
@@ -462,6 +440,11 @@ class Branch(object):
                 abdt_naming.WB_STATUS_BAD_INREVIEW,
                 revision_id)
 
+            # the review exists now, push the tracker straight away rather
+            # than at the end of the batch. if it were lost then the next
+            # cycle would see a new branch and make a duplicate review.
+            self._repo.flush_push_batch()
+
         self._tryloop(action, abdt_errident.MARK_NEW_BAD_IN_REVIEW)
 
     def mark_bad_pre_review(self):
@@ -501,47 +484,45 @@ class Branch(object):
                 abdt_naming.WB_STATUS_OK,
                 revision_id)
 
+            # the review exists now, push the tracker straight away rather
+            # than at the end of the batch. if it were lost then the next
+            # cycle would see a new branch and make a duplicate review.
+            self._repo.flush_push_batch()
+
         self._tryloop(action, abdt_errident.MARK_OK_NEW_REVIEW)
 
     def land(self, author_name, author_email, message):
         """Integrate the branch into the base and remove the review branch."""
 
-        self._repo.checkout_forced_new_branch(
-            self._tracking_branch.base,
-            self._tracking_branch.remote_base)
-
         try:
-            result = self._lander(
+            landing_hash, result = self._lander(
                 self._repo,
+                self._tracking_branch.remote_base,
                 self._tracking_branch.remote_branch,
                 author_name,
                 author_email,
                 message)
         except abdt_lander.LanderException as e:
-            self._repo("reset", "--hard")  # fix the working copy
             raise abdt_exception.LandingException(
                 str(e),
                 self.review_branch_name(),
                 self._tracking_branch.base)
 
-        landing_hash = phlgit_revparse.get_sha1(
-            self._repo, self._tracking_branch.base)
-
         # don't tryloop here as it's more expected that we can't push the base
         # due to permissioning or some other error
         try:
-            self._repo.push(self._tracking_branch.base)
+            self._repo.push_asymmetrical(
+                landing_hash,
+                phlgitu_ref.make_local(self._tracking_branch.base))
         except Exception as e:
             raise abdt_exception.LandingPushBaseException(
                 str(e),
                 self.review_branch_name(),
                 self._tracking_branch.base)
 
-        self._tryloop(
-            lambda: self._repo.push_delete(
-                self._tracking_branch.branch,
-                self.review_branch_name()),
-            abdt_errident.PUSH_DELETE_LANDED)
+        self._repo.push_delete(
+            self._tracking_branch.branch,
+            self.review_branch_name())
 
         self._repo.archive_to_landed(
             self._tracking_hash,
@@ -550,21 +531,8 @@ class Branch(object):
             landing_hash,
             message)
 
-        # push the landing archive, don't escalate if it fails to push
-        try:
-            # XXX: oddly pylint complains if we call push_landed() directly:
-            #      "Using method (_tryloop) as an attribute (not invoked)"
-            def push_landed():
-                self._repo.push_landed()
-
-            self._tryloop(
-                push_landed,
-                abdt_errident.PUSH_LANDING_ARCHIVE)
-        except Exception:
-            # XXX: don't worry if we can't push the landed, this is most
-            #      likely a permissioning issue but not a showstopper.
-            #      we should probably nag on the review instead.
-            pass
+        # note that the repo doesn't escalate if the archive fails to push
+        self._repo.push_landed()
 
         self._review_branch = None
         self._review_hash = None
@@ -580,18 +548,14 @@ class Branch(object):
 
         new_branch = self._tracking_branch.branch
         if old_branch == new_branch:
-            phlgit_push.push_asymmetrical_force(
-                self._repo,
+            self._repo.push_asymmetrical_force(
                 self._review_branch.remote_branch,
-                phlgitu_ref.make_local(new_branch),
-                self._tracking_branch.remote)
+                phlgitu_ref.make_local(new_branch))
         else:
-            phlgit_push.move_asymmetrical(
-                self._repo,
+            self._repo.move_asymmetrical(
                 self._review_branch.remote_branch,
                 phlgitu_ref.make_local(old_branch),
-                phlgitu_ref.make_local(new_branch),
-                self._repo.get_remote())
+                phlgitu_ref.make_local(new_branch))
 
         self._tracking_hash = self._review_hash
 
@@ -599,11 +563,9 @@ class Branch(object):
         tracking_branch = self._review_branch.make_tracker(
             status, revision_id)
 
-        phlgit_push.push_asymmetrical_force(
-            self._repo,
+        self._repo.push_asymmetrical_force(
             self._review_branch.remote_branch,
-            phlgitu_ref.make_local(tracking_branch.branch),
-            tracking_branch.remote)
+            phlgitu_ref.make_local(tracking_branch.branch))
 
         self._tracking_branch = tracking_branch
         self._tracking_hash = self._review_hash
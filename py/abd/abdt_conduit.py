@@ -13,7 +13,10 @@
 #    .create_revision_as_user
 #    .query_name_and_phid_from_email
 #    .query_users_from_emails
+#    .get_known_authors
+#    .merge_known_authors
 #    .parse_commit_message
+#    .prefetch_review_states
 #    .is_review_accepted
 #    .is_review_abandoned
 #    .is_review_recently_updated
@@ -42,6 +45,11 @@ import phlsys_textconvert
 import abdt_exception
 import abdt_logging
 
+# the user caches are shared by all the instances in the process, so that
+# they are kept for as long as the process runs, which may be many cycles
+_URI_TO_EMAIL_USER_CACHE = {}
+_URI_TO_PHID_USERNAME_DICT = {}
+
 
 # TODO: re-order methods as (accessor, mutator)
 class Conduit(object):
@@ -151,11 +159,7 @@ class Conduit(object):
         :returns: a (username, phid) tuple
 
         """
-        user = phlcon_user.query_user_from_email(self._multi_conduit, email)
-        result = None
-        if user:
-            result = (user.userName, user.phid)
-        return result
+        return self._query_name_and_phid_from_emails([email])[0]
 
     def query_users_from_emails(self, emails):
         """Return a list of username strings based on the provided emails.
@@ -167,7 +171,57 @@ class Conduit(object):
         :returns: a list of strings corresponding to Phabricator usernames
 
         """
-        return phlcon_user.query_users_from_emails(self._multi_conduit, emails)
+        return [
+            user[0] if user is not None else None
+            for user in self._query_name_and_phid_from_emails(emails)
+        ]
+
+    def _query_name_and_phid_from_emails(self, emails):
+        uri = self._multi_conduit.conduit_uri
+        cache = _URI_TO_EMAIL_USER_CACHE.get(uri)
+        if cache is None:
+            cache = phlcon_user.EmailUserCache()
+            _URI_TO_EMAIL_USER_CACHE[uri] = cache
+        return cache.query_name_and_phid_from_emails(
+            self._multi_conduit, emails)
+
+    def _get_phid_to_username(self):
+        uri = self._multi_conduit.conduit_uri
+        return _URI_TO_PHID_USERNAME_DICT.setdefault(uri, {})
+
+    def get_known_authors(self, review_id_set):
+        """Return a dict of review id to (phid, username) of the known authors.
+
+        The username is None if only the author's phid is known. This is
+        useful for passing the authors on to other processes, see
+        'merge_known_authors'.
+
+        :review_id_set: a set of the review ids to get the authors of
+        :returns: a dict of review id to (string phid, string username)
+
+        """
+        phid_to_username = self._get_phid_to_username()
+        review_to_phid = self._reviewstate_cache.get_known_author_phids(
+            review_id_set)
+        return {
+            review_id: (phid, phid_to_username.get(phid))
+            for review_id, phid in review_to_phid.iteritems()
+        }
+
+    def merge_known_authors(self, review_to_author):
+        """Remember the authors from 'get_known_authors' of another instance.
+
+        :review_to_author: a dict of review id to (phid, username)
+        :returns: None
+
+        """
+        phid_to_username = self._get_phid_to_username()
+        review_to_phid = {}
+        for review_id, (phid, username) in review_to_author.iteritems():
+            review_to_phid[review_id] = phid
+            if username is not None:
+                phid_to_username[phid] = username
+        self._reviewstate_cache.merge_author_phids(review_to_phid)
 
     def parse_commit_message(self, message):
         """Return a ParseCommitMessageResponse based on 'message'.
@@ -181,13 +235,36 @@ class Conduit(object):
             self._multi_conduit, message)
 
     def _get_author_user(self, revisionid):
-        # TODO: these queries are very expensive, cache them
-        revision = phlcon_differential.query(
-            self._multi_conduit, [revisionid])[0]
-        author_user = phlcon_user.query_usernames_from_phids(
-            self._multi_conduit, [revision.authorPHID])[0]
+        # the review state cache usually already knows the author's phid, as
+        # the state of the review will have been checked before now
+        author_phid = self._reviewstate_cache.get_author_phid(revisionid)
+        if author_phid is None:
+            revision = phlcon_differential.query(
+                self._multi_conduit, [revisionid])[0]
+            author_phid = revision.authorPHID
+            self._reviewstate_cache.merge_author_phids(
+                {revisionid: author_phid})
+
+        phid_to_username = self._get_phid_to_username()
+        author_user = phid_to_username.get(author_phid)
+        if author_user is None:
+            author_user = phlcon_user.query_usernames_from_phids(
+                self._multi_conduit, [author_phid])[0]
+            phid_to_username[author_phid] = author_user
+
         return author_user
 
+    def prefetch_review_states(self, revisionid_set):
+        """Retrieve the states of the supplied reviews in bulk.
+
+        This saves querying the reviews one at a time as they're needed.
+
+        :revisionid_set: a set of ids of the Differential revisions
+        :returns: None
+
+        """
+        self._reviewstate_cache.prefetch_states(revisionid_set)
+
     def is_review_accepted(self, revisionid):
         """Return True if the supplied 'revisionid' is in 'accepted' status.
 
@@ -350,6 +427,7 @@ class Conduit(object):
                 as_user_conduit,
                 revisionid,
                 action=phlcon_differential.Action.claim)
+        self._reviewstate_cache.forget_author_phid(revisionid)
 
     def _log_context(self, identifier, description):
         return abdt_logging.remote_io_write_event_context(
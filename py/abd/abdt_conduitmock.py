@@ -24,7 +24,10 @@
 #    .create_revision_as_user
 #    .query_name_and_phid_from_email
 #    .query_users_from_emails
+#    .get_known_authors
+#    .merge_known_authors
 #    .parse_commit_message
+#    .prefetch_review_states
 #    .is_review_accepted
 #    .is_review_abandoned
 #    .is_review_recently_updated
@@ -186,13 +189,19 @@ class ConduitMockData(object):
 
 class ConduitMock(object):
 
-    def __init__(self, data=None):
-        """Initialise a new ConduitMock."""
+    def __init__(self, data=None, is_traced=True):
+        """Initialise a new ConduitMock.
+
+        :data: the ConduitMockData to operate on, or None to make a new one
+        :is_traced: if True then print each method call and its result
+
+        """
         super(ConduitMock, self).__init__()
         self._data = data
         if self._data is None:
             self._data = ConduitMockData()
-        phlsys_tracedecorator.decorate_object_methods(self, _mock_to_str)
+        if is_traced:
+            phlsys_tracedecorator.decorate_object_methods(self, _mock_to_str)
 
     def describe(self):
         """Return a string description of this conduit for a human to read.
@@ -288,6 +297,31 @@ class ConduitMock(object):
             usernames.append(next_username)
         return usernames
 
+    def get_known_authors(self, review_id_set):
+        """Return a dict of review id to (phid, username) of the known authors.
+
+        The username is None if only the author's phid is known. This is
+        useful for passing the authors on to other processes, see
+        'merge_known_authors'.
+
+        :review_id_set: a set of the review ids to get the authors of
+        :returns: a dict of review id to (string phid, string username)
+
+        """
+        # the mock doesn't cache authors, so none of them are known
+        _ = review_id_set  # NOQA
+        return {}
+
+    def merge_known_authors(self, review_to_author):
+        """Remember the authors from 'get_known_authors' of another instance.
+
+        :review_to_author: a dict of review id to (phid, username)
+        :returns: None
+
+        """
+        # the mock doesn't cache authors
+        _ = review_to_author  # NOQA
+
     def parse_commit_message(self, message):
         """Return a ParseCommitMessageResponse based on 'message'.
 
@@ -301,6 +335,18 @@ class ConduitMock(object):
         return phlcon_differential.ParseCommitMessageResponse(
             fields=fields, errors=errors)
 
+    def prefetch_review_states(self, revisionid_set):
+        """Retrieve the states of the supplied reviews in bulk.
+
+        This saves querying the reviews one at a time as they're needed.
+
+        :revisionid_set: a set of ids of the Differential revisions
+        :returns: None
+
+        """
+        # the mock doesn't cache states, it always has them to hand
+        _ = revisionid_set  # NOQA
+
     def is_review_accepted(self, revisionid):
         """Return True if the supplied 'revisionid' is in 'accepted' status.
 
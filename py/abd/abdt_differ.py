@@ -30,6 +30,7 @@ from __future__ import print_function
 import collections
 
 import phlgit_diff
+import phlgitu_diff
 
 import abdt_exception
 
@@ -37,6 +38,10 @@ _FULL_DIFF_CONTEXT_LINES = 100000
 _GOOD_DIFF_CONTEXT_LINES = 1000
 _SOME_DIFF_CONTEXT_LINES = 100
 
+# git's default amount of context, which is what we've always used for the
+# 'RemoveContextReduction'
+_MIN_DIFF_CONTEXT_LINES = 3
+
 DiffResult = collections.namedtuple(
     'abdt_differ__DiffResult',
     [
@@ -133,38 +138,40 @@ def make_raw_diff(repo, base, branch, max_diff_size_utf8_bytes):
     :returns: the string diff of the changes on the branch
 
     """
+    # ask git for the diff once with all the context we might want, smaller
+    # amounts of context are derived from it without asking git again
     raw_diff = phlgit_diff.raw_diff_range(
         repo, base, branch, _FULL_DIFF_CONTEXT_LINES)
-    new_raw_diff = unicode(raw_diff, errors='replace')
-    full_diff_size_utf8_bytes = len(new_raw_diff.encode("utf-8"))
-    diff_size_utf8_bytes = full_diff_size_utf8_bytes
 
     if not raw_diff:
         raise NoDiffError()
 
+    diff = phlgitu_diff.Diff(raw_diff, _FULL_DIFF_CONTEXT_LINES)
+    full_diff_size_utf8_bytes = diff.utf8_size(_FULL_DIFF_CONTEXT_LINES)
+    diff_size_utf8_bytes = full_diff_size_utf8_bytes
+    context_lines = _FULL_DIFF_CONTEXT_LINES
+
     reduction_list = []
 
     # TODO: detect generated files and try less context on just those first
     # TODO: detect generated files and try no context on just those first
     # TODO: detect generated files and try excluding those first
 
-    # if the diff is too big then regen with less context
-    for context_lines in [_GOOD_DIFF_CONTEXT_LINES, _SOME_DIFF_CONTEXT_LINES]:
+    # if the diff is too big then try with less context
+    for less_context_lines in [
+            _GOOD_DIFF_CONTEXT_LINES, _SOME_DIFF_CONTEXT_LINES]:
         if diff_size_utf8_bytes > max_diff_size_utf8_bytes:
-            raw_diff = phlgit_diff.raw_diff_range(
-                repo, base, branch, context_lines)
-            new_raw_diff = unicode(raw_diff, errors='replace')
-            diff_size_utf8_bytes = len(new_raw_diff.encode("utf-8"))
+            context_lines = less_context_lines
+            diff_size_utf8_bytes = diff.utf8_size(context_lines)
             reduction_list.append(
                 LessContextReduction(
                     diff_size_utf8_bytes,
                     context_lines))
 
-    # if the diff is still too big then regen with no context
+    # if the diff is still too big then try with the minimum of context
     if diff_size_utf8_bytes > max_diff_size_utf8_bytes:
-        raw_diff = phlgit_diff.raw_diff_range(repo, base, branch, None)
-        new_raw_diff = unicode(raw_diff, errors='replace')
-        diff_size_utf8_bytes = len(new_raw_diff.encode("utf-8"))
+        context_lines = _MIN_DIFF_CONTEXT_LINES
+        diff_size_utf8_bytes = diff.utf8_size(context_lines)
         reduction_list.append(
             RemoveContextReduction(
                 diff_size_utf8_bytes))
@@ -180,6 +187,9 @@ def make_raw_diff(repo, base, branch, max_diff_size_utf8_bytes):
         reduction_list.append(
             DiffStatReduction(
                 diff_size_utf8_bytes))
+    else:
+        raw_diff = diff.text(context_lines)
+        new_raw_diff = unicode(raw_diff, errors='replace')
 
     # if the diff is still too big then error
     if diff_size_utf8_bytes > max_diff_size_utf8_bytes:
@@ -9,23 +9,30 @@
 # [ A] a diff within the limits passes straight through
 # [ B] a diff outside the limits can be reduced ok with less context
 # [ B] a diff still outside the limits can be reduced ok with no context
+# [ B] reduced diffs are the same as asking git for less context
 # [ C] a diff still outside the limits can be reduced to the diffstat
 # [ A] raise if a diff cannot be reduced to the limits
 # [  ] bad unicode chars are replaced
+# [ D] diffs using attributes from a tree match diffs from a checkout
+# [ D] diffing using attributes from a tree doesn't touch the working tree
 # -----------------------------------------------------------------------------
 # Tests:
 # [ A] test_A_Breathing
 # [ B] test_B_ReduceSmallChangeOnLargeFile
 # [ C] test_C_ReduceAddMassiveFile
+# [ D] test_D_AttributesFromTree
 # =============================================================================
 
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
 import unittest
 
+import phlgit_diff
 import phlgitu_fixture
+import phlgitx_treeattributes
 
 import abdt_differ
 import abdt_exception
@@ -103,6 +110,13 @@ class Test(unittest.TestCase):
                 no_context_diff_size,
                 reduced_context_diff_size)
 
+            # [ B] reduced diffs are the same as asking git for less context
+            for max_bytes, context_lines in [(2000, 100), (500, None)]:
+                self.assertEqual(
+                    phlgit_diff.raw_diff_range(
+                        worker.repo, "master", "diff_branch", context_lines),
+                    make_diff(max_bytes).diff)
+
     def test_C_ReduceAddMassiveFile(self):
         with phlgitu_fixture.lone_worker_context() as worker:
 
@@ -133,6 +147,65 @@ class Test(unittest.TestCase):
                 diffstat_diff_size,
                 original_diff_size)
 
+    def test_D_AttributesFromTree(self):
+        with phlgitu_fixture.lone_worker_context() as worker:
+
+            worker.commit_new_file("add data", "data.dat", "data\n")
+            os.mkdir(os.path.join(worker.repo.working_dir, "sub"))
+            worker.commit_new_file("add text", "sub/text.txt", "text\n")
+
+            # mark the data as binary on the branch and change both files
+            worker.commit_new_file_on_new_branch(
+                "diff_branch",
+                "make data binary",
+                ".gitattributes",
+                "*.dat -diff\n")
+            worker.commit_append_to_file("change data", "data.dat", "more\n")
+            worker.commit_new_file(
+                "make text binary", "sub/.gitattributes", "*.txt -diff\n")
+            worker.commit_append_to_file(
+                "change text", "sub/text.txt", "more\n")
+            worker.checkout_master()
+
+            attributes = phlgitx_treeattributes.AttributesWorktree(
+                worker.repo)
+
+            def make_diff(repo, max_bytes):
+                return abdt_differ.make_raw_diff(
+                    repo, "master", "diff_branch", max_bytes)
+
+            for max_bytes in (100000, 200, 1):
+                tree_repo = attributes.repo_for_tree("diff_branch")
+                try:
+                    tree_result = make_diff(tree_repo, max_bytes)
+                except abdt_exception.LargeDiffException:
+                    tree_result = None
+
+                # [ D] diffing using attributes from a tree doesn't touch the
+                #      working tree
+                self.assertEqual(
+                    "master",
+                    worker.repo('rev-parse', '--abbrev-ref', 'HEAD').strip())
+                self.assertEqual("", worker.repo('status', '--porcelain'))
+
+                # [ D] diffs using attributes from a tree match diffs from a
+                #      checkout
+                worker.repo('checkout', 'diff_branch')
+                try:
+                    checkout_result = make_diff(worker.repo, max_bytes)
+                except abdt_exception.LargeDiffException:
+                    checkout_result = None
+                worker.checkout_master()
+
+                self.assertEqual(checkout_result, tree_result)
+                if max_bytes == 100000:
+                    self.assertEqual(2, tree_result.diff.count("Binary files"))
+
+            # the attributes on master don't apply to the branch
+            master_repo = attributes.repo_for_tree("master")
+            master_result = make_diff(master_repo, 100000)
+            self.assertIn("+more", master_result.diff)
+
 
 # -----------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
@@ -18,24 +18,38 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import phlgit_checkout
 import phlgitu_ref
+import phlgitx_treeattributes
 
 import abdt_differ
+import abdt_exception
+
+# bump this if the way diffs are made changes, so that old results on disk
+# aren't used
+_STORE_FORMAT_VERSION = 1
 
 
 class Cache(object):
 
     """Cache the results from abdt_differ."""
 
-    def __init__(self, refcache_repo):
+    def __init__(self, refcache_repo, store=None):
         """Return a Cache.
 
+        Results are only kept in memory unless a 'store' is supplied, in which
+        case they are also kept there. The store is keyed on the sha1s of the
+        commits being diffed, so it may be shared between repositories and
+        processes.
+
         :refcache_repo: a phlgitx_refcache repository
+        :store: a phlsys_diskcache.DiskCache to persist results in, or None
 
         """
         self._diff_results = {}
         self._repo = refcache_repo
+        self._store = store
+        self._attributes_worktree = phlgitx_treeattributes.AttributesWorktree(
+            refcache_repo)
 
     def get_cache(self):
         """Return the cache internals for persisting.
@@ -61,8 +75,8 @@ class Cache(object):
         If the diff would exceed the pre-specified max diff size then take
         measures to reduce the diff.
 
-        Potentially checkout onto the 'to_branch' so that changes to
-        .gitattributes files will be considered.
+        Changes to .gitattributes files on the 'to_branch' will be
+        considered, without checking it out.
 
         :from_branch: string name of the merge-base of 'branch'
         :to_branch: string name of the branch to diff
@@ -80,30 +94,66 @@ class Cache(object):
         if key in self._diff_results:
             raise self._diff_results[key]
 
-        # checkout the 'to' branch, otherwise we won't take into account any
-        # changes to .gitattributes files
-        phlgit_checkout.branch(self._repo, to_branch)
+        if self._store is not None:
+            stored = self._store.get(_make_store_key(key))
+            if stored is not None:
+                return _from_stored(stored)
+
+        # use the attributes from the 'to' branch, otherwise we won't take
+        # into account any changes to .gitattributes files
+        attributes_repo = self._attributes_worktree.repo_for_tree(to_branch)
 
         try:
-            return abdt_differ.make_raw_diff(
-                self._repo,
+            result = abdt_differ.make_raw_diff(
+                attributes_repo,
                 from_branch,
                 to_branch,
                 max_diff_size_utf8_bytes)
         except abdt_differ.NoDiffError as e:
             self._diff_results[key] = e
+            self._put_in_store(key, ('no-diff',))
             raise
+        except abdt_exception.LargeDiffException as e:
+            self._put_in_store(
+                key,
+                ('large-diff', e.diff_summary, e.diff_len, e.diff_len_limit))
+            raise
+
+        self._put_in_store(key, ('result', tuple(result)))
+        return result
+
+    def _put_in_store(self, key, stored):
+        if self._store is not None:
+            self._store.set(_make_store_key(key), stored)
 
     def _make_key(self, from_branch, to_branch, max_diff_size_utf8_bytes):
         from_ref, to_ref = self._refs_to_hashes(from_branch, to_branch)
         return (from_ref, to_ref, max_diff_size_utf8_bytes)
 
     def _refs_to_hashes(self, *ref_list):
-        hash_ref_pairs = self._repo.hash_ref_pairs
-        ref_to_hash = dict(((r, h) for h, r in hash_ref_pairs))
+        ref_to_hash = self._repo.ref_to_hash
         return (ref_to_hash[ref] for ref in ref_list)
 
 
+def _make_store_key(key):
+    from_hash, to_hash, max_diff_size_utf8_bytes = key
+    return 'diffresult-v{} {} {} {}'.format(
+        _STORE_FORMAT_VERSION, from_hash, to_hash, max_diff_size_utf8_bytes)
+
+
+def _from_stored(stored):
+    # DiffResult and the exceptions don't pickle well by themselves, so they
+    # are stored as tuples and re-made here
+    kind = stored[0]
+    if kind == 'result':
+        return abdt_differ.DiffResult(*stored[1])
+    elif kind == 'no-diff':
+        raise abdt_differ.NoDiffError()
+    elif kind == 'large-diff':
+        raise abdt_exception.LargeDiffException(*stored[1:])
+    raise Exception('unexpected stored diff result: {}'.format(kind))
+
+
 # -----------------------------------------------------------------------------
 # Copyright (C) 2014 Bloomberg Finance L.P.
 #
@@ -10,6 +10,7 @@
 # -----------------------------------------------------------------------------
 # Tests:
 # [ A] test_A_Breathing
+# [ B] test_B_Store
 # =============================================================================
 
 from __future__ import absolute_import
@@ -20,6 +21,8 @@ import contextlib
 import unittest
 
 import phlgitu_fixture
+import phlsys_diskcache
+import phlsys_fs
 import phlgitx_refcache
 
 import abdt_differ
@@ -103,15 +106,18 @@ class Test(unittest.TestCase):
                 with self.assertRaises(abdt_differ.NoDiffError):
                     make_diff(1)
 
-            # the differ will detach HEAD so attach to branch again before
-            # making any more commits on the branch
+            # the differ doesn't checkout, so HEAD is still on the branch
             # pylint has faulty detection here
             # pylint: disable=not-callable
-            worker.repo('checkout', branch_name)
+            self.assertEqual(
+                branch_name,
+                worker.repo('rev-parse', '--abbrev-ref', 'HEAD').strip())
             # pylint: enable=not-callable
 
-            worker.commit_new_file(
-                "make a test diff", "newfile", "test content")
+            # commit via the refcache_repo so that it knows the branch moved,
+            # it won't notice changes made behind its back
+            worker.add_new_file("newfile", "test content")
+            refcache_repo('commit', '-m', 'make a test diff', '--', 'newfile')
 
             # a diff within the limits passes straight through
             diff_result = make_diff(1000)
@@ -129,6 +135,52 @@ class Test(unittest.TestCase):
             with self.assertRaises(abdt_exception.LargeDiffException):
                 make_diff(1)
 
+    def test_B_Store(self):
+        with contextlib.nested(
+                phlgitu_fixture.lone_worker_context(),
+                phlsys_fs.tmpdir_context()) as (worker, store_dir):
+
+            store = phlsys_diskcache.DiskCache(store_dir, 1024 * 1024)
+
+            worker.repo('branch', 'empty_branch')
+            worker.commit_new_file_on_new_branch(
+                'diff_branch', 'make a test diff', 'newfile', 'test content')
+
+            def make_diff(repo, branch, max_bytes):
+                differ = abdt_differresultcache.Cache(repo, store)
+                return differ.checkout_make_raw_diff(
+                    "refs/heads/master",
+                    "refs/heads/{}".format(branch),
+                    max_bytes)
+
+            breakable_repo = _BreakableRepo(worker.repo)
+            refcache_repo = phlgitx_refcache.Repo(breakable_repo)
+
+            diff_result = make_diff(refcache_repo, 'diff_branch', 1000)
+            with self.assertRaises(abdt_differ.NoDiffError):
+                make_diff(refcache_repo, 'empty_branch', 1000)
+            with self.assertRaises(abdt_exception.LargeDiffException):
+                make_diff(refcache_repo, 'diff_branch', 1)
+
+            # load the refs so that only the diffing would need the repo
+            _ = refcache_repo.hash_ref_pairs  # NOQA
+
+            # new Caches don't need to make the diffs again, all the results
+            # are read from the store
+            with breakable_repo.disabled_context():
+                self.assertEqual(
+                    diff_result,
+                    make_diff(refcache_repo, 'diff_branch', 1000))
+                with self.assertRaises(abdt_differ.NoDiffError):
+                    make_diff(refcache_repo, 'empty_branch', 1000)
+                with self.assertRaises(abdt_exception.LargeDiffException):
+                    make_diff(refcache_repo, 'diff_branch', 1)
+
+            # a different size limit is a different diff
+            with self.assertRaises(_BreakableRepoUsedError):
+                with breakable_repo.disabled_context():
+                    make_diff(refcache_repo, 'diff_branch', 2000)
+
 
 # -----------------------------------------------------------------------------
 # Copyright (C) 2014-2017 Bloomberg Finance L.P.
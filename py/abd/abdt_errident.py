@@ -14,9 +14,8 @@ kinds of error identifiers to expect.
 #   CONDUIT_REFRESH
 #   GIT_SNOOP
 #   FETCH_PRUNE
+#   FETCH_OBJECT_POOL
 #   CONDUIT_CONNECT
-#   PUSH_DELETE_REVIEW
-#   PUSH_DELETE_TRACKING
 #   MARK_BAD_LAND
 #   MARK_BAD_ABANDONED
 #   MARK_BAD_IN_REVIEW
@@ -24,9 +23,7 @@ kinds of error identifiers to expect.
 #   MARK_BAD_PRE_REVIEW
 #   MARK_OK_IN_REVIEW
 #   MARK_OK_NEW_REVIEW
-#   PUSH_DELETE_LANDED
-#   PUSH_LANDING_ARCHIVE
-#   PUSH_ABANDONED_ARCHIVE
+#   PUSH_BATCH
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -46,11 +43,10 @@ GIT_SNOOP = "git-snoop"
 
 # abdi_processargs
 FETCH_PRUNE = 'fetch-prune'
+FETCH_OBJECT_POOL = 'fetch-object-pool'
 CONDUIT_CONNECT = 'conduit-connect'
 
 # abdt_branch
-PUSH_DELETE_REVIEW = 'push-delete-review'
-PUSH_DELETE_TRACKING = 'push-delete-tracking'
 MARK_BAD_LAND = 'mark-bad-land'
 MARK_BAD_ABANDONED = 'mark-bad-abandoned'
 MARK_BAD_IN_REVIEW = 'mark-bad-in-review'
@@ -58,9 +54,9 @@ MARK_NEW_BAD_IN_REVIEW = 'mark-new-bad-in-review'
 MARK_BAD_PRE_REVIEW = 'mark-bad-pre-review'
 MARK_OK_IN_REVIEW = 'mark-ok-in-review'
 MARK_OK_NEW_REVIEW = 'mark-ok-new-review'
-PUSH_DELETE_LANDED = 'push-delete-landed'
-PUSH_LANDING_ARCHIVE = 'push-landing-archive'
-PUSH_ABANDONED_ARCHIVE = 'push-abandoned-archive'
+
+# abdt_git
+PUSH_BATCH = 'push-batch'
 
 
 # -----------------------------------------------------------------------------
@@ -13,6 +13,7 @@
 #    .repo_try
 #    .repo_ok
 #    .repo
+#    .object_pool
 #   Accessor
 #    .set_pid
 #    .get_pid_or_none
@@ -126,7 +127,18 @@ This is where Arcyd looks for command files, e.g. to pause or stop.
 """.strip()
 
 _VAR_RUN_README = """
-This is where Arcyd puts it's pidfile.
+This is where Arcyd puts it's pidfile, and the summary of its metrics which
+is updated each cycle.
+""".strip()
+
+_VAR_OBJECTPOOL_README = """
+This is where Arcyd keeps pools of git objects that are shared between the
+repositories it is managing. The repositories depend on these, so they must be
+kept if the repositories are.
+""".strip()
+
+_VAR_CACHE_README = """
+This is where Arcyd keeps results that are expensive to work out, e.g. diffs.
 """.strip()
 
 
@@ -139,6 +151,7 @@ class Layout(object):
     arcydroot = '.arcydroot'
     root_config = 'configfile'
     pid = 'var/run/arcyd.pid'
+    metrics = 'var/run/metrics.json'
     stdout = 'var/log/stdout'
     stderr = 'var/log/stderr'
     log_debug = 'var/log/debug'
@@ -150,6 +163,7 @@ class Layout(object):
     lockfile = 'var/lockfile'
     killfile = 'var/command/killfile'
     reloadfile = 'var/command/reload'
+    diff_cache_dir = 'var/cache/diffresult'
 
     dir_run = 'var/run'
 
@@ -198,6 +212,11 @@ class Layout(object):
         """Return the string path to repo 'name'."""
         return "var/repo/{}".format(name)
 
+    @staticmethod
+    def object_pool(name):
+        """Return the string path to object pool 'name'."""
+        return "var/objectpool/{}".format(name)
+
 
 class Accessor(object):
 
@@ -443,6 +462,8 @@ def initialise_here():
     phlsys_fs.write_text_file('var/status/README', _VAR_STATUS_README)
     phlsys_fs.write_text_file('var/command/README', _VAR_COMMAND_README)
     phlsys_fs.write_text_file('var/run/README', _VAR_RUN_README)
+    phlsys_fs.write_text_file('var/cache/README', _VAR_CACHE_README)
+    phlsys_fs.write_text_file('var/objectpool/README', _VAR_OBJECTPOOL_README)
 
     repo('add', '.')
     phlsys_fs.write_text_file('.gitignore', 'var\n')
@@ -8,21 +8,28 @@
 #   Repo
 #    .is_identical
 #    .get_remote_branches
-#    .checkout_forced_new_branch
 #    .raw_diff_range
 #    .get_range_hashes
 #    .make_revisions_from_hashes
 #    .squash_merge
+#    .describe_commit
 #    .archive_to_landed
 #    .push_landed
 #    .archive_to_abandoned
 #    .push_abandoned
 #    .push_asymmetrical
 #    .push
+#    .push_asymmetrical_force
+#    .move_asymmetrical
 #    .push_delete
+#    .push_batch_context
+#    .flush_push_batch
 #    .checkout_master_fetch_prune
 #    .hash_ref_pairs
 #    .checkout_make_raw_diff
+#    .resolve_ref
+#    .read_blob
+#    .read_commit
 #    .get_remote
 #
 # Public Functions:
@@ -42,6 +49,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+import contextlib
+import logging
+import sys
+
 import phlgit_branch
 import phlgit_checkout
 import phlgit_commit
@@ -50,13 +62,16 @@ import phlgit_fetch
 import phlgit_log
 import phlgit_merge
 import phlgit_push
-import phlgit_showref
 import phlgitu_ref
 
 import abdt_branch
+import abdt_errident
 import abdt_lander
 import abdt_logging
 import abdt_naming
+import abdt_tryloop
+
+_LOGGER = logging.getLogger(__name__)
 
 _ARCYD_REFSPACE = 'refs/arcyd'
 _PRIVATE_ARCYD_BRANCHSPACE = '__private_arcyd'
@@ -104,6 +119,8 @@ ARCYD_ABANDONED_REF = "{}/abandoned".format(_ARCYD_REFSPACE)
 _ARCYD_ABANDONED_BRANCH = "{}/abandoned".format(_PRIVATE_ARCYD_BRANCHSPACE)
 ARCYD_ABANDONED_BRANCH_FQ = "refs/heads/" + _ARCYD_ABANDONED_BRANCH
 
+_ARCHIVE_REFS = (ARCYD_LANDED_REF, ARCYD_ABANDONED_REF)
+
 
 class Repo(object):
 
@@ -124,6 +141,9 @@ class Repo(object):
         self._is_landing_archive_enabled = None
         self._differ_cache = differ_cache
 
+        # while batching, a map of destination ref to the refspec to push
+        self._push_queue = None
+
     def is_identical(self, branch1, branch2):
         """Return True if the branches point to the same commit.
 
@@ -134,16 +154,6 @@ class Repo(object):
         """
         return phlgit_branch.is_identical(self, branch1, branch2)
 
-    def _is_ref(self, ref):
-        """Return True if the specified ref exists, otherwise False.
-
-        :ref: the string name of the ref to look up
-        :return: True if the specified ref exists, otherwise False
-
-        """
-        ref_names = phlgit_showref.names(self)
-        return ref in ref_names
-
     def get_remote_branches(self):
         """Return a list of string names of remote branches.
 
@@ -152,17 +162,6 @@ class Repo(object):
         """
         return phlgit_branch.get_remote(self, self._remote)
 
-    def checkout_forced_new_branch(self, new_name, based_on):
-        """Overwrite and checkout 'new_name' as a new branch from 'based_on'.
-
-        :new_name: the string name of the branch to create and overwrite
-        :based_on: the string name of the branch to copy
-        :returns: None
-
-        """
-        phlgit_checkout.new_branch_force_based_on(
-            self, new_name, based_on)
-
     # TODO: split this into more functions with varying context
     def raw_diff_range(self, base, to, context=None):
         """Return a string of the unified diff between 'base' and 'to'.
@@ -204,31 +203,96 @@ class Repo(object):
         """
         return phlgit_log.make_revisions_from_hashes(self, hashes)
 
-    def squash_merge(self, branch, message, author_name, author_email):
-        """Return output from Git performing a squash merge.
+    def squash_merge(
+            self, base, branch, message, author_name, author_email):
+        """Return the string sha1 of a new commit squashing 'branch' on 'base'.
 
-        :branch: string name of branch to merge into HEAD
+        With git 2.38 or later the merge is done in memory, the working tree
+        isn't touched and no refs are updated. With older versions of git,
+        'base' is checked out with a detached HEAD and 'git merge --squash' is
+        used instead.
+
+        Raise phlgit_merge.MergeException if the merge has conflicts or there
+        are no changes to land.
+
+        :base: string name of the branch to merge into
+        :branch: string name of branch to merge into 'base'
         :message: string message for the merge commit
         :author_name: string name of author for the merge commit
         :author_email: string email of author for the merge commit
-        :returns: string of Git output
+        :returns: string sha1 of the new commit
 
         """
-        # TODO: test that the author is set correctly
-        return phlgit_merge.squash(
+        author = author_name + " <" + author_email + ">"
+        if not phlgit_merge.is_write_tree_supported():
+            return self._squash_merge_in_working_tree(
+                base, branch, message, author)
+
+        base_hash = self.resolve_ref(base)
+        tree = phlgit_merge.write_tree(self, base, branch)
+        if tree == self.resolve_ref(base + '^{tree}'):
+            raise phlgit_merge.MergeException(
+                "nothing to land, '{}' has no changes from '{}'".format(
+                    branch, base))
+
+        return phlgit_commit.commit_tree(
             self,
-            branch,
+            tree,
+            [base_hash],
             message,
-            author_name + " <" + author_email + ">")
+            author)
+
+    def _squash_merge_in_working_tree(self, base, branch, message, author):
+        self('checkout', '--force', '--detach', base)
+        try:
+            phlgit_merge.squash(self, branch, message, author)
+        except phlgit_merge.MergeException:
+            self('reset', '--hard')  # fix the working copy
+            raise
+        return self('rev-parse', 'HEAD').strip()
+
+    def describe_commit(self, commit, branch):
+        """Return a string summary of 'commit' on 'branch' for humans.
 
-    def _checkout_archive_ref_branch(
-            self, short_branch_name, fq_branch_name, initial_message):
+        The summary is similar to the output of 'git commit'.
 
-        if self._is_ref(fq_branch_name):
-            phlgit_checkout.branch(self, short_branch_name)
+        :commit: string sha1 of the commit to describe
+        :branch: string name of the branch the commit is on
+        :returns: string summary of the commit
+
+        """
+        return self(
+            'show',
+            '--format=[{} %h] %s'.format(branch),
+            '--shortstat',
+            '--summary',
+            commit)
+
+    def _archive(self, fq_branch_name, initial_message, review_hash, message):
+        """Merge 'review_hash' into 'fq_branch_name', discarding all changes.
+
+        The archive branch is created if it doesn't exist yet. This is done
+        by writing the commits directly, without a checkout.
+
+        """
+        archive_hash = self.resolve_ref(fq_branch_name)
+        if archive_hash is None:
+            empty_tree = self(
+                'hash-object', '-t', 'tree', '-w', '--stdin', stdin='')
+            archive_hash = phlgit_commit.commit_tree(
+                self, empty_tree.strip(), [], initial_message)
+            old_hash = ''
         else:
-            phlgit_checkout.orphan_clean(self, short_branch_name)
-            phlgit_commit.allow_empty(self, initial_message)
+            old_hash = archive_hash
+
+        # like 'git merge -s ours', the tree stays the same as the archive
+        merge_hash = phlgit_commit.commit_tree(
+            self,
+            archive_hash + '^{tree}',
+            [archive_hash, review_hash],
+            message)
+
+        self('update-ref', fq_branch_name, merge_hash, old_hash)
 
     def archive_to_landed(
             self, review_hash, review_branch, base_branch, land_hash, message):
@@ -242,23 +306,23 @@ class Repo(object):
         :returns: None
 
         """
-        self._checkout_archive_ref_branch(
-            _ARCYD_LANDED_BRANCH,
-            ARCYD_LANDED_BRANCH_FQ,
-            _LANDED_ARCHIVE_BRANCH_MESSAGE)
-
         new_message = "landed {} on {} as {}\n\nwith message:\n{}".format(
             review_branch, base_branch, land_hash, message)
 
-        phlgit_merge.ours(self, review_hash, new_message)
+        self._archive(
+            ARCYD_LANDED_BRANCH_FQ,
+            _LANDED_ARCHIVE_BRANCH_MESSAGE,
+            review_hash,
+            new_message)
 
     def push_landed(self):
-        """Push the 'landed' archive branch to the remote.
+        """Push the 'landed' archive branch to the remote, or queue it.
 
         :returns: None
 
         """
-        self.push_asymmetrical(ARCYD_LANDED_BRANCH_FQ, ARCYD_LANDED_REF)
+        self._push_or_queue(
+            ARCYD_LANDED_REF, ARCYD_LANDED_BRANCH_FQ + ':' + ARCYD_LANDED_REF)
 
     def archive_to_abandoned(
             self, review_hash, review_branch, base_branch):
@@ -270,25 +334,24 @@ class Repo(object):
         :returns: None
 
         """
-        # get on the archive branch, create new orphan if necessary
-        self._checkout_archive_ref_branch(
-            _ARCYD_ABANDONED_BRANCH,
-            ARCYD_ABANDONED_BRANCH_FQ,
-            _ABANDONED_ARCHIVE_BRANCH_MESSAGE)
-
         new_message = "abandoned {}, branched from {}".format(
             review_branch, base_branch)
 
-        phlgit_merge.ours(self, review_hash, new_message)
+        self._archive(
+            ARCYD_ABANDONED_BRANCH_FQ,
+            _ABANDONED_ARCHIVE_BRANCH_MESSAGE,
+            review_hash,
+            new_message)
 
     def push_abandoned(self):
-        """Push the 'abandoned' archive branch to the remote.
+        """Push the 'abandoned' archive branch to the remote, or queue it.
 
         :returns: None
 
         """
-        self.push_asymmetrical(
-            ARCYD_ABANDONED_BRANCH_FQ, ARCYD_ABANDONED_REF)
+        self._push_or_queue(
+            ARCYD_ABANDONED_REF,
+            ARCYD_ABANDONED_BRANCH_FQ + ':' + ARCYD_ABANDONED_REF)
 
     def push_asymmetrical(self, local_branch, remote_branch):
         """Push 'local_branch' as 'remote_branch' to the remote.
@@ -310,15 +373,160 @@ class Repo(object):
         """
         phlgit_push.push(self, branch, self._remote)
 
+    def push_asymmetrical_force(self, local_branch, remote_branch):
+        """Force push 'local_branch' as 'remote_branch', or queue it.
+
+        :local_branch: string name of the branch to push
+        :remote_branch: fully qualified string name of the ref on the remote
+        :returns: None
+
+        """
+        self._push_or_queue(
+            remote_branch, '+' + local_branch + ':' + remote_branch)
+
+    def move_asymmetrical(self, local_branch, old_remote, new_remote):
+        """Delete 'old_remote', push 'local_branch' to 'new_remote', or queue.
+
+        :local_branch: string name of the branch to push
+        :old_remote: fully qualified string name of the ref to delete
+        :new_remote: fully qualified string name of the ref to push to
+        :returns: None
+
+        """
+        self._push_or_queue(
+            new_remote, local_branch + ':' + new_remote,
+            old_remote, ':' + old_remote)
+
     def push_delete(self, branch, *args):
-        """Delete 'branch' from the remote.
+        """Delete 'branch' from the remote, or queue it.
 
         :branch: string name of the branch
         :*args: (optional) more string names of branches
         :returns: None
 
         """
-        phlgit_push.delete(self, self._remote, branch, *args)
+        dst_refspec_list = []
+        for name in (branch,) + args:
+            ref = phlgitu_ref.make_local(name)
+            dst_refspec_list += [ref, ':' + ref]
+        self._push_or_queue(*dst_refspec_list)
+
+    @contextlib.contextmanager
+    def push_batch_context(self):
+        """Queue pushes of trackers, deletes and archives, push them at the end.
+
+        Rather than talk to the remote for each of these, the refspecs are
+        pushed all at once with 'git push --atomic' when the context exits.
+        Later pushes to the same ref replace earlier ones. Pushes via
+        'push_asymmetrical' and 'push' are not affected, so that landing is
+        immediate. The methods that may queue say so in their docstrings.
+
+        If any refs are rejected then the others are pushed again without
+        '--atomic', so that one bad ref doesn't hold up the others.
+        phlgit_push.PushRejectedException is raised with the refs that are
+        still rejected. Rejections of the archive refs are only logged, the
+        archives are for reference and failing to push them isn't a reason
+        to stop processing the repo.
+
+        If the body of the context raises then the queue is still pushed, but
+        a failure to push is only logged so that the original exception isn't
+        replaced.
+
+        See 'flush_push_batch' to push the queue before the context exits.
+
+        :returns: None
+
+        """
+        assert self._push_queue is None
+        self._push_queue = collections.OrderedDict()
+        try:
+            yield
+        except BaseException:
+            exc_info = sys.exc_info()
+            try:
+                self._end_push_batch()
+            except Exception:
+                _LOGGER.error(
+                    "{}: failed to push batch while handling another "
+                    "error".format(self._description),
+                    exc_info=1)
+            raise exc_info[0], exc_info[1], exc_info[2]
+        else:
+            self._end_push_batch()
+
+    def flush_push_batch(self):
+        """Push the refspecs queued so far by 'push_batch_context', if any.
+
+        The context carries on queueing afterwards. Errors are raised as for
+        the end of the context. Outside of the context this does nothing.
+
+        :returns: None
+
+        """
+        if self._push_queue:
+            refspec_list = self._push_queue.values()
+            self._push_queue.clear()
+            self._push_batch(refspec_list)
+
+    def _end_push_batch(self):
+        try:
+            self.flush_push_batch()
+        finally:
+            self._push_queue = None
+
+    def _push_or_queue(self, *dst_refspec_list):
+        """Push or queue refspecs, supplied as pairs of (dst_ref, refspec)."""
+        pairs = zip(dst_refspec_list[::2], dst_refspec_list[1::2])
+        if self._push_queue is None:
+            self._push_batch([refspec for _, refspec in pairs])
+        else:
+            for dst_ref, refspec in pairs:
+                self._push_queue.pop(dst_ref, None)
+                self._push_queue[dst_ref] = refspec
+
+    def _push_batch(self, refspec_list):
+        result_list = abdt_tryloop.tryloop(
+            lambda: phlgit_push.push_porcelain(
+                self, self._remote, refspec_list, '--atomic'),
+            abdt_errident.PUSH_BATCH,
+            self._description)
+
+        rejected_list = [
+            r for r in result_list
+            if r.flag == phlgit_push.REJECTED_FLAG and
+            r.summary != phlgit_push.ATOMIC_FAILED_SUMMARY
+        ]
+        if not rejected_list:
+            return
+
+        rejected_refs = set(r.to_ref for r in rejected_list)
+        retry_list = [
+            refspec for refspec in refspec_list
+            if refspec.split(':', 1)[1] not in rejected_refs
+        ]
+        if retry_list:
+            result_list = phlgit_push.push_porcelain(
+                self, self._remote, retry_list)
+            rejected_list += [
+                r for r in result_list
+                if r.flag == phlgit_push.REJECTED_FLAG
+            ]
+
+        # don't worry if we can't push the archives, this is most likely a
+        # permissioning issue but not a showstopper
+        archive_rejected_list = [
+            r for r in rejected_list if r.to_ref in _ARCHIVE_REFS
+        ]
+        if archive_rejected_list:
+            _LOGGER.warning("{}: failed to push archives: {}".format(
+                self._description,
+                phlgit_push.PushRejectedException(archive_rejected_list)))
+
+        rejected_list = [
+            r for r in rejected_list if r.to_ref not in _ARCHIVE_REFS
+        ]
+        if rejected_list:
+            raise phlgit_push.PushRejectedException(rejected_list)
 
     def checkout_master_fetch_prune(self):
         """Checkout master, fetch from the remote and prune branches.
@@ -348,8 +556,8 @@ class Repo(object):
         If the diff would exceed the pre-specified max diff size then take
         measures to reduce the diff.
 
-        Potentially checkout onto the 'to_branch' so that changes to
-        .gitattributes files will be considered.
+        Changes to .gitattributes files on the 'to_branch' will be
+        considered, without checking it out.
 
         :from_branch: string name of the merge-base of 'branch'
         :to_branch: string name of the branch to diff
@@ -360,6 +568,33 @@ class Repo(object):
         return self._differ_cache.checkout_make_raw_diff(
             from_branch, to_branch, max_diff_size_utf8_bytes)
 
+    def resolve_ref(self, ref):
+        """Return the string sha1 of the object named by 'ref', or None.
+
+        :ref: the string name of the object, e.g. 'origin/master', 'ed3a1'
+        :returns: the string sha1 of the object, or None if there's no object
+
+        """
+        return self._repo.resolve_ref(ref)
+
+    def read_blob(self, ref):
+        """Return the string content of the blob named by 'ref'.
+
+        :ref: the string name of the blob, e.g. 'origin/master:README'
+        :returns: the string content of the blob
+
+        """
+        return self._repo.read_blob(ref)
+
+    def read_commit(self, ref):
+        """Return a phlsys_git.Commit for the commit named by 'ref'.
+
+        :ref: the string name of the commit, e.g. 'origin/master', 'ed3a1'
+        :returns: a phlsys_git.Commit
+
+        """
+        return self._repo.read_commit(ref)
+
     def _log_read_call(self, args, kwargs):
         with abdt_logging.remote_io_read_event_context(
                 'git-{}'.format(args[0]),
@@ -8,10 +8,25 @@
 # Concerns:
 # [ B] changes to review branches can be detected when creating 'Branch'-es
 # [ A] can create archive refs without error
+# [ C] landing makes a commit squashing the branch onto the base
+# [ C] landing conflicts are reported as LanderException
+# [ C] landing and archiving don't touch the working tree or current branch
+# [ D] batched pushes aren't made until the batch context exits
+# [ D] batched pushes are made with a single 'git push'
+# [ D] rejected refs are reported and don't hold up the others
+# [ D] errors in the batch context aren't replaced by failures to push
+# [ D] rejected archives are logged rather than raised, batched or not
+# [ E] landing with git older than 2.38 squashes in the working tree instead
+# [ E] landing conflicts with older git leave the working tree clean
+# [ F] trackers of new reviews are pushed before the end of the batch
 # -----------------------------------------------------------------------------
 # Tests:
 # [ A] test_A_Breathing
 # [ B] test_B_RawDiffNewCommits
+# [ C] test_C_LandWithoutCheckout
+# [ D] test_D_BatchedPushes
+# [ E] test_E_LandWithOldGit
+# [ F] test_F_NewReviewTrackerNotBatched
 # =============================================================================
 
 from __future__ import absolute_import
@@ -35,8 +50,10 @@ import abdt_branch
 import abdt_classicnaming
 import abdt_differresultcache
 import abdt_git
+import abdt_lander
 import abdt_naming
 import abdt_rbranchnaming
+import abdt_tryloop
 
 
 class Test(unittest.TestCase):
@@ -175,6 +192,248 @@ class Test(unittest.TestCase):
         branch.mark_ok_in_review()
         self.assertIs(branch.has_new_commits(), False)
 
+    def test_C_LandWithoutCheckout(self):
+        dev = self.repos.w0
+        dev.commit_new_file('add conflict file', 'conflict', 'base\n')
+        dev.commit_new_file_on_new_branch(
+            'feature', 'add feature', 'feature_file', 'feature\n')
+        dev.checkout_master()
+        self.repo_dev('checkout', '-b', 'conflicting')
+        dev.commit_append_to_file('conflict', 'conflict', 'conflicting\n')
+        dev.checkout_master()
+        dev.commit_append_to_file('change', 'conflict', 'master\n')
+        self.repo_dev('push', 'origin', 'master', 'feature', 'conflicting')
+
+        self.repo_arcyd('fetch', 'origin')
+        head = self.repo_arcyd('rev-parse', '--symbolic-full-name', 'HEAD')
+        head_hash = self.repo_arcyd('rev-parse', 'HEAD')
+
+        def assert_working_tree_untouched():
+            self.assertEqual(
+                head,
+                self.repo_arcyd(
+                    'rev-parse', '--symbolic-full-name', 'HEAD'))
+            self.assertEqual(head_hash, self.repo_arcyd('rev-parse', 'HEAD'))
+            self.assertEqual('', self.repo_arcyd('status', '--porcelain'))
+
+        # [ C] landing makes a commit squashing the branch onto the base
+        landing_hash, summary = abdt_lander.squash(
+            self.repo_arcyd,
+            'origin/master',
+            'origin/feature',
+            'Land Author',
+            'land@example.com',
+            'land feature  \n\n\nbody\n')
+        self.assertEqual(
+            self.repo_arcyd('rev-parse', 'origin/master'),
+            self.repo_arcyd('rev-parse', landing_hash + '^'))
+        self.assertEqual(
+            'Land Author <land@example.com>\nland feature\n\nbody\n\n',
+            self.repo_arcyd(
+                'log', '-1', '--format=%an <%ae>%n%B', landing_hash))
+        self.assertEqual(
+            'feature\n',
+            self.repo_arcyd('show', landing_hash + ':feature_file'))
+        self.assertIn('feature_file', summary)
+
+        # [ C] landing conflicts are reported as LanderException
+        with self.assertRaises(abdt_lander.LanderException):
+            abdt_lander.squash(
+                self.repo_arcyd,
+                'origin/master',
+                'origin/conflicting',
+                'Land Author',
+                'land@example.com',
+                'land conflicting')
+
+        self.repo_arcyd.archive_to_landed(
+            self.repo_arcyd.resolve_ref('origin/feature'),
+            'feature',
+            'master',
+            landing_hash,
+            'land feature')
+        self.repo_arcyd.archive_to_abandoned(
+            self.repo_arcyd.resolve_ref('origin/conflicting'),
+            'conflicting',
+            'master')
+
+        # the archives keep their own empty tree and merge in the branches
+        for fq_branch, branch in [
+                (abdt_git.ARCYD_LANDED_BRANCH_FQ, 'origin/feature'),
+                (abdt_git.ARCYD_ABANDONED_BRANCH_FQ, 'origin/conflicting')]:
+            self.assertEqual(
+                '', self.repo_arcyd('ls-tree', fq_branch))
+            self.assertEqual(
+                self.repo_arcyd('rev-parse', branch).strip(),
+                self.repo_arcyd('rev-parse', fq_branch + '^2').strip())
+
+        # [ C] landing and archiving don't touch the working tree or current
+        #      branch
+        assert_working_tree_untouched()
+
+    def test_D_BatchedPushes(self):
+        dev = self.repos.w0
+        dev.commit_new_file('add file', 'file')
+        self.repo_dev('push', 'origin', 'master:one', 'master:two')
+        self.repo_dev('checkout', '-b', 'ahead')
+        dev.commit_new_file('add ahead file', 'ahead_file')
+        self.repo_dev('push', 'origin', 'ahead')
+        self.repo_arcyd('fetch', 'origin')
+
+        def remote_refs():
+            return self.repo_central('for-each-ref', '--format=%(refname)')
+
+        push_count = [0]
+        original_call = self.repo_arcyd._repo
+
+        def counting_call(*args, **kwargs):
+            if args and args[0] == 'push':
+                push_count[0] += 1
+            return original_call(*args, **kwargs)
+
+        self.repo_arcyd._repo = counting_call
+
+        with self.repo_arcyd.push_batch_context():
+            self.repo_arcyd.push_delete('one')
+            self.repo_arcyd.push_asymmetrical_force(
+                'origin/master', 'refs/heads/tracker')
+            self.repo_arcyd.move_asymmetrical(
+                'origin/master', 'refs/heads/tracker', 'refs/heads/moved')
+
+            # [ D] batched pushes aren't made until the batch context exits
+            self.assertIn('refs/heads/one', remote_refs())
+            self.assertEqual(0, push_count[0])
+
+        # [ D] batched pushes are made with a single 'git push'
+        self.assertEqual(1, push_count[0])
+        self.assertNotIn('refs/heads/one', remote_refs())
+        self.assertNotIn('refs/heads/tracker', remote_refs())
+        self.assertIn('refs/heads/moved', remote_refs())
+
+        # [ D] rejected refs are reported and don't hold up the others
+        with self.assertRaises(phlgit_push.PushRejectedException) as context:
+            with self.repo_arcyd.push_batch_context():
+                self.repo_arcyd.push_delete('two')
+                self.repo_arcyd.move_asymmetrical(
+                    'origin/master', 'refs/heads/moved', 'refs/heads/ahead')
+        self.assertEqual(
+            ['refs/heads/ahead'],
+            [r.to_ref for r in context.exception.rejected_result_list])
+        self.assertNotIn('refs/heads/two', remote_refs())
+        self.assertNotIn('refs/heads/moved', remote_refs())
+
+        # [ D] errors in the batch context aren't replaced by failures to push
+        self.repo_dev('push', 'origin', 'master:three')
+
+        class _ContextError(Exception):
+            pass
+
+        with self.assertRaises(_ContextError):
+            with self.repo_arcyd.push_batch_context():
+                self.repo_arcyd.push_delete('three')
+                self.repo_arcyd.push_asymmetrical_force(
+                    'origin/master', 'refs/heads/tracker')
+                self.repo_arcyd.move_asymmetrical(
+                    'origin/master', 'refs/heads/tracker', 'refs/heads/ahead')
+                raise _ContextError()
+        self.assertNotIn('refs/heads/three', remote_refs())
+
+        # [ D] rejected archives are logged rather than raised, batched or not
+        self.repo_arcyd._repo = original_call
+        self.repo_dev(
+            'push', 'origin', 'master:four', 'master:refs/arcyd/landed')
+        self.repo_arcyd.archive_to_landed(
+            self.repo_arcyd.resolve_ref('origin/master'),
+            'four',
+            'master',
+            'LANDHASH',
+            'MESSAGE')
+        with self.repo_arcyd.push_batch_context():
+            self.repo_arcyd.push_landed()
+            self.repo_arcyd.push_delete('four')
+        self.assertNotIn('refs/heads/four', remote_refs())
+        self.repo_arcyd.push_landed()
+        self.assertEqual(
+            self.repo_dev('rev-parse', 'master'),
+            self.repo_central('rev-parse', 'refs/arcyd/landed'))
+
+    def test_E_LandWithOldGit(self):
+        dev = self.repos.w0
+        dev.commit_new_file('add conflict file', 'conflict', 'base\n')
+        dev.commit_new_file_on_new_branch(
+            'feature', 'add feature', 'feature_file', 'feature\n')
+        dev.checkout_master()
+        self.repo_dev('checkout', '-b', 'conflicting')
+        dev.commit_append_to_file('conflict', 'conflict', 'conflicting\n')
+        dev.checkout_master()
+        dev.commit_append_to_file('change', 'conflict', 'master\n')
+        self.repo_dev('push', 'origin', 'master', 'feature', 'conflicting')
+        self.repo_arcyd('fetch', 'origin')
+
+        # pretend that 'git merge-tree --write-tree' isn't available
+        is_write_tree_supported = phlgit_merge._IS_WRITE_TREE_SUPPORTED
+        phlgit_merge._IS_WRITE_TREE_SUPPORTED = False
+        try:
+            # [ E] landing with git older than 2.38 squashes in the working
+            #      tree instead
+            landing_hash, summary = abdt_lander.squash(
+                self.repo_arcyd,
+                'origin/master',
+                'origin/feature',
+                'Land Author',
+                'land@example.com',
+                'land feature')
+            self.assertEqual(
+                self.repo_arcyd('rev-parse', 'origin/master'),
+                self.repo_arcyd('rev-parse', landing_hash + '^'))
+            self.assertEqual(
+                'Land Author <land@example.com>\nland feature\n\n',
+                self.repo_arcyd(
+                    'log', '-1', '--format=%an <%ae>%n%B', landing_hash))
+            self.assertEqual(
+                'feature\n',
+                self.repo_arcyd('show', landing_hash + ':feature_file'))
+            self.assertIn('feature_file', summary)
+
+            # [ E] landing conflicts with older git leave the working tree
+            #      clean
+            with self.assertRaises(abdt_lander.LanderException):
+                abdt_lander.squash(
+                    self.repo_arcyd,
+                    'origin/master',
+                    'origin/conflicting',
+                    'Land Author',
+                    'land@example.com',
+                    'land conflicting')
+            self.assertEqual('', self.repo_arcyd('status', '--porcelain'))
+        finally:
+            phlgit_merge._IS_WRITE_TREE_SUPPORTED = is_write_tree_supported
+
+    def test_F_NewReviewTrackerNotBatched(self):
+        _, branch_name, branch = self._setup_for_untracked_branch()
+        remote_url = self.repo_arcyd('remote', 'get-url', 'origin').strip()
+
+        # don't wait to retry pushing to a remote that isn't there
+        tryloop = abdt_tryloop.tryloop
+        abdt_tryloop.tryloop = lambda f, identifier, detail: f()
+        try:
+            with self.assertRaises(Exception):
+                with self.repo_arcyd.push_batch_context():
+                    branch.mark_ok_new_review(101)
+
+                    # the remote becomes unreachable, so the end of the batch
+                    # fails to push
+                    self.repo_arcyd(
+                        'remote', 'set-url', 'origin', '/no/such/remote')
+                    branch.mark_ok_in_review()
+        finally:
+            abdt_tryloop.tryloop = tryloop
+            self.repo_arcyd('remote', 'set-url', 'origin', remote_url)
+
+        # [ F] trackers of new reviews are pushed before the end of the batch
+        branch = self._get_updated_branch(branch_name)
+        self.assertEqual(101, branch.review_id_or_none())
+
     def _setup_for_tracked_branch(self):
         base, branch_name, branch = self._setup_for_untracked_branch()
         branch.mark_ok_new_review(101)
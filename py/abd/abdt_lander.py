@@ -1,15 +1,18 @@
 """Callables for re-integrating branches upstream.
 
 This component provides a number of 'landers', which will re-integrate a
-feature branch back into the current branch, which is assumed to be upstream.
+feature branch back into a base branch, which is assumed to be upstream.
 
-In other words, the 'landers' land a supplied branch on the current branch.
+In other words, the 'landers' land a supplied branch on the base branch.
 
 Landers have the interface:
-    def lander(repo, feature, author_name, author_email, message)
+    def lander(repo, base, feature, author_name, author_email, message)
 
-On success the lander will return a string summary of the landing operation
-for a human to review.
+Landers don't use the working tree and don't update any refs, the new commit
+is only written to the object store. It's up to the caller to push it.
+
+On success the lander will return a tuple of the string sha1 of the new
+commit and a string summary of the landing operation for a human to review.
 
 If the lander fails to land then it will raise a LanderException with details
 of the failure.
@@ -43,10 +46,11 @@ class LanderException(Exception):
         super(LanderException, self).__init__(description)
 
 
-def squash(repo, source, author_name, author_email, message):
-    """Return the string output of squashing 'source' into current branch."""
+def squash(repo, base, source, author_name, author_email, message):
+    """Return (sha1, summary) of a commit squashing 'source' onto 'base'."""
     try:
-        result = repo.squash_merge(
+        landing_hash = repo.squash_merge(
+            base,
             source,
             message,
             author_name,
@@ -54,7 +58,7 @@ def squash(repo, source, author_name, author_email, message):
     except phlgit_merge.MergeException as e:
         raise LanderException(e)
 
-    return result
+    return landing_hash, repo.describe_commit(landing_hash, base)
 
 
 # -----------------------------------------------------------------------------
@@ -12,6 +12,12 @@
 #   remote_io_write_event_context
 #   remote_io_read_event_context
 #   misc_operation_event_context
+#   repo_metrics_context
+#   get_metrics
+#
+# Public Assignments:
+#   EVENT_SECONDS_METRIC
+#   EVENT_ERRORS_METRIC
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -24,6 +30,7 @@ from __future__ import print_function
 import contextlib
 import logging
 
+import phlsys_metrics
 import phlsys_subprocess
 import phlsys_timer
 
@@ -31,6 +38,14 @@ import phlsys_timer
 _LOGGER = logging.getLogger(__name__)
 _EXTERNAL_SYSTEM_ERROR_LOGGER = None
 
+# the durations of the events are recorded here, labelled with the repo that
+# is being processed, see 'repo_metrics_context'
+_METRICS = phlsys_metrics.Registry()
+_METRICS_REPO = ''
+
+EVENT_SECONDS_METRIC = 'arcyd_event_seconds'
+EVENT_ERRORS_METRIC = 'arcyd_event_errors_total'
+
 
 def set_external_system_error_logger(logger):
     assert logger
@@ -100,10 +115,16 @@ def _remote_io_event_log_context(kind, identifier, detail, logger):
     timer = phlsys_timer.Timer()
     timer.start()
     result_list = []
+    labels = {'kind': kind, 'event': identifier, 'repo': _METRICS_REPO}
     try:
         yield result_list
+    except BaseException:
+        _METRICS.increment(EVENT_ERRORS_METRIC, labels)
+        raise
     finally:
-        prolog = '{:.3f}s'.format(timer.duration)
+        duration = timer.duration
+        _METRICS.observe(EVENT_SECONDS_METRIC, labels, duration)
+        prolog = '{:.3f}s'.format(duration)
         _log_remote_io_event_to_logger(
             kind, prolog, identifier, detail, result_list, logger)
 
@@ -123,6 +144,38 @@ def misc_operation_event_context(identifier, detail):
         'misc-event', identifier, detail, _LOGGER.debug)
 
 
+@contextlib.contextmanager
+def repo_metrics_context(repo_name):
+    """Record the metrics of events within the context against 'repo_name'.
+
+    The metrics are recorded in a separate registry, which is yielded so that
+    a worker process may pass them back to its parent. They are also merged
+    into the process-wide registry on leaving the context.
+
+    :repo_name: the string name of the repo being processed
+    :returns: a phlsys_metrics.Registry
+
+    """
+    global _METRICS
+    global _METRICS_REPO
+    outer_metrics = _METRICS
+    outer_repo = _METRICS_REPO
+    repo_metrics = phlsys_metrics.Registry()
+    _METRICS = repo_metrics
+    _METRICS_REPO = repo_name
+    try:
+        yield repo_metrics
+    finally:
+        _METRICS = outer_metrics
+        _METRICS_REPO = outer_repo
+        _METRICS.merge_data(repo_metrics.get_data_for_merging())
+
+
+def get_metrics():
+    """Return the process-wide phlsys_metrics.Registry of event metrics."""
+    return _METRICS
+
+
 # -----------------------------------------------------------------------------
 # Copyright (C) 2013-2015 Bloomberg Finance L.P.
 #
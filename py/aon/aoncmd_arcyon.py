@@ -27,6 +27,7 @@ import phlsys_conduit
 import phlsys_makeconduit
 import phlsys_subcommand
 
+import aoncmd_batch
 import aoncmd_comment
 import aoncmd_commentinline
 import aoncmd_createrevision
@@ -67,6 +68,9 @@ usage examples:
 
     to create a diff to pass to arcyon, from within a git repository:
     $ arcyon git-diff-helper base head
+
+    to make many conduit calls in one go, one JSON object per line:
+    $ arcyon batch < calls.jsonl
     """
 
 
@@ -101,6 +105,8 @@ def main():
     phlsys_subcommand.setup_parser(
         "git-diff-helper", aoncmd_gitdiffhelper, subparsers)
 
+    phlsys_subcommand.setup_parser("batch", aoncmd_batch, subparsers)
+
     args = parser.parse_args()
 
     try:
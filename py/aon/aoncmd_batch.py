@@ -0,0 +1,237 @@
+"""make many conduit calls in one go, reading them as JSON lines from stdin.
+
+each line of input is a JSON object describing a single call to conduit, with
+the 'method' to call and optionally the 'params' to pass to it. an 'id' may
+also be supplied, it will be copied to the result. to act as another user for
+a single call, supply 'actAsUser'.
+
+each line of output is a JSON object with the 'result', 'error_code' and
+'error_info' of the call on the same line of input, in the same format as
+conduit. the output is in the same order as the input, even if calls are
+made in parallel with '--jobs'.
+
+with '--jobs' greater than 1 the calls may be made in any order, so the lines
+must be independent of each other. if a call depends on the calls before it,
+e.g. it comments on a revision created by an earlier line, then supply
+'"wait": true' and it will only be made once all the calls on the lines before
+it have finished.
+
+only one process is started and each connection to conduit is only
+authenticated once, so this is much quicker than running arcyon many times.
+the exit status is 1 if any of the calls failed. if a call fails without a
+response from conduit, e.g. the connection was reset, then its 'error_code' is
+'ERR-ARCYON-BATCH' and the rest of the calls are still made.
+
+usage examples:
+    comment on revisions 1 and 2, one after the other:
+    $ arcyon batch <<EOF
+    {"method": "differential.createcomment", "params": {"revision_id": 1, \
+"message": "hello"}}
+    {"method": "differential.createcomment", "params": {"revision_id": 2, \
+"message": "hello"}}
+    EOF
+
+    create a revision and then comment on it, querying up to 4 at a time:
+    $ cat calls.jsonl
+    {"method": "differential.createrevision", "params": {...}}
+    {"method": "differential.query", "params": {"ids": [1]}}
+    {"method": "differential.query", "params": {"ids": [2]}}
+    {"method": "differential.createcomment", "params": {...}, "wait": true}
+    $ arcyon batch --jobs 4 < calls.jsonl
+
+    query several revisions, up to 4 at a time:
+    $ cat calls.jsonl
+    {"id": 1, "method": "differential.query", "params": {"ids": [1]}}
+    {"id": 2, "method": "differential.query", "params": {"ids": [2]}}
+    $ arcyon batch --jobs 4 < calls.jsonl
+    {"error_code": null, "error_info": null, "id": 1, "result": [...]}
+    {"error_code": null, "error_info": null, "id": 2, "result": [...]}
+
+    a line that couldn't be processed:
+    $ echo '{"params": {}}' | arcyon batch
+    {"error_code": "ERR-ARCYON-BATCH", "error_info": "no 'method' ...", ...}
+
+"""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# aoncmd_batch
+#
+# Public Functions:
+#   getFromfilePrefixChars
+#   setupParser
+#   process
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import multiprocessing.pool
+import sys
+import threading
+
+import phlsys_conduit
+import phlsys_makeconduit
+
+_BATCH_ERROR = 'ERR-ARCYON-BATCH'
+
+
+def getFromfilePrefixChars():
+    return ""
+
+
+def setupParser(parser):
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        metavar='INT',
+        default=1,
+        help="the most calls to make at once, each needs its own session "
+             "with conduit. note that Phabricator allows 5 sessions per "
+             "user by default. the default is %(default)s, i.e. one call "
+             "at a time. with more than one job the calls may be made in "
+             "any order, supply '\"wait\": true' on lines that depend on "
+             "the lines before them.")
+    phlsys_makeconduit.add_argparse_arguments(parser)
+
+
+def process(args):
+    if args.jobs < 1:
+        print("error: --jobs must be at least 1", file=sys.stderr)
+        return 1
+
+    uri, user, cert, _ = phlsys_makeconduit.get_uri_user_cert_explanation(
+        args.uri, args.user, args.cert)
+    conduit = phlsys_conduit.MultiConduit(
+        uri, user, cert, args.act_as_user, max_sessions=args.jobs)
+
+    finished_count = [0]
+    finished_condition = threading.Condition()
+
+    def call(line):
+        try:
+            return _call_conduit(conduit, line)
+        finally:
+            with finished_condition:
+                finished_count[0] += 1
+                finished_condition.notify_all()
+
+    def read_lines():
+        # read lines as they arrive, rather than waiting for a full buffer
+        started_count = 0
+        for line in iter(sys.stdin.readline, ''):
+            if _is_wait_requested(line):
+                with finished_condition:
+                    while finished_count[0] < started_count:
+                        finished_condition.wait()
+            started_count += 1
+            yield line
+
+    pool = multiprocessing.pool.ThreadPool(args.jobs)
+    is_any_error = False
+    try:
+        for response in pool.imap(call, read_lines()):
+            is_any_error = is_any_error or response['error_code'] is not None
+            print(json.dumps(response, sort_keys=True))
+            sys.stdout.flush()
+        pool.close()
+    finally:
+        pool.terminate()
+
+    return 1 if is_any_error else 0
+
+
+def _is_wait_requested(line):
+    """Return True if the JSON 'line' asks to wait for the calls before it.
+
+    Lines that can't be parsed don't wait, '_call_conduit' reports them.
+
+        >>> _is_wait_requested('{"method": "conduit.ping", "wait": true}')
+        True
+        >>> _is_wait_requested('{"method": "conduit.ping"}')
+        False
+        >>> _is_wait_requested('[1, 2]')
+        False
+        >>> _is_wait_requested('not json')
+        False
+
+    :line: a string of the JSON object describing the call
+    :returns: True if the call must wait
+
+    """
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return False
+    return isinstance(request, dict) and bool(request.get('wait', False))
+
+
+def _call_conduit(conduit, line):
+    """Return the response dict for the call described by JSON 'line'.
+
+    :conduit: the phlsys_conduit.MultiConduit to call
+    :line: a string of the JSON object describing the call
+    :returns: a dict with 'result', 'error_code' and 'error_info' and 'id'
+
+    """
+    response = {
+        'id': None,
+        'result': None,
+        'error_code': None,
+        'error_info': None,
+    }
+
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("each line must be a JSON object")
+        response['id'] = request.get('id', None)
+        method = request.get('method', None)
+        params = request.get('params', {})
+        act_as_user = request.get('actAsUser', None)
+        if not method:
+            raise ValueError("no 'method' supplied")
+        if not isinstance(params, dict):
+            raise ValueError("'params' must be a JSON object")
+    except ValueError as e:
+        response['error_code'] = _BATCH_ERROR
+        response['error_info'] = str(e)
+        return response
+
+    try:
+        if act_as_user:
+            response['result'] = conduit.call_as_user(
+                act_as_user, method, params)
+        else:
+            response['result'] = conduit(method, params)
+    except phlsys_conduit.ConduitException as e:
+        response['error_code'] = e.error
+        response['error_info'] = e.errormsg
+    except Exception as e:
+        # don't let one failed call, e.g. a timeout, stop the whole batch
+        response['error_code'] = _BATCH_ERROR
+        response['error_info'] = repr(e)
+
+    return response
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
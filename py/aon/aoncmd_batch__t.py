@@ -0,0 +1,159 @@
+"""Test suite for aoncmd_batch."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] the result of a successful call is returned with the supplied 'id'
+# [ A] 'actAsUser' calls conduit as that user
+# [ B] lines that aren't JSON objects are reported without calling conduit
+# [ B] lines without a 'method' are reported without calling conduit
+# [ B] 'params' that aren't JSON objects are reported without calling conduit
+# [ C] errors from conduit are returned as conduit reported them
+# [ C] other exceptions are reported as batch errors rather than raised
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] Test.test_A_Breathing
+# [ B] Test.test_B_MalformedLines
+# [ C] Test.test_C_FailedCalls
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import socket
+import unittest
+
+import phlsys_conduit
+
+import aoncmd_batch
+
+
+class _FakeConduit(object):
+
+    def __init__(self):
+        super(_FakeConduit, self).__init__()
+        self.call_list = []
+
+    def __call__(self, method, params):
+        return self.call_as_user(None, method, params)
+
+    def call_as_user(self, user, method, params):
+        self.call_list.append((user, method, params))
+        if method == 'test.fail':
+            raise phlsys_conduit.ConduitException(
+                method, 'ERR-CONDUIT-CALL', 'failed', None, None, None, user)
+        elif method == 'test.timeout':
+            raise socket.timeout('timed out')
+        return {'user': user, 'params': params}
+
+
+def _call(conduit, request):
+    return aoncmd_batch._call_conduit(conduit, json.dumps(request))
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.conduit = _FakeConduit()
+
+    def test_A_Breathing(self):
+
+        # [ A] the result of a successful call is returned with the supplied
+        #      'id'
+        self.assertEqual(
+            {
+                'id': 'first',
+                'result': {'user': None, 'params': {'x': 1}},
+                'error_code': None,
+                'error_info': None,
+            },
+            _call(
+                self.conduit,
+                {'id': 'first', 'method': 'test.echo', 'params': {'x': 1}}))
+
+        response = _call(self.conduit, {'method': 'test.echo'})
+        self.assertIsNone(response['id'])
+        self.assertEqual({'user': None, 'params': {}}, response['result'])
+
+        # [ A] 'actAsUser' calls conduit as that user
+        response = _call(
+            self.conduit,
+            {'id': 3, 'method': 'test.echo', 'actAsUser': 'alice'})
+        self.assertEqual(3, response['id'])
+        self.assertEqual('alice', response['result']['user'])
+
+        self.assertEqual(
+            [
+                (None, 'test.echo', {'x': 1}),
+                (None, 'test.echo', {}),
+                ('alice', 'test.echo', {}),
+            ],
+            self.conduit.call_list)
+
+    def test_B_MalformedLines(self):
+
+        def assert_batch_error(line, expected_id=None):
+            response = aoncmd_batch._call_conduit(self.conduit, line)
+            self.assertEqual('ERR-ARCYON-BATCH', response['error_code'])
+            self.assertTrue(response['error_info'])
+            self.assertIsNone(response['result'])
+            self.assertEqual(expected_id, response['id'])
+
+        # [ B] lines that aren't JSON objects are reported without calling
+        #      conduit
+        assert_batch_error('{"method": ')
+        assert_batch_error('["test.echo"]')
+
+        # [ B] lines without a 'method' are reported without calling conduit
+        assert_batch_error('{"id": 1, "params": {}}', 1)
+
+        # [ B] 'params' that aren't JSON objects are reported without calling
+        #      conduit
+        assert_batch_error('{"id": 2, "method": "test.echo", "params": []}', 2)
+
+        self.assertEqual([], self.conduit.call_list)
+
+    def test_C_FailedCalls(self):
+
+        # [ C] errors from conduit are returned as conduit reported them
+        self.assertEqual(
+            {
+                'id': 1,
+                'result': None,
+                'error_code': 'ERR-CONDUIT-CALL',
+                'error_info': 'failed',
+            },
+            _call(self.conduit, {'id': 1, 'method': 'test.fail'}))
+
+        # [ C] other exceptions are reported as batch errors rather than
+        #      raised
+        self.assertEqual(
+            {
+                'id': 2,
+                'result': None,
+                'error_code': 'ERR-ARCYON-BATCH',
+                'error_info': repr(socket.timeout('timed out')),
+            },
+            _call(self.conduit, {'id': 2, 'method': 'test.timeout'}))
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
@@ -13,6 +13,9 @@ usage examples:
     list all open revisions updated over a week ago
     $ arcyon query --status-type open --update-min-age "1 weeks"
 
+    list every revision updated in the last day, however many there are
+    $ arcyon query --all --update-max-age "1 days"
+
 output formats:
     --format-type ids
         3
@@ -147,6 +150,22 @@ def _setupParserTopLevel(parser):
              'of results, supply an offset of 100.  To see "page 3" of the '
              'results, supply an offset of 200 and so on.  Theres no way to '
              'count the total number of results at present.')
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='fetch every matching revision, a page at a time, printing the '
+             'results of each page as soon as it arrives. memory use does not '
+             'grow with the number of results. not to be used with '
+             '--max-results or --offset-results. note that revisions which '
+             'are modified whilst paging may be missed or repeated. with '
+             '--format-type python each revision is printed separately.')
+    parser.add_argument(
+        '--page-size',
+        type=int,
+        metavar='INT',
+        default=100,
+        help='the number of revisions to fetch at a time with --all, the '
+             'default is %(default)s.')
     parser.add_argument(
         '--order',
         choices=['modified', 'created'],
@@ -275,6 +294,12 @@ def _validate_args(args):
         raise ValidationError(
             "self filter parameters (*-me/mine) not allowed in conjunction " +
             "with --act-as-user due to ambiguity")
+    if args.all and (args.max_results or args.offset_results):
+        raise ValidationError(
+            "--max-results and --offset-results not allowed in conjunction " +
+            "with --all, use --page-size instead")
+    if args.page_size < 1:
+        raise ValidationError("--page-size must be at least 1")
 
 
 def _process_user_fields(me, conduit, args):
@@ -318,6 +343,39 @@ def _set_options(args, d):
 
     if args.status_type:
         d["status"] = "status-" + args.status_type
+    elif args.statuses:
+        # conduit can't filter on specific statuses, narrow the search to the
+        # smallest status type that covers them, we'll filter the rest
+        status_type = _get_status_type_covering(args.statuses)
+        if status_type:
+            d["status"] = "status-" + status_type
+
+
+def _get_status_type_covering(statuses):
+    """Return the narrowest '--status-type' that includes 'statuses', or None.
+
+        >>> _get_status_type_covering(['Needs Review', 'Accepted'])
+        'open'
+
+        >>> _get_status_type_covering(['Abandoned'])
+        'closed'
+
+        >>> _get_status_type_covering(['Closed', 'Accepted']) is None
+        True
+
+    """
+    for status_type, type_statuses in _STATUS_TYPE_TO_STATUSES:
+        if set(statuses).issubset(type_statuses):
+            return status_type
+    return None
+
+
+# from narrowest to widest, 'closed' includes 'Abandoned' in Phabricator
+_STATUS_TYPE_TO_STATUSES = (
+    ('accepted', ['Accepted']),
+    ('open', ['Needs Review', 'Needs Revision', 'Accepted']),
+    ('closed', ['Closed', 'Abandoned']),
+)
 
 
 def process(args):
@@ -332,22 +390,73 @@ def process(args):
 
     d["order"] = 'order-' + args.order
 
-    # perform the query
-    results = conduit("differential.query", d)
+    # perform the query, lazily if fetching all the pages
+    if args.all:
+        pages = _iter_all_pages(conduit, d, args.page_size)
+    else:
+        pages = [conduit("differential.query", d)]
+
+    _output_results(args, _iter_processed_results(args, conduit, pages))
+
+
+def _iter_all_pages(conduit, params, page_size):
+    """Yield each page of results of 'differential.query' with 'params'.
 
-    if args.statuses:
-        results = [r for r in results if r["statusName"] in args.statuses]
+    If revisions are added or modified between pages then the later pages
+    will shift along, revisions from the end of the previous page are not
+    yielded again.
 
-    if args.update_min_age or args.update_max_age:
-        results = _exclude_on_update_age(args, results)
+    """
+    offset = 0
+    previous_ids = set()
+    while True:
+        page_params = dict(params)
+        page_params["limit"] = page_size
+        page_params["offset"] = offset
+        page = conduit("differential.query", page_params)
 
-    if args.translate:
-        # gather user PHIDs
-        _translate_user_phids(conduit, results)
+        yield [r for r in page if r["id"] not in previous_ids]
 
-    _set_human_times(results)
+        if len(page) < page_size:
+            break
+        offset += page_size
+        previous_ids = set(r["id"] for r in page)
 
-    _output_results(args, results)
+
+def _iter_processed_results(args, conduit, pages):
+    """Yield the results from 'pages' which pass the client-side filters.
+
+    Stop fetching pages once the rest can't pass '--update-max-age'.
+
+    """
+    for results in pages:
+
+        # revisions are most recently modified first, once one is too old
+        # then all the following ones are too
+        is_last_page = False
+        if args.update_max_age and args.order == 'modified' and results:
+            is_last_page = _get_update_age(results[-1]) > args.update_max_age
+
+        if args.statuses:
+            results = [r for r in results if r["statusName"] in args.statuses]
+
+        if args.update_min_age or args.update_max_age:
+            results = _exclude_on_update_age(args, results)
+
+        if args.translate:
+            # gather user PHIDs
+            _translate_user_phids(conduit, results)
+
+        _set_human_times(results)
+
+        for r in results:
+            yield r
+
+        # make the results so far visible before waiting on the next page
+        sys.stdout.flush()
+
+        if is_last_page:
+            break
 
 
 def _translate_user_phids(conduit, results):
@@ -374,17 +483,23 @@ def _translate_user_phids(conduit, results):
         r[u"reviewerUsernames"] = [phidToUser[u] for u in r["reviewers"]]
 
 
-def _exclude_on_update_age(args, results):
-    now = datetime.datetime.now()
+def _get_update_age(r):
+    return datetime.datetime.now() - datetime.datetime.fromtimestamp(
+        float(r["dateModified"]))
 
-    def get_age(r):
-        return now - datetime.datetime.fromtimestamp(float(r["dateModified"]))
 
+def _exclude_on_update_age(args, results):
     if args.update_min_age:
-        results = [r for r in results if get_age(r) >= args.update_min_age]
+        results = [
+            r for r in results
+            if _get_update_age(r) >= args.update_min_age
+        ]
 
     if args.update_max_age:
-        results = [r for r in results if get_age(r) <= args.update_max_age]
+        results = [
+            r for r in results
+            if _get_update_age(r) <= args.update_max_age
+        ]
 
     return results
 
@@ -411,10 +526,13 @@ def _output_results(args, results):
         args.format_type = "short"
     if args.format_type:
         if args.format_type == "json":
-            print(json.dumps(
-                results, sort_keys=True, indent=2).encode('utf-8'))
+            _print_json_list(results)
         elif args.format_type == "python":
-            pprint.pprint(results)
+            if args.all:
+                for x in results:
+                    pprint.pprint(x)
+            else:
+                pprint.pprint(list(results))
         elif args.format_type == "short":
             shortTemplate = string.Template("$id / $statusName / $title")
             for x in results:
@@ -432,6 +550,21 @@ def _output_results(args, results):
             print(template.safe_substitute(x).encode('utf-8'))
 
 
+def _print_json_list(results):
+    """Print the 'results' as a JSON list, one result at a time.
+
+    This is equivalent to 'print(json.dumps(list(results), indent=2, ...))'
+    but without holding all the results in memory.
+
+    """
+    separator = '['
+    for x in results:
+        item = json.dumps(x, sort_keys=True, indent=2)
+        print(separator + '\n  ' + item.replace('\n', '\n  '), end='')
+        separator = ', '
+    print('[]' if separator == '[' else '\n]')
+
+
 # -----------------------------------------------------------------------------
 # Copyright (C) 2013-2016 Bloomberg Finance L.P.
 #
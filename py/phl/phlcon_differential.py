@@ -23,6 +23,7 @@
 #   parse_commit_message_errors
 #   create_revision
 #   query
+#   query_states
 #   get_revision_status
 #   update_revision
 #   create_comment
@@ -44,6 +45,7 @@
 #   ParseCommitMessageResponse
 #   RevisionResponse
 #   QueryResponse
+#   QueryStateResponse
 #   GetDiffResponse
 #
 # -----------------------------------------------------------------------------
@@ -54,6 +56,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
 import os
 
 import phlsys_conduit
@@ -201,6 +204,13 @@ QueryResponse = phlsys_namedtuple.make_named_tuple(
     ignored=[])
 
 
+# the few fields of a 'differential.query' response that are needed to track
+# the state of a review, see 'query_states'
+QueryStateResponse = collections.namedtuple(
+    'phlcon_differential__QueryStateResponse',
+    ['id', 'status', 'dateModified', 'authorPHID'])
+
+
 GetDiffResponse = phlsys_namedtuple.make_named_tuple(
     'phlcon_differential__GetDiffResponse',
     required=['changes'],
@@ -298,6 +308,30 @@ def query(
     return query_response_list
 
 
+def query_states(conduit, ids, order=None, limit=None, offset=None):
+    """Return a list of QueryStateResponse for the revisions in 'ids'.
+
+    This is cheaper than 'query' for many revisions, as it ignores all but the
+    fields needed to track their state.
+
+    :conduit: conduit to operate on
+    :ids: a list of integer revision ids
+    :order: (optional) string order of the results, e.g. 'order-modified'
+    :limit: (optional) the maximum integer number of results to return
+    :offset: (optional) the integer number of results to skip
+    :returns: a list of QueryStateResponse
+
+    """
+    d = phlsys_dictutil.copy_dict_no_nones({
+        'ids': ids, 'order': order, 'limit': limit, 'offset': offset})
+    response = conduit("differential.query", d)
+    return [
+        QueryStateResponse(
+            int(r['id']), int(r['status']), r['dateModified'], r['authorPHID'])
+        for r in response
+    ]
+
+
 def get_revision_status(conduit, id):
     return query(conduit, [int(id)])[0].status
 
@@ -8,8 +8,15 @@
 #   ReviewStateCache
 #    .get_state
 #    .refresh_active_reviews
+#    .prefetch_states
 #    .active_reviews
 #    .merge_additional_active_reviews
+#    .get_known_states
+#    .reset_known_states
+#    .get_author_phid
+#    .get_known_author_phids
+#    .merge_author_phids
+#    .forget_author_phid
 #
 # Public Functions:
 #   make_from_conduit
@@ -33,24 +40,71 @@ ReviewState = collections.namedtuple(
     'phlcon_reviewstatecache__ReviewState',
     ['status', 'date_modified'])
 
+# keep the size of each request bounded, however many reviews are active
+_MAX_IDS_PER_QUERY = 100
+
+# when refreshing reviews that we already know the state of, they're fetched
+# in pages of this size, most recently modified first, until we reach those
+# which haven't been modified since the last refresh
+_MODIFIED_PAGE_SIZE = 20
+
 
 def make_from_conduit(conduit):
 
     def revision_list_status(revision_list):
-        return phlcon_differential.query(conduit, revision_list)
+        return phlcon_differential.query_states(conduit, revision_list)
+
+    def revision_list_status_by_modified(revision_list, limit, offset):
+        return phlcon_differential.query_states(
+            conduit,
+            revision_list,
+            order='order-modified',
+            limit=limit,
+            offset=offset)
 
-    return ReviewStateCache(revision_list_status)
+    return ReviewStateCache(
+        revision_list_status, revision_list_status_by_modified)
 
 
 class ReviewStateCache(object):
 
-    def __init__(self, status_callable):
+    def __init__(self, status_callable, modified_status_callable=None):
+        """Initialise to retrieve states with the supplied callables.
+
+        If 'modified_status_callable' is supplied then refreshes only
+        retrieve the known reviews which have been modified since the last
+        refresh.
+
+        :status_callable: returns responses for a list of revision ids
+        :modified_status_callable: like 'status_callable' but also takes
+            'limit' and 'offset', returns the most recently modified first
+        :returns: None
+
+        """
         super(ReviewStateCache, self).__init__()
         self._review_to_state = {}
         self._active_reviews = set()
         self._revision_list_status_callable = status_callable
+        self._modified_status_callable = modified_status_callable
+
+        # the latest 'dateModified' seen at the refresh before last, reviews
+        # that were modified since then will have the same or later dates.
+        #
+        # we don't use the latest from the last refresh because that's made
+        # of several queries, a review may be modified after we've queried it
+        # but before the last query, which may return a later date. a review
+        # may also be modified while we're paging through and so move from a
+        # later page to an earlier one. lagging a whole refresh behind means
+        # the windows overlap, so we'll see such changes at the next refresh.
+        self._date_modified_cursor = None
+        self._latest_date_modified = None
+
+        # authors don't change unless the revision is commandeered, so these
+        # are kept when the states are refreshed
+        self._review_to_author_phid = {}
 
     def _make_state(self, response):
+        self._review_to_author_phid[response.id] = response.authorPHID
         return ReviewState(response.status, response.dateModified)
 
     def get_state(self, review_id):
@@ -64,14 +118,76 @@ class ReviewStateCache(object):
 
     def refresh_active_reviews(self):
         assert self._revision_list_status_callable
-        self._review_to_state = {}
-        if self._active_reviews:
-            responses = self._revision_list_status_callable(
-                list(self._active_reviews))
-            self._review_to_state = {
-                r.id: self._make_state(r) for r in responses
+        is_incremental = (
+            self._modified_status_callable is not None and
+            self._date_modified_cursor is not None)
+
+        # we can only skip the reviews that we already know the state of
+        review_to_state = {}
+        unknown_reviews = self._active_reviews
+        if is_incremental:
+            review_to_state = {
+                i: self._review_to_state[i]
+                for i in self._active_reviews
+                if i in self._review_to_state
             }
-            self._active_reviews = set()
+            unknown_reviews = self._active_reviews - set(review_to_state)
+
+        responses = self._query_states(unknown_reviews)
+        if is_incremental:
+            for chunk in _iter_chunks(sorted(review_to_state)):
+                responses += self._query_modified_since_cursor(chunk)
+
+        for r in responses:
+            review_to_state[r.id] = self._make_state(r)
+
+        if self._modified_status_callable is not None:
+            latest = self._latest_date_modified
+            if responses:
+                latest = max(int(r.dateModified) for r in responses)
+                if self._latest_date_modified is not None:
+                    latest = max(latest, self._latest_date_modified)
+            self._date_modified_cursor = self._latest_date_modified
+            self._latest_date_modified = latest
+
+        self._review_to_state = review_to_state
+        self._active_reviews = set()
+
+    def prefetch_states(self, review_id_set):
+        """Retrieve the states of the reviews that aren't known, all at once.
+
+        This is much cheaper than retrieving each of them with 'get_state'.
+        Note that the reviews are not made active, 'get_state' does that.
+
+        :review_id_set: a set of the review ids to get the states of
+        :returns: None
+
+        """
+        assert self._revision_list_status_callable
+        unknown_reviews = set(review_id_set) - set(self._review_to_state)
+        for r in self._query_states(unknown_reviews):
+            self._review_to_state[r.id] = self._make_state(r)
+
+    def _query_states(self, review_id_set):
+        responses = []
+        for chunk in _iter_chunks(sorted(review_id_set)):
+            responses += self._revision_list_status_callable(chunk)
+        return responses
+
+    def _query_modified_since_cursor(self, revision_list):
+        responses = []
+        offset = 0
+        while True:
+            page = self._modified_status_callable(
+                revision_list, _MODIFIED_PAGE_SIZE, offset)
+            modified = [
+                r for r in page
+                if int(r.dateModified) >= self._date_modified_cursor
+            ]
+            responses += modified
+            if len(modified) < _MODIFIED_PAGE_SIZE:
+                return responses
+            offset += len(page)
 
     @property
     def active_reviews(self):
@@ -80,6 +196,80 @@ class ReviewStateCache(object):
     def merge_additional_active_reviews(self, active_review_set):
         self._active_reviews.update(active_review_set)
 
+    def get_known_states(self, review_id_set):
+        """Return a dict of review id to state, for those ids with a state.
+
+        :review_id_set: a set of the review ids to get the states of
+        :returns: a dict of review id to ReviewState
+
+        """
+        return {
+            i: self._review_to_state[i]
+            for i in review_id_set
+            if i in self._review_to_state
+        }
+
+    def reset_known_states(self, review_to_state):
+        """Replace the known states with 'review_to_state', clear active reviews.
+
+        This leaves the cache in the same condition as a fresh copy of a cache
+        which has just had 'refresh_active_reviews' called on it.
+
+        :review_to_state: a dict of review id to ReviewState
+        :returns: None
+
+        """
+        self._review_to_state = dict(review_to_state)
+        self._active_reviews = set()
+
+    def get_author_phid(self, review_id):
+        """Return the PHID of the author of 'review_id', or None if unknown.
+
+        The author is known if the state of the review has been retrieved
+        before, or if it was supplied to 'merge_author_phids'.
+
+        :review_id: the id of the review to get the author of
+        :returns: a string PHID or None
+
+        """
+        return self._review_to_author_phid.get(review_id)
+
+    def get_known_author_phids(self, review_id_set):
+        """Return a dict of review id to author PHID, for the known authors.
+
+        :review_id_set: a set of the review ids to get the authors of
+        :returns: a dict of review id to string PHID
+
+        """
+        return {
+            i: self._review_to_author_phid[i]
+            for i in review_id_set
+            if i in self._review_to_author_phid
+        }
+
+    def merge_author_phids(self, review_to_author_phid):
+        """Remember the authors in 'review_to_author_phid'.
+
+        :review_to_author_phid: a dict of review id to author PHID
+        :returns: None
+
+        """
+        self._review_to_author_phid.update(review_to_author_phid)
+
+    def forget_author_phid(self, review_id):
+        """Forget the author of 'review_id', e.g. after it is commandeered.
+
+        :review_id: the id of the review to forget the author of
+        :returns: None
+
+        """
+        self._review_to_author_phid.pop(review_id, None)
+
+
+def _iter_chunks(item_list):
+    for i in xrange(0, len(item_list), _MAX_IDS_PER_QUERY):
+        yield item_list[i:i + _MAX_IDS_PER_QUERY]
+
 
 # -----------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
@@ -13,12 +13,26 @@
 # [ D] ReviewStateCache retrieves statuses for reviews not queried before
 # [ D] ReviewStateCache does not callable when queried for cached query
 # [ D] ReviewStateCache returns correct value when retrieving cached
+# [ E] ReviewStateCache remembers authors from the retrieved states
+# [ E] ReviewStateCache keeps authors when refreshing and resetting states
+# [ E] ReviewStateCache merges and forgets authors
+# [ F] ReviewStateCache only refreshes known reviews modified since last time
+# [ F] ReviewStateCache refreshes unknown reviews in full
+# [ F] ReviewStateCache refreshes in bounded chunks
+# [ F] ReviewStateCache refreshes in full until a whole refresh has passed
+# [ F] ReviewStateCache sees reviews modified during the last refresh
+# [ G] ReviewStateCache prefetches unknown states in bounded chunks
+# [ G] ReviewStateCache doesn't query prefetched states again
+# [ G] ReviewStateCache doesn't make prefetched reviews active
 # -----------------------------------------------------------------------------
 # Tests:
 # [ A] test_A_Breathing
 # [ B] test_B_MergeAdditionalActiveReviews
 # [ C] test_C_RefreshBeforeGet
 # [ D] test_D_InvalidationRules
+# [ E] test_E_AuthorPhids
+# [ F] test_F_IncrementalRefresh
+# [ G] test_G_Prefetch
 # =============================================================================
 
 from __future__ import absolute_import
@@ -37,7 +51,7 @@ import phlcon_reviewstatecache
 
 FakeResult = collections.namedtuple(
     'phlcon_reviewstatecache__t_FakeResult',
-    ['id', 'status', 'dateModified'])
+    ['id', 'status', 'dateModified', 'authorPHID'])
 
 
 class Test(unittest.TestCase):
@@ -143,7 +157,7 @@ class Test(unittest.TestCase):
             expected_queries[:] = expected_queries[1:]
 
             return [
-                FakeResult(r, str(r) + 'r', str(r) + 'd')
+                FakeResult(r, str(r) + 'r', str(r) + 'd', str(r) + 'a')
                 for r in actual_revision_list
             ]
 
@@ -165,6 +179,149 @@ class Test(unittest.TestCase):
             result = cache_impl.get_state(revision).status
             self.assertEqual(result, str(revision) + 'r')
 
+    def test_E_AuthorPhids(self):
+
+        def fake_callable(revision_list):
+            return [
+                FakeResult(r, 'status', 'date', 'author' + str(r))
+                for r in revision_list
+            ]
+
+        cache = phlcon_reviewstatecache.ReviewStateCache(fake_callable)
+        self.assertIsNone(cache.get_author_phid(1))
+
+        # [ E] ReviewStateCache remembers authors from the retrieved states
+        cache.get_state(1)
+        cache.get_state(2)
+        self.assertEqual('author1', cache.get_author_phid(1))
+
+        # [ E] ReviewStateCache keeps authors when refreshing and resetting
+        #      states
+        cache.refresh_active_reviews()
+        cache.reset_known_states({})
+        self.assertEqual(
+            {1: 'author1', 2: 'author2'},
+            cache.get_known_author_phids(set((1, 2, 3))))
+
+        # [ E] ReviewStateCache merges and forgets authors
+        cache.merge_author_phids({3: 'author3'})
+        cache.forget_author_phid(1)
+        self.assertEqual(
+            {2: 'author2', 3: 'author3'},
+            cache.get_known_author_phids(set((1, 2, 3))))
+
+    def test_F_IncrementalRefresh(self):
+        review_to_modified = {i: i for i in xrange(1, 251)}
+        status_calls = []
+        modified_calls = []
+
+        def make_results(revision_list):
+            return [
+                FakeResult(
+                    r, 'status' + str(review_to_modified[r]),
+                    str(review_to_modified[r]), 'author')
+                for r in revision_list
+            ]
+
+        def status_callable(revision_list):
+            status_calls.append(revision_list)
+            return make_results(revision_list)
+
+        # callables to modify reviews when a chunk is queried
+        on_modified_call = []
+
+        def modified_callable(revision_list, limit, offset):
+            modified_calls.append((revision_list, limit, offset))
+            for modify in on_modified_call:
+                modify(revision_list)
+            ordered = sorted(
+                revision_list, key=lambda r: -review_to_modified[r])
+            return make_results(ordered[offset:offset + limit])
+
+        cache = phlcon_reviewstatecache.ReviewStateCache(
+            status_callable, modified_callable)
+        cache.merge_additional_active_reviews(set(review_to_modified))
+        cache.refresh_active_reviews()
+
+        # [ F] ReviewStateCache refreshes in bounded chunks
+        self.assertEqual([100, 100, 50], [len(c) for c in status_calls])
+        self.assertEqual([], modified_calls)
+
+        # [ F] ReviewStateCache refreshes in full until a whole refresh has
+        #      passed
+        status_calls[:] = []
+        cache.merge_additional_active_reviews(set(review_to_modified))
+        cache.refresh_active_reviews()
+        self.assertEqual([100, 100, 50], [len(c) for c in status_calls])
+        self.assertEqual([], modified_calls)
+
+        for review in (3, 4, 201):
+            review_to_modified[review] = 1000
+        status_calls[:] = []
+        cache.merge_additional_active_reviews(set(review_to_modified) | {251})
+        review_to_modified[251] = 50
+        cache.refresh_active_reviews()
+
+        # [ F] ReviewStateCache refreshes unknown reviews in full
+        self.assertEqual([[251]], status_calls)
+
+        # [ F] ReviewStateCache only refreshes known reviews modified since
+        #      last time
+        self.assertEqual(
+            [0, 0, 0], [offset for _, _, offset in modified_calls])
+        for review in (1, 3, 4, 201, 251):
+            self.assertEqual(
+                'status' + str(review_to_modified[review]),
+                cache.get_state(review).status)
+
+        # modify a review in the first chunk after it's been queried, and one
+        # in the second chunk with a later date
+        def modify_during_refresh(revision_list):
+            if 150 in revision_list:
+                review_to_modified[5] = 1001
+                review_to_modified[150] = 1002
+
+        on_modified_call.append(modify_during_refresh)
+        cache.merge_additional_active_reviews(set(review_to_modified))
+        cache.refresh_active_reviews()
+        del on_modified_call[:]
+        self.assertEqual('status5', cache.get_state(5).status)
+        self.assertEqual('status1002', cache.get_state(150).status)
+
+        # [ F] ReviewStateCache sees reviews modified during the last refresh
+        cache.merge_additional_active_reviews(set(review_to_modified))
+        cache.refresh_active_reviews()
+        self.assertEqual('status1001', cache.get_state(5).status)
+
+    def test_G_Prefetch(self):
+        calls = []
+
+        def fake_callable(revision_list):
+            calls.append(revision_list)
+            return [
+                FakeResult(r, 'status', 'date', 'author')
+                for r in revision_list
+            ]
+
+        cache = phlcon_reviewstatecache.ReviewStateCache(fake_callable)
+        cache.get_state(1)
+        calls[:] = []
+
+        # [ G] ReviewStateCache prefetches unknown states in bounded chunks
+        cache.prefetch_states(set(xrange(1, 252)))
+        self.assertEqual([100, 100, 50], [len(c) for c in calls])
+        self.assertNotIn(1, calls[0])
+
+        # [ G] ReviewStateCache doesn't make prefetched reviews active
+        self.assertEqual(set([1]), cache.active_reviews)
+
+        # [ G] ReviewStateCache doesn't query prefetched states again
+        calls[:] = []
+        cache.prefetch_states(set(xrange(1, 252)))
+        for review in xrange(1, 252):
+            cache.get_state(review)
+        self.assertEqual([], calls)
+
 
 # -----------------------------------------------------------------------------
 # Copyright (C) 2013-2015 Bloomberg Finance L.P.
@@ -9,10 +9,14 @@
 #    .add_hint
 #    .add_hint_list
 #    .get_phid
+#   EmailUserCache
+#    .query_name_and_phid_from_emails
+#    .clear
 #
 # Public Functions:
 #   is_no_such_error
 #   query_user_from_email
+#   query_name_and_phid_from_emails
 #   query_users_from_emails
 #   query_users_from_phids
 #   query_users_from_usernames
@@ -31,6 +35,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import time
+
 import phlsys_conduit
 import phlsys_namedtuple
 
@@ -75,6 +81,63 @@ class UserPhidCache(object):
         return self._user_to_phid[user.lower()]
 
 
+class EmailUserCache(object):
+
+    """Remember the (username, phid) for emails, and the emails without users.
+
+    Lookups for emails that aren't remembered are made in a single batch, see
+    'query_name_and_phid_from_emails'. Emails are compared case-insensitively.
+
+    """
+
+    def __init__(self, ttl_secs=3600, negative_ttl_secs=300, time_fn=None):
+        """Construct an empty cache.
+
+        :ttl_secs: seconds to remember the user for an email
+        :negative_ttl_secs: seconds to remember that an email has no user
+        :time_fn: function returning the current time in seconds, or None
+
+        """
+        super(EmailUserCache, self).__init__()
+        self._ttl_secs = ttl_secs
+        self._negative_ttl_secs = negative_ttl_secs
+        self._time_fn = time_fn if time_fn is not None else time.time
+        self._email_to_user_expiry = {}
+
+    def query_name_and_phid_from_emails(self, conduit, emails):
+        """Return a list of (username, phid) tuples based on 'emails'.
+
+        If an email does not correspond to a user then None is inserted in
+        its place.
+
+        :conduit: must support 'call()' like phlsys_conduit
+        :emails: a list of strings corresponding to user email addresses
+        :returns: a list of (username, phid) tuples or None
+
+        """
+        now = self._time_fn()
+
+        missing = []
+        for email in emails:
+            key = email.lower()
+            entry = self._email_to_user_expiry.get(key)
+            if entry is None or entry[1] <= now:
+                if key not in missing:
+                    missing.append(key)
+
+        if missing:
+            results = query_name_and_phid_from_emails(conduit, missing)
+            for email, user in zip(missing, results):
+                ttl = self._ttl_secs if user else self._negative_ttl_secs
+                self._email_to_user_expiry[email] = (user, now + ttl)
+
+        return [self._email_to_user_expiry[e.lower()][0] for e in emails]
+
+    def clear(self):
+        """Forget all the remembered emails."""
+        self._email_to_user_expiry.clear()
+
+
 def is_no_such_error(e):
     """Return True if the supplied ConduitException is due to unknown user.
 
@@ -116,6 +179,56 @@ def query_user_from_email(conduit, email):
         return None
 
 
+def query_name_and_phid_from_emails(conduit, emails):
+    """Return a list of (username, phid) tuples based on the provided emails.
+
+    All the emails are looked up with a single 'user.query' call and the
+    results are matched by 'primaryEmail'. Users found by one of their other
+    emails can't be matched like that, the unmatched emails are looked up
+    one at a time in that case.
+
+    If an email does not correspond to a username then None is inserted in
+    its place.
+
+    Note: If an empty list is supplied, an empty list will be returned.
+
+    :conduit: must support 'call()' like phlsys_conduit
+    :emails: a list of strings corresponding to user email addresses
+    :returns: a list of (username, phid) tuples or None
+
+    """
+    if not emails:
+        return []
+
+    d = {"emails": list(emails), "limit": len(emails)}
+    response = None
+    try:
+        response = conduit("user.query", d)
+    except phlsys_conduit.ConduitException as e:
+        if not is_no_such_error(e):
+            raise
+
+    response = response if response else []
+    email_to_user = {}
+    for user in response:
+        primary_email = user.get('primaryEmail')
+        if primary_email:
+            email_to_user[primary_email.lower()] = (
+                user['userName'], user['phid'])
+
+    results = [email_to_user.get(email.lower()) for email in emails]
+
+    num_matched_users = len(set(r for r in results if r is not None))
+    if num_matched_users < len(response):
+        for i, email in enumerate(emails):
+            if results[i] is None:
+                user = query_user_from_email(conduit, email)
+                if user is not None:
+                    results[i] = (user.userName, user.phid)
+
+    return results
+
+
 def query_users_from_emails(conduit, emails):
     """Return a list of username strings based on the provided emails.
 
@@ -129,14 +242,10 @@ def query_users_from_emails(conduit, emails):
     :returns: a list of strings corresponding to Phabricator usernames
 
     """
-    users = []
-    for e in emails:
-        u = query_user_from_email(conduit, e)
-        if u is not None:
-            users.append(u.userName)
-        else:
-            users.append(None)
-    return users
+    return [
+        user[0] if user is not None else None
+        for user in query_name_and_phid_from_emails(conduit, emails)
+    ]
 
 
 def query_users_from_phids(conduit, phids):
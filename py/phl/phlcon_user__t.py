@@ -0,0 +1,163 @@
+"""Test suite for phlcon_user."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] emails are looked up with a single call, in order, None if no user
+# [ A] emails are matched case-insensitively
+# [ B] users found by a secondary email are still found
+# [ C] the cache only looks up emails that it doesn't remember
+# [ C] the cache remembers emails without users for the negative ttl
+# [ C] the cache remembers emails with users for the ttl
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] Test.test_A_Breathing
+# [ B] Test.test_B_SecondaryEmail
+# [ C] Test.test_C_EmailUserCache
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+import phlsys_conduit
+
+import phlcon_user
+
+
+class _FakeConduit(object):
+
+    def __init__(self, users):
+        super(_FakeConduit, self).__init__()
+        self.users = users
+        self.calls = []
+
+    def __call__(self, method, param_dict):
+        assert method == "user.query"
+        self.calls.append(param_dict)
+        emails = [e.lower() for e in param_dict["emails"]]
+        results = [
+            {
+                'phid': phid,
+                'userName': name,
+                'realName': name,
+                'image': '',
+                'uri': '',
+                'roles': [],
+                'primaryEmail': email_list[0],
+            }
+            for name, phid, email_list in self.users
+            if any(e.lower() in emails for e in email_list)
+        ]
+        if not results:
+            raise phlsys_conduit.ConduitException(
+                method=method,
+                error="ERR-CONDUIT-CORE",
+                errormsg=(
+                    "Array for %Ls conversion is empty. "
+                    "Query: SELECT * FROM %s WHERE userPHID IN (%Ls) "
+                    "AND UNIX_TIMESTAMP() BETWEEN dateFrom AND dateTo %Q"),
+                result=None,
+                obj=param_dict,
+                uri=None,
+                actAsUser=None)
+        return results
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.conduit = _FakeConduit([
+            ('alice', 'PHID-USER-alice', ['alice@server.test']),
+            ('bob', 'PHID-USER-bob', ['bob@server.test', 'b@server.test']),
+        ])
+
+    def tearDown(self):
+        pass
+
+    def test_A_Breathing(self):
+        self.assertEqual(
+            [], phlcon_user.query_users_from_emails(self.conduit, []))
+        self.assertEqual([], self.conduit.calls)
+
+        # [ A] emails are looked up with a single call, in order, None if no
+        #      user
+        emails = ['bob@server.test', 'noone@server.test', 'alice@server.test']
+        self.assertEqual(
+            [('bob', 'PHID-USER-bob'), None, ('alice', 'PHID-USER-alice')],
+            phlcon_user.query_name_and_phid_from_emails(self.conduit, emails))
+        self.assertEqual(1, len(self.conduit.calls))
+        self.assertEqual(
+            [None], phlcon_user.query_users_from_emails(
+                self.conduit, ['noone@server.test']))
+
+        # [ A] emails are matched case-insensitively
+        self.assertEqual(
+            ['alice'], phlcon_user.query_users_from_emails(
+                self.conduit, ['Alice@Server.Test']))
+
+    def test_B_SecondaryEmail(self):
+        # [ B] users found by a secondary email are still found
+        emails = ['alice@server.test', 'b@server.test']
+        self.assertEqual(
+            ['alice', 'bob'],
+            phlcon_user.query_users_from_emails(self.conduit, emails))
+
+    def test_C_EmailUserCache(self):
+        now = [0]
+        cache = phlcon_user.EmailUserCache(
+            ttl_secs=100, negative_ttl_secs=10, time_fn=lambda: now[0])
+
+        def query(*emails):
+            return cache.query_name_and_phid_from_emails(
+                self.conduit, list(emails))
+
+        self.assertEqual(
+            [('alice', 'PHID-USER-alice'), None],
+            query('alice@server.test', 'noone@server.test'))
+        self.assertEqual(1, len(self.conduit.calls))
+
+        # [ C] the cache only looks up emails that it doesn't remember
+        self.assertEqual(
+            [None, ('bob', 'PHID-USER-bob'), ('alice', 'PHID-USER-alice')],
+            query('noone@server.test', 'bob@server.test', 'ALICE@server.test'))
+        self.assertEqual(2, len(self.conduit.calls))
+        self.assertEqual(['bob@server.test'], self.conduit.calls[-1]['emails'])
+
+        # [ C] the cache remembers emails without users for the negative ttl
+        now[0] = 10
+        query('alice@server.test', 'noone@server.test')
+        self.assertEqual(3, len(self.conduit.calls))
+        self.assertEqual(
+            ['noone@server.test'], self.conduit.calls[-1]['emails'])
+
+        # [ C] the cache remembers emails with users for the ttl
+        now[0] = 100
+        query('alice@server.test')
+        self.assertEqual(4, len(self.conduit.calls))
+
+        cache.clear()
+        query('bob@server.test')
+        self.assertEqual(5, len(self.conduit.calls))
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
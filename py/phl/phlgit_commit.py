@@ -7,6 +7,7 @@
 # Public Functions:
 #   index
 #   allow_empty
+#   commit_tree
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -39,6 +40,70 @@ def allow_empty(repo, message):
     repo('commit', '--allow-empty', '-m', message)
 
 
+def commit_tree(repo, tree, parent_list, message, author=None):
+    """Return the string sha1 of a new commit of 'tree' with 'parent_list'.
+
+    The commit is made without using the index or working tree, and no refs
+    are updated, use 'git update-ref' to point a branch at it.
+
+    The message is cleaned up in the same way as 'git commit -m' would, so
+    trailing whitespace and surplus blank lines are removed.
+
+    :repo: a callable supporting git commands, e.g. repo("status")
+    :tree: the string sha1 of the tree to commit
+    :parent_list: a list of string sha1s of the parents of the commit
+    :message: the string message for the commit
+    :author: the string 'name <email>' of the author, or None for the default
+    :returns: the string sha1 of the new commit
+
+    """
+    message = _cleanup_message(message)
+
+    if author is None:
+        parent_args = []
+        for parent in parent_list:
+            parent_args.extend(['-p', parent])
+        return repo('commit-tree', tree, *parent_args, stdin=message).strip()
+
+    # 'git commit-tree' will only take the author from the environment, so
+    # write the commit object ourselves with the same timestamp as the
+    # committer
+    committer = repo('var', 'GIT_COMMITTER_IDENT').strip()
+    timestamp = committer[committer.rindex('>') + 1:]
+    lines = ['tree ' + tree]
+    lines.extend('parent ' + parent for parent in parent_list)
+    lines.append('author ' + author + timestamp)
+    lines.append('committer ' + committer)
+    commit = '\n'.join(lines) + '\n\n' + message
+    return repo(
+        'hash-object', '-t', 'commit', '-w', '--stdin', stdin=commit).strip()
+
+
+def _cleanup_message(message):
+    """Return 'message' with whitespace cleaned up like 'git commit -m'.
+
+    Usage example:
+
+        >>> _cleanup_message('\\nsubject  \\n\\n\\n\\nbody\\n\\n')
+        'subject\\n\\nbody\\n'
+
+        >>> _cleanup_message('  ')
+        ''
+
+    :message: the string message to clean up
+    :returns: the cleaned up string message
+
+    """
+    lines = []
+    for line in message.splitlines():
+        line = line.rstrip()
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    while lines and not lines[-1]:
+        lines.pop()
+    return ''.join(line + '\n' for line in lines)
+
+
 # -----------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
 #
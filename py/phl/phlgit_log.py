@@ -31,6 +31,9 @@ from __future__ import print_function
 import collections
 import string
 
+# git always prints sha1s in lowercase
+_SHA1_DIGITS = '0123456789abcdef'
+
 """NamedTuple to represent a git revision.
 
 :hash:the sha1 associated with this revision
@@ -52,6 +55,43 @@ Revision = collections.namedtuple(
         'message'
     ])
 
+_REVISION_FORMAT = "%H%n%h%n%ae%n%an%n%ce%n%cn%n%s%n%b"
+
+# the number of revisions to remember in '_REVISION_CACHE'
+_MAX_CACHED_REVISIONS = 10000
+
+
+class _LruCache(object):
+
+    """Remember the most recently used values, up to 'max_size' of them."""
+
+    def __init__(self, max_size):
+        super(_LruCache, self).__init__()
+        self._max_size = max_size
+        self._key_to_value = collections.OrderedDict()
+
+    def get(self, key):
+        """Return the value for 'key', or None if it isn't remembered."""
+        value = self._key_to_value.pop(key, None)
+        if value is not None:
+            self._key_to_value[key] = value
+        return value
+
+    def put(self, key, value):
+        """Remember 'value' for 'key', forget the least recently used."""
+        self._key_to_value.pop(key, None)
+        self._key_to_value[key] = value
+        while len(self._key_to_value) > self._max_size:
+            self._key_to_value.popitem(last=False)
+
+    def clear(self):
+        """Forget all the remembered values."""
+        self._key_to_value.clear()
+
+
+# commits are immutable, so it's safe to share revisions between repos
+_REVISION_CACHE = _LruCache(_MAX_CACHED_REVISIONS)
+
 
 def get_range_to_here_hashes(repo, start):
     """Return a list of strings corresponding to commits from 'start' to here.
@@ -187,8 +227,8 @@ def make_revision_from_hash(repo, commitHash):
     :returns: a 'phlgit_log__Revision' based on the 'commitHash'
 
     """
-    fmt = "%H%n%h%n%ae%n%an%n%ce%n%cn%n%s%n%b"
-    fullMessage = repo("log", commitHash + "^!", "--format=" + fmt)
+    fullMessage = repo(
+        "log", commitHash + "^!", "--format=" + _REVISION_FORMAT)
     revision = make_revision_from_full_message(fullMessage)
     return revision
 
@@ -199,12 +239,86 @@ def make_revisions_from_hashes(repo, hashes):
     Raise an exception if the repo does not return a valid FullMessage
     from any of 'hashes'.
 
+    All the revisions that aren't already cached are read with a single call
+    to 'git log'. Names other than full sha1s, e.g. short sha1s or refs, are
+    resolved first with a single call to 'git rev-parse'. Revisions are cached
+    by their full sha1.
+
     :repo: a callable supporting git commands, e.g. repo("status")
     :returns: a list of 'phlgit_log__Revision'
 
     """
-    revisions = [make_revision_from_hash(repo, h) for h in hashes]
-    return revisions
+    name_to_sha1 = {}
+    names_to_resolve = []
+    for h in hashes:
+        if h not in name_to_sha1:
+            if _is_sha1(h):
+                name_to_sha1[h] = h
+            else:
+                name_to_sha1[h] = None
+                names_to_resolve.append(h)
+
+    if names_to_resolve:
+        sha1s = repo(
+            "rev-parse", *[n + "^{commit}" for n in names_to_resolve]).split()
+        name_to_sha1.update(zip(names_to_resolve, sha1s))
+
+    sha1_to_revision = {}
+    missing_sha1s = []
+    for sha1 in name_to_sha1.itervalues():
+        if sha1 not in sha1_to_revision:
+            revision = _REVISION_CACHE.get(sha1)
+            sha1_to_revision[sha1] = revision
+            if revision is None:
+                missing_sha1s.append(sha1)
+
+    if missing_sha1s:
+        # with '-z' each commit is terminated by NUL rather than newline, put
+        # the newline back so that the messages match 'make_revision_from_hash'
+        output = repo(
+            "log",
+            "--no-walk=unsorted",
+            "--stdin",
+            "-z",
+            "--format=" + _REVISION_FORMAT,
+            stdin="\n".join(missing_sha1s) + "\n")
+        full_messages = output.split("\0")
+        if full_messages and not full_messages[-1]:
+            full_messages.pop()
+
+        for message in full_messages:
+            revision = make_revision_from_full_message(message + "\n")
+            sha1_to_revision[revision.hash] = revision
+            _REVISION_CACHE.put(revision.hash, revision)
+
+        not_found = [h for h in missing_sha1s if not sha1_to_revision[h]]
+        if not_found:
+            raise Exception(
+                "phlgit_log__make_revisions_from_hashes: no revisions for "
+                "{}".format(not_found))
+
+    hash_to_revision = {
+        h: sha1_to_revision[sha1] for h, sha1 in name_to_sha1.iteritems()
+    }
+    return [hash_to_revision[h] for h in hashes]
+
+
+def _is_sha1(name):
+    """Return True if 'name' is a full sha1, False otherwise.
+
+        >>> _is_sha1('0123456789abcdef0123456789abcdef01234567')
+        True
+
+        >>> _is_sha1('HEAD')
+        False
+
+    Uppercase names are resolved like any other name, see '_SHA1_DIGITS'.
+
+        >>> _is_sha1('0123456789ABCDEF0123456789ABCDEF01234567')
+        False
+
+    """
+    return len(name) == 40 and all(c in _SHA1_DIGITS for c in name)
 
 
 def get_author_names_emails_from_hashes(repo, hashes):
@@ -130,6 +130,49 @@ class Test(unittest.TestCase):
         self.assertEqual(len(committers), 1)
         self.assertEqual(committers[0], (self.authorName, self.authorEmail))
 
+    def testRevisionsFromHashes(self):
+        self._createCommitNewFile("README")
+        self._createCommitNewFile("ONE", "ONE", "BODY\n\nBODY")
+        self._createCommitNewFile("TWO")
+        hashes = phlgit_log.get_last_n_commit_hashes(self.repo, 3)
+        hashes = [hashes[1], hashes[0], hashes[2], hashes[0]]
+
+        git_calls = []
+
+        def counting_repo(*args, **kwargs):
+            git_calls.append(args)
+            return self.repo(*args, **kwargs)
+
+        # revisions from the batch match those made one at a time
+        revisions = phlgit_log.make_revisions_from_hashes(
+            counting_repo, hashes)
+        self.assertEqual(
+            [phlgit_log.make_revision_from_hash(self.repo, h) for h in hashes],
+            revisions)
+        self.assertEqual("BODY\n\nBODY\n", revisions[0].message)
+        self.assertLessEqual(len(git_calls), 1)
+
+        # the revisions are cached by hash, so git isn't needed again
+        git_calls[:] = []
+        self.assertEqual(
+            revisions,
+            phlgit_log.make_revisions_from_hashes(counting_repo, hashes))
+        self.assertEqual([], git_calls)
+
+        # different names for the same commit give the same revision
+        names = [
+            hashes[0][:7], "HEAD", hashes[0], hashes[0].upper(), "HEAD~1"]
+        revisions = phlgit_log.make_revisions_from_hashes(self.repo, names)
+        self.assertEqual(
+            [phlgit_log.make_revision_from_hash(self.repo, h) for h in names],
+            revisions)
+
+        self.assertRaises(
+            Exception,
+            phlgit_log.make_revisions_from_hashes,
+            self.repo,
+            ["0" * 40])
+
 
 # -----------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
@@ -9,6 +9,8 @@
 #
 # Public Functions:
 #   squash
+#   write_tree
+#   is_write_tree_supported
 #   ours
 #   no_ff
 #
@@ -26,6 +28,11 @@ import phlsys_fs
 import phlsys_subprocess
 
 
+# 'git merge-tree --write-tree' was introduced in git 2.38
+_MIN_WRITE_TREE_GIT_VERSION = (2, 38)
+_IS_WRITE_TREE_SUPPORTED = None
+
+
 class MergeException(Exception):
 
     def __init__(self, description):
@@ -48,6 +55,79 @@ def squash(repo, source, message, author=None):
     return result
 
 
+def write_tree(repo, base, branch):
+    """Return the string sha1 of the tree from merging 'branch' into 'base'.
+
+    The merge is done in memory, without using the index or working tree, and
+    no refs are updated. The resulting tree is written to the object store.
+
+    This requires git 2.38 or later, see 'is_write_tree_supported'.
+
+    Raise MergeException if there are conflicts or the branches can't be
+    merged, e.g. if they have unrelated histories.
+
+    :repo: a callable supporting git commands, e.g. repo("status")
+    :base: the string name of the branch to merge into
+    :branch: the string name of the branch to merge
+    :returns: the string sha1 of the merged tree
+
+    """
+    with phlsys_fs.nostd():
+        try:
+            result = repo(
+                "merge-tree", "--write-tree", "--name-only", base, branch)
+        except phlsys_subprocess.CalledProcessError as e:
+            # on conflicts the details follow the tree sha1 on stdout,
+            # otherwise git explains on stderr
+            if e.stdout:
+                raise MergeException(e.stdout.split("\n", 1)[1])
+            raise MergeException(e.stderr)
+
+    return result.strip()
+
+
+def is_write_tree_supported():
+    """Return True if the installed git is new enough for 'write_tree'.
+
+    The version of git is only checked on the first call, the result is
+    remembered for the rest of the process.
+
+    :returns: True if 'write_tree' may be used, False otherwise
+
+    """
+    global _IS_WRITE_TREE_SUPPORTED
+    if _IS_WRITE_TREE_SUPPORTED is None:
+        version = _parse_git_version(
+            phlsys_subprocess.run('git', 'version').stdout)
+        _IS_WRITE_TREE_SUPPORTED = version >= _MIN_WRITE_TREE_GIT_VERSION
+    return _IS_WRITE_TREE_SUPPORTED
+
+
+def _parse_git_version(version_output):
+    """Return a tuple of the int parts of the 'git version' output.
+
+    Usage examples:
+        >>> _parse_git_version('git version 2.39.2\\n')
+        (2, 39, 2)
+        >>> _parse_git_version('git version 1.8.3.1')
+        (1, 8, 3, 1)
+        >>> _parse_git_version('git version 2.38.1.windows.1')
+        (2, 38, 1)
+        >>> _parse_git_version('git version 2.39.3 (Apple Git-145)')
+        (2, 39, 3)
+
+    :version_output: the string output of 'git version'
+    :returns: a tuple of int
+
+    """
+    version = []
+    for part in version_output.split()[2].split('.'):
+        if not part.isdigit():
+            break
+        version.append(int(part))
+    return tuple(version)
+
+
 def ours(repo, branch, message):
     """Merge the specified 'branch' into HEAD, discarding all changes.
 
@@ -4,6 +4,9 @@
 # -----------------------------------------------------------------------------
 # phlgit_push
 #
+# Public Classes:
+#   PushRejectedException
+#
 # Public Functions:
 #   push_asymmetrical_force
 #   push_asymmetrical
@@ -12,6 +15,12 @@
 #   branch
 #   move_asymmetrical
 #   delete
+#   push_porcelain
+#
+# Public Assignments:
+#   REJECTED_FLAG
+#   ATOMIC_FAILED_SUMMARY
+#   PushRefResult
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -21,8 +30,38 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
 import itertools
 
+import phlsys_subprocess
+
+# the flag that 'git push --porcelain' gives to refs that failed to update
+REJECTED_FLAG = '!'
+
+# when pushing with '--atomic', this is the summary given to refs that were
+# rejected only because other refs failed
+ATOMIC_FAILED_SUMMARY = '[rejected] (atomic push failed)'
+
+PushRefResult = collections.namedtuple(
+    'phlgit_push__PushRefResult',
+    ['flag', 'from_ref', 'to_ref', 'summary'])
+
+
+class PushRejectedException(Exception):
+
+    def __init__(self, rejected_result_list):
+        """Initialise from the list of rejected PushRefResult.
+
+        :rejected_result_list: a list of PushRefResult
+        :returns: None
+
+        """
+        self.rejected_result_list = rejected_result_list
+        message = "rejected refs:\n" + "\n".join(
+            "  {}: {}".format(r.to_ref, r.summary)
+            for r in rejected_result_list)
+        super(PushRejectedException, self).__init__(message)
+
 
 def push_asymmetrical_force(repo, localBranch, remoteBranch, remoteName):
     repo('push', remoteName, localBranch + ":" + remoteBranch, "--force")
@@ -83,6 +122,52 @@ def delete(repo, remote, branch, *args):
     removals = [':' + b for b in itertools.chain([branch], args)]
     repo('push', remote, *removals)
 
+
+def push_porcelain(repo, remote, refspec_list, *args):
+    """Push 'refspec_list' to 'remote', return the PushRefResult of each ref.
+
+    Refs that were rejected are reported with a 'flag' of REJECTED_FLAG, this
+    doesn't raise if git managed to report on each of the refs.
+
+    Usage example:
+        >>> def repo(*args):
+        ...     return '\\n'.join([
+        ...         'To /remote',
+        ...         '*\\trefs/heads/new:refs/heads/new\\t[new branch]',
+        ...         '-\\t:refs/heads/old\\t[deleted]',
+        ...         'Done'])
+        >>> push_porcelain(repo, 'origin', ['new', ':old'])[1].to_ref
+        'refs/heads/old'
+
+    :repo: a callable supporting git commands, e.g. repo("status")
+    :remote: string name of the remote
+    :refspec_list: a list of string refspecs, e.g. ['+src:dst', ':deleted']
+    :*args: (optional) more string arguments to 'git push', e.g. '--atomic'
+    :returns: a list of PushRefResult
+
+    """
+    push_args = ['push', '--porcelain'] + list(args) + [remote]
+    try:
+        output = repo(*(push_args + list(refspec_list)))
+    except phlsys_subprocess.CalledProcessError as e:
+        result_list = _parse_porcelain(e.stdout)
+        if not result_list:
+            raise
+        return result_list
+    return _parse_porcelain(output)
+
+
+def _parse_porcelain(output):
+    # each ref is reported like so: '<flag> TAB <from>:<to> TAB <summary>'
+    result_list = []
+    for line in output.splitlines():
+        fields = line.split('\t')
+        if len(fields) == 3 and len(fields[0]) == 1:
+            flag, refspec, summary = fields
+            from_ref, to_ref = refspec.split(':', 1)
+            result_list.append(PushRefResult(flag, from_ref, to_ref, summary))
+    return result_list
+
 # -----------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
 #
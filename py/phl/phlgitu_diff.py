@@ -0,0 +1,378 @@
+"""Parse diffs from git, so that they can be re-generated with less context.
+
+It's costly to ask git for the same diff again with a different amount of
+context, especially when the diff is large. Instead, ask for the diff once
+with the most context that might be needed, and derive the others from that.
+
+The derived diffs are the same as git would have produced with the smaller
+amount of context, with the exception of the function names after the hunk
+headers, e.g. '@@ -1,3 +1,4 @@ def foo():'. These are found using git's
+default rule of looking for the nearest preceding line that starts with a
+letter, '_' or '$'. Custom 'xfuncname' patterns from '.gitattributes' are not
+considered.
+
+"""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlgitu_diff
+#
+# Public Classes:
+#   Diff
+#    .utf8_size
+#    .text
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import re
+
+# note that lines in the body of a hunk always start with ' ', '-', '+' or
+# '\\', so these patterns can't mistakenly match within them
+_HUNK_HEADER_RE = re.compile(
+    r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@([^\n]*)\n', re.MULTILINE)
+_FILE_HEADER = '\ndiff '
+
+# a run of changed lines, including any '\ No newline at end of file'
+_CHANGE_RUN_RE = re.compile(
+    r'^[-+][^\n]*\n(?:[-+\\][^\n]*\n)*', re.MULTILINE)
+
+# the last line in a range that git would consider to be a function name by
+# default, note that lines which are only in the new file don't count
+_LAST_FUNCNAME_RE = re.compile(r'(?:.*\n)?[ -]([A-Za-z_$][^\n]*)', re.DOTALL)
+
+# git will truncate function names to this many bytes
+_MAX_FUNCNAME_BYTES = 80
+
+# a contiguous section of a diff, note that 'old_offset' and 'new_offset' are
+# the count of lines in each file before the hunk, 'body_start' and
+# 'body_end' are the offsets of the lines in the diff and 'run_list' is a list
+# of (start, end, context_before) for each run of changed lines
+_Hunk = collections.namedtuple(
+    'phlgitu_diff__Hunk',
+    [
+        'old_offset',
+        'new_offset',
+        'funcname',
+        'body_start',
+        'body_end',
+        'run_list',
+    ])
+
+
+class Diff(object):
+
+    """A diff from git, parsed so that it can be re-generated with less context.
+
+    Usage example:
+
+        >>> raw_diff = '\\n'.join([
+        ...     'diff --git a/README b/README',
+        ...     'index 3b18e51..5be4a41 100644',
+        ...     '--- a/README',
+        ...     '+++ b/README',
+        ...     '@@ -1,4 +1,4 @@',
+        ...     ' one',
+        ...     ' two',
+        ...     ' three',
+        ...     '-four',
+        ...     '+FOUR',
+        ...     ''])
+        >>> diff = Diff(raw_diff, 3)
+        >>> diff.text(3) == raw_diff
+        True
+        >>> print(diff.text(1), end='')
+        diff --git a/README b/README
+        index 3b18e51..5be4a41 100644
+        --- a/README
+        +++ b/README
+        @@ -3,2 +3,2 @@ two
+         three
+        -four
+        +FOUR
+        >>> diff.utf8_size(1)
+        124
+
+    """
+
+    def __init__(self, raw_diff, context_lines):
+        """Initialise from 'raw_diff', as produced by 'git diff'.
+
+        The diff is only parsed when less context is first asked for.
+
+        :raw_diff: the string output of 'git diff'
+        :context_lines: the number of context lines 'raw_diff' was made with
+
+        """
+        super(Diff, self).__init__()
+        self._raw_diff = raw_diff
+        self._context_lines = context_lines
+        self._is_utf8 = _is_utf8(raw_diff)
+        self._segment_list = None
+        self._context_to_pieces_size = {}
+
+    def utf8_size(self, context_lines):
+        """Return the size of the diff with 'context_lines', encoded as utf8.
+
+        Note that this is the size after decoding the diff with unrecognised
+        characters replaced, i.e. unicode(text, errors='replace').
+
+        :context_lines: the integer number of lines of context
+        :returns: the integer number of bytes
+
+        """
+        _, size = self._get_pieces_size(context_lines)
+        return size
+
+    def text(self, context_lines):
+        """Return the string diff with 'context_lines' of context.
+
+        :context_lines: the integer number of lines of context
+        :returns: the string diff
+
+        """
+        pieces, _ = self._get_pieces_size(context_lines)
+        return ''.join(pieces)
+
+    def _get_pieces_size(self, context_lines):
+        """Return (pieces, size) of the diff with 'context_lines'."""
+        context_lines = min(context_lines, self._context_lines)
+        pieces_size = self._context_to_pieces_size.get(context_lines)
+        if pieces_size is not None:
+            return pieces_size
+
+        if context_lines == self._context_lines:
+            pieces_size = (
+                [self._raw_diff], self._slice_size(self._raw_diff))
+        else:
+            if self._segment_list is None:
+                self._segment_list = _parse(self._raw_diff)
+            pieces = []
+            size = 0
+            for segment in self._segment_list:
+                if isinstance(segment, _Hunk):
+                    size += self._reduce_hunk(segment, context_lines, pieces)
+                else:
+                    pieces.append(segment)
+                    size += self._slice_size(segment)
+            pieces_size = (pieces, size)
+
+        self._context_to_pieces_size[context_lines] = pieces_size
+        return pieces_size
+
+    def _slice_size(self, text):
+        """Return the utf8 size of 'text', which is a part of the raw diff."""
+        if self._is_utf8:
+            return len(text)
+        return _utf8_size(text)
+
+    def _reduce_hunk(self, hunk, context_lines, pieces):
+        """Append the parts of 'hunk' with 'context_lines' to 'pieces'.
+
+        Changes that are further apart than twice the context are split into
+        separate hunks, as git would do.
+
+        :returns: the utf8 size of the appended pieces
+
+        """
+        raw = self._raw_diff
+        run_list = hunk.run_list
+        if not run_list:
+            return 0
+
+        group_list = []
+        group_start, group_end, _ = run_list[0]
+        for start, end, context_before in run_list[1:]:
+            if context_before > 2 * context_lines:
+                group_list.append((group_start, group_end))
+                group_start = start
+            group_end = end
+        group_list.append((group_start, group_end))
+
+        size = 0
+        old_offset = hunk.old_offset
+        new_offset = hunk.new_offset
+        funcname = hunk.funcname
+        position = hunk.body_start
+        last_index = len(group_list) - 1
+        for index, (group_start, group_end) in enumerate(group_list):
+            begin = _skip_lines_backward(
+                raw, group_start, context_lines, position, index == 0)
+            end = _skip_lines_forward(
+                raw,
+                group_end,
+                context_lines,
+                hunk.body_end,
+                index == last_index)
+
+            old_count, new_count = _count_lines(raw, position, begin)
+            old_offset += old_count
+            new_offset += new_count
+
+            # find the function name in the same way as git, searching back
+            # from the start of the hunk, stopping at the last hunk's start
+            match = _LAST_FUNCNAME_RE.match(raw, position, begin)
+            if match:
+                name = (match.group(1) + '\n')[:_MAX_FUNCNAME_BYTES]
+                funcname = ' ' + name.rstrip(' \t\r\n')
+
+            old_count, new_count = _count_lines(raw, begin, end)
+            header = '@@ -{} +{} @@{}\n'.format(
+                _format_range(old_offset, old_count),
+                _format_range(new_offset, new_count),
+                funcname)
+            body = raw[begin:end]
+            pieces.append(header)
+            pieces.append(body)
+            size += _utf8_size(header) + self._slice_size(body)
+
+            # the offsets are now counted up to 'begin'
+            position = begin
+
+        return size
+
+
+def _parse(raw_diff):
+    """Return a list of the strings and _Hunks which make up 'raw_diff'."""
+    match_list = list(_HUNK_HEADER_RE.finditer(raw_diff))
+    segment_list = []
+    position = 0
+    for index, match in enumerate(match_list):
+        if index + 1 < len(match_list):
+            limit = match_list[index + 1].start()
+        else:
+            limit = len(raw_diff)
+
+        body_start = match.end()
+        body_end = raw_diff.find(_FILE_HEADER, body_start - 1, limit) + 1
+        if not body_end:
+            body_end = limit
+
+        run_list = []
+        context_start = body_start
+        for run in _CHANGE_RUN_RE.finditer(raw_diff, body_start, body_end):
+            run_list.append((
+                run.start(),
+                run.end(),
+                raw_diff.count('\n', context_start, run.start())))
+            context_start = run.end()
+
+        old_start, old_count, new_start, new_count, funcname = match.groups()
+        old_count = 1 if old_count is None else int(old_count)
+        new_count = 1 if new_count is None else int(new_count)
+
+        if position != match.start():
+            segment_list.append(raw_diff[position:match.start()])
+        segment_list.append(
+            _Hunk(
+                _to_offset(int(old_start), old_count),
+                _to_offset(int(new_start), new_count),
+                funcname,
+                body_start,
+                body_end,
+                run_list))
+        position = body_end
+
+    if position != len(raw_diff):
+        segment_list.append(raw_diff[position:])
+
+    return segment_list
+
+
+def _skip_lines_backward(raw, position, count, limit, is_limit_near):
+    """Return the start of the line 'count' lines before 'position'.
+
+    Don't go further back than 'limit'. If 'is_limit_near' is False then
+    the caller knows that it's further than 'count' lines away.
+
+    """
+    if is_limit_near and raw.count('\n', limit, position) <= count:
+        return limit
+    for _ in xrange(count):
+        position = raw.rfind('\n', limit, position - 1) + 1
+    return position
+
+
+def _skip_lines_forward(raw, position, count, limit, is_limit_near):
+    """Return the end of the line 'count' lines after 'position'.
+
+    Don't go further than 'limit'. If 'is_limit_near' is False then the
+    caller knows that it's further than 'count' lines away.
+
+    Note that a '\\ No newline at end of file' goes with the line before it.
+
+    """
+    if is_limit_near:
+        line_count = raw.count('\n', position, limit)
+        line_count -= raw.count('\n\\', position - 1, limit - 1)
+        if line_count <= count:
+            return limit
+    for _ in xrange(count):
+        position = raw.find('\n', position, limit) + 1
+    return position
+
+
+def _count_lines(raw, start, end):
+    """Return (old, new) counts of the lines in the hunk between the offsets.
+
+    Note that 'start' must be the start of a line in a hunk, so the character
+    before it is a newline.
+
+    """
+    if start == end:
+        return 0, 0
+    line_count = raw.count('\n', start, end)
+    line_count -= raw.count('\n\\', start - 1, end - 1)
+    old_count = line_count - raw.count('\n+', start - 1, end - 1)
+    new_count = line_count - raw.count('\n-', start - 1, end - 1)
+    return old_count, new_count
+
+
+def _to_offset(start, count):
+    # empty ranges are given as the line before, rather than the line after
+    return start if count == 0 else start - 1
+
+
+def _format_range(offset, count):
+    start = offset if count == 0 else offset + 1
+    if count == 1:
+        return str(start)
+    return '{},{}'.format(start, count)
+
+
+def _is_utf8(text):
+    try:
+        text.decode('utf-8')
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _utf8_size(text):
+    """Return the size of 'text' after decoding with replacement as utf8."""
+    if _is_utf8(text):
+        return len(text)
+    return len(unicode(text, errors='replace').encode('utf-8'))
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
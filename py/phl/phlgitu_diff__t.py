@@ -0,0 +1,154 @@
+"""Test suite for phlgitu_diff."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] diffs with less context are the same as git would make
+# [ A] sizes are the same as the utf8 encoding of the decoded diff
+# [ B] diffs of randomly edited files are the same as git would make
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] Test.test_A_Breathing
+# [ B] Test.test_B_RandomEdits
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import phlsys_git
+
+import phlgitu_diff
+
+_FULL_CONTEXT_LINES = 100000
+_CONTEXT_LINES_LIST = [0, 1, 2, 3, 5, 10]
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.repo = phlsys_git.Repo(self.path)
+        self.repo('init', '-q')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _write(self, name, content):
+        with open(os.path.join(self.path, name), 'wb') as f:
+            f.write(content)
+
+    def _commit(self, message):
+        self.repo('add', '-A')
+        self.repo('commit', '-q', '-m', message)
+
+    def _assert_same_as_git(self):
+        raw_diff = self.repo(
+            'diff', 'HEAD~1', 'HEAD', '-M',
+            '--unified={}'.format(_FULL_CONTEXT_LINES))
+        diff = phlgitu_diff.Diff(raw_diff, _FULL_CONTEXT_LINES)
+
+        for context_lines in _CONTEXT_LINES_LIST + [_FULL_CONTEXT_LINES]:
+            expected = self.repo(
+                'diff', 'HEAD~1', 'HEAD', '-M',
+                '--unified={}'.format(context_lines))
+            self.assertEqual(expected, diff.text(context_lines))
+            self.assertEqual(
+                len(unicode(expected, errors='replace').encode('utf-8')),
+                diff.utf8_size(context_lines))
+
+    def test_A_Breathing(self):
+        code = ''.join(
+            'int function{}(void)\n'.format(i) if i % 20 == 0 else
+            '    statement{};\n'.format(i)
+            for i in range(200))
+        self._write('code.c', code)
+        self._write('noeol', 'one\ntwo\nthree')
+        self._write('binary.bin', 'data\0' * 10)
+        self._write(
+            'to_rename', ''.join('line {}\n'.format(i) for i in range(50)))
+        self._write('to_delete', 'delete me\n')
+        self._write('to_chmod', 'mode\n')
+        self._write(
+            'long_funcname',
+            'x' * 100 + '   \n' + 'body\n' * 10)
+        self._write('dashes', '--- not a header\n++ nor this\nkeep\n')
+        self._commit('initial')
+
+        code_lines = code.splitlines(True)
+        for i in (1, 5, 6, 45, 100, 101, 102, 160, 199):
+            code_lines[i] = '    changed{};\n'.format(i)
+        code_lines.insert(150, '    inserted;\n')
+        del code_lines[120]
+        self._write('code.c', ''.join(code_lines))
+        self._write('noeol', 'one\ntwo\nTHREE')
+        self._write('binary.bin', 'DATA\0' * 10)
+        os.rename(
+            os.path.join(self.path, 'to_rename'),
+            os.path.join(self.path, 'renamed'))
+        self._write(
+            'renamed', ''.join('line {}\n'.format(i) for i in range(49)))
+        os.remove(os.path.join(self.path, 'to_delete'))
+        os.chmod(os.path.join(self.path, 'to_chmod'), 0o755)
+        self._write(
+            'long_funcname',
+            'x' * 100 + '   \n' + 'body\n' * 9 + 'end\n')
+        self._write('dashes', 'keep\n')
+        self._write('new_file', 'new\n\xff\xfe invalid utf8\n\xe2\x98\x83\n')
+        self._commit('changes')
+
+        # [ A] diffs with less context are the same as git would make
+        # [ A] sizes are the same as the utf8 encoding of the decoded diff
+        self._assert_same_as_git()
+
+    def test_B_RandomEdits(self):
+        rand = random.Random(0)
+        words = ['alpha', '  beta', '_gamma', '\tdelta', '$epsilon', '']
+
+        def make_lines(count):
+            return [rand.choice(words) + '\n' for _ in range(count)]
+
+        for name in ('a', 'b', 'c'):
+            self._write(name, ''.join(make_lines(rand.randint(0, 300))))
+        self._commit('initial')
+
+        for iteration in range(10):
+            for name in ('a', 'b', 'c'):
+                with open(os.path.join(self.path, name)) as f:
+                    lines = f.readlines()
+                for _ in range(rand.randint(0, 10)):
+                    index = rand.randint(0, len(lines))
+                    lines[index:index + rand.randint(0, 3)] = make_lines(
+                        rand.randint(0, 3))
+                self._write(name, ''.join(lines))
+            self._commit('iteration {}'.format(iteration))
+
+            # [ B] diffs of randomly edited files are the same as git would
+            #      make
+            self._assert_same_as_git()
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
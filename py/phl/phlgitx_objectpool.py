@@ -0,0 +1,224 @@
+"""Share git objects between clones of related repos via a common pool.
+
+Many clones of forks or mirrors of the same repository would otherwise each
+store their own copy of the same objects. Instead, the objects can be
+fetched into a bare 'pool' repository first, the clones then borrow them via
+'.git/objects/info/alternates' and only store objects that are unique to
+them.
+
+The pool must never lose objects that the clones may be borrowing, so it is
+configured to never prune unreachable objects, and it keeps refs for each of
+the repos that have been fetched into it.
+
+If the pool is moved or removed then the alternates link in the clones will
+be broken and they will be missing objects. Use 'get_broken_alternates' to
+detect this, fetching into a new pool and linking to it again will repair the
+clone.
+
+"""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlgitx_objectpool
+#
+# Public Classes:
+#   ObjectPool
+#    .path
+#    .objects_path
+#    .ensure_exists
+#    .fetch
+#    .clone
+#    .is_linked
+#    .link
+#    .repack
+#
+# Public Functions:
+#   get_alternates
+#   get_broken_alternates
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import phlsys_fs
+import phlsys_git
+import phlsys_subprocess
+
+_ALTERNATES_PATH = '.git/objects/info/alternates'
+_OBJECTS_PATH = '.git/objects'
+
+
+class ObjectPool(object):
+
+    """A bare repository to share objects from, between related clones."""
+
+    def __init__(self, path):
+        """Initialise to use the pool at 'path', which may not exist yet.
+
+        :path: the string path to the pool, a bare repository
+
+        """
+        super(ObjectPool, self).__init__()
+        self._path = os.path.realpath(path)
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def objects_path(self):
+        return os.path.join(self._path, 'objects')
+
+    def ensure_exists(self):
+        """Create the pool if it doesn't exist already.
+
+        :returns: None
+
+        """
+        if os.path.isdir(self.objects_path):
+            return
+
+        phlsys_fs.ensure_dir(self._path)
+        repo = phlsys_git.Repo(self._path)
+        repo('init', '--bare')
+
+        # clones may be borrowing any of the objects, even if the pool can't
+        # reach them any more, so never throw any away
+        repo('config', 'gc.auto', '0')
+        repo('config', 'gc.pruneExpire', 'never')
+        repo('config', 'gc.reflogExpireUnreachable', 'never')
+
+    def fetch(self, name, url):
+        """Fetch the objects from 'url' into the pool, creating it if needed.
+
+        The branches of 'url' are kept under 'refs/pool/<name>/' so that each
+        repo sharing the pool has its own namespace.
+
+        :name: the string name of the repo in the pool, e.g. the repo name
+        :url: the string url to fetch from
+        :returns: None
+
+        """
+        self.ensure_exists()
+        repo = phlsys_git.Repo(self._path)
+        repo(
+            'fetch',
+            '--prune',
+            url,
+            '+refs/heads/*:refs/pool/{}/heads/*'.format(name),
+            '+refs/arcyd/*:refs/pool/{}/arcyd/*'.format(name))
+
+    def clone(self, url, repo_path, *args):
+        """Clone 'url' to 'repo_path', borrowing objects from the pool.
+
+        Note that the pool should have fetched from 'url' beforehand, to have
+        any objects to share.
+
+        :url: the string url to clone from
+        :repo_path: the string path to clone to
+        :*args: additional string arguments to 'git clone'
+        :returns: None
+
+        """
+        clone_args = ('--reference', self._path) + args
+        phlsys_subprocess.run('git', 'clone', url, repo_path, *clone_args)
+
+    def is_linked(self, repo_path):
+        """Return True if the clone at 'repo_path' borrows from the pool.
+
+        :repo_path: the string path to the clone
+        :returns: True or False
+
+        """
+        return self.objects_path in get_alternates(repo_path)
+
+    def link(self, repo_path):
+        """Make the clone at 'repo_path' borrow from the pool.
+
+        Any broken alternates are removed. Objects that the clone already has
+        are not removed, use 'repack' for that.
+
+        :repo_path: the string path to the clone
+        :returns: None
+
+        """
+        alternates = [
+            path for path in get_alternates(repo_path)
+            if os.path.isdir(path)
+        ]
+        if self.objects_path not in alternates:
+            alternates.append(self.objects_path)
+
+        phlsys_fs.write_text_file(
+            os.path.join(repo_path, _ALTERNATES_PATH),
+            ''.join(path + '\n' for path in alternates))
+
+    def repack(self, repo_path):
+        """Remove objects from the clone at 'repo_path' that the pool has.
+
+        :repo_path: the string path to the clone
+        :returns: None
+
+        """
+        repo = phlsys_git.Repo(repo_path)
+        repo('repack', '-a', '-d', '-l', '-q')
+
+
+def get_alternates(repo_path):
+    """Return a list of the absolute paths that 'repo_path' borrows from.
+
+    :repo_path: the string path to the clone
+    :returns: a list of string paths to 'objects' directories
+
+    """
+    alternates_path = os.path.join(repo_path, _ALTERNATES_PATH)
+    if not os.path.exists(alternates_path):
+        return []
+
+    # relative paths are relative to the objects directory of the clone
+    objects_path = os.path.realpath(os.path.join(repo_path, _OBJECTS_PATH))
+    alternates = []
+    for line in phlsys_fs.read_text_file(alternates_path).splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            alternates.append(
+                os.path.realpath(os.path.join(objects_path, line)))
+    return alternates
+
+
+def get_broken_alternates(repo_path):
+    """Return a list of the paths that 'repo_path' fails to borrow from.
+
+    If this isn't empty then the clone is missing objects.
+
+    :repo_path: the string path to the clone
+    :returns: a list of string paths to missing 'objects' directories
+
+    """
+    return [
+        path for path in get_alternates(repo_path)
+        if not os.path.isdir(path)
+    ]
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
@@ -0,0 +1,140 @@
+"""Test suite for phlgitx_objectpool."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] clones from the pool borrow its objects instead of copying them
+# [ A] fetching updates from a pooled clone works as normal
+# [ B] existing clones can be linked to the pool and repacked to share
+# [ C] broken links to the pool are detected
+# [ C] broken links are repaired by linking to a new pool
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] Test.test_A_Breathing
+# [ B] Test.test_B_LinkExisting
+# [ C] Test.test_C_RepairBroken
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import phlgitu_fixture
+import phlsys_git
+import phlsys_subprocess
+
+import phlgitx_objectpool
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.origin_path = os.path.join(self.path, 'origin')
+        self.clone_path = os.path.join(self.path, 'clone')
+
+        # use a url rather than a path, so that git doesn't copy the objects
+        # in the same way as it would when cloning other local repos
+        self.origin_url = 'file://' + self.origin_path
+        self.pool = phlgitx_objectpool.ObjectPool(
+            os.path.join(self.path, 'pool'))
+
+        os.mkdir(self.origin_path)
+        self.origin = phlsys_git.Repo(self.origin_path)
+        self.origin('init')
+        self.worker = phlgitu_fixture.Worker(self.origin)
+        self.worker.commit_new_file('initial commit', 'README', 'content')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _count_local_objects(self, repo_path):
+        repo = phlsys_git.Repo(repo_path)
+        counts = dict(
+            line.split(': ')
+            for line in repo('count-objects', '-v').splitlines())
+        return int(counts['count']) + int(counts['in-pack'])
+
+    def _assert_clone_ok(self):
+        repo = phlsys_git.Repo(self.clone_path)
+        repo('fsck', '--connectivity-only')
+        self.assertEqual(
+            self.origin('rev-parse', 'HEAD'),
+            repo('rev-parse', 'origin/master'))
+
+    def test_A_Breathing(self):
+        self.pool.fetch('origin', self.origin_path)
+        self.pool.clone(self.origin_url, self.clone_path)
+
+        # [ A] clones from the pool borrow its objects instead of copying them
+        self.assertTrue(self.pool.is_linked(self.clone_path))
+        self.assertEqual(0, self._count_local_objects(self.clone_path))
+        self.assertEqual(
+            [], phlgitx_objectpool.get_broken_alternates(self.clone_path))
+        self._assert_clone_ok()
+
+        # [ A] fetching updates from a pooled clone works as normal
+        self.worker.commit_new_file('second commit', 'NEWFILE', 'content')
+        self.pool.fetch('origin', self.origin_path)
+        phlsys_git.Repo(self.clone_path)('fetch')
+        self.assertEqual(0, self._count_local_objects(self.clone_path))
+        self._assert_clone_ok()
+
+    def test_B_LinkExisting(self):
+        phlsys_subprocess.run(
+            'git', 'clone', self.origin_url, self.clone_path)
+        self.assertFalse(self.pool.is_linked(self.clone_path))
+        self.assertNotEqual(0, self._count_local_objects(self.clone_path))
+
+        # [ B] existing clones can be linked to the pool and repacked to share
+        self.pool.fetch('origin', self.origin_path)
+        self.pool.link(self.clone_path)
+        self.pool.repack(self.clone_path)
+        self.assertTrue(self.pool.is_linked(self.clone_path))
+        self.assertEqual(0, self._count_local_objects(self.clone_path))
+        self._assert_clone_ok()
+
+    def test_C_RepairBroken(self):
+        self.pool.fetch('origin', self.origin_path)
+        self.pool.clone(self.origin_url, self.clone_path)
+        shutil.rmtree(self.pool.path)
+
+        # [ C] broken links to the pool are detected
+        self.assertEqual(
+            [self.pool.objects_path],
+            phlgitx_objectpool.get_broken_alternates(self.clone_path))
+
+        # [ C] broken links are repaired by linking to a new pool
+        new_pool = phlgitx_objectpool.ObjectPool(
+            os.path.join(self.path, 'newpool'))
+        new_pool.fetch('origin', self.origin_path)
+        new_pool.link(self.clone_path)
+        self.assertEqual(
+            [new_pool.objects_path],
+            phlgitx_objectpool.get_alternates(self.clone_path))
+        self._assert_clone_ok()
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
@@ -7,8 +7,12 @@
 # Public Classes:
 #   Repo
 #    .hash_ref_pairs
+#    .ref_to_hash
 #    .peek_hash_ref_pairs
 #    .set_hash_ref_pairs
+#    .resolve_ref
+#    .read_blob
+#    .read_commit
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -20,16 +24,221 @@ from __future__ import print_function
 
 import phlgit_showref
 
+# commands which never change any refs
+_READ_ONLY_COMMANDS = frozenset([
+    'blame',
+    'cat-file',
+    'commit-tree',
+    'describe',
+    'diff',
+    'diff-index',
+    'diff-tree',
+    'for-each-ref',
+    'grep',
+    'hash-object',
+    'log',
+    'ls-files',
+    'ls-remote',
+    'ls-tree',
+    'merge-base',
+    'merge-tree',
+    'name-rev',
+    'rev-list',
+    'rev-parse',
+    'show',
+    'show-ref',
+    'status',
+    'var',
+])
+
+# push options which don't affect which refs are updated
+_PUSH_PLAIN_OPTIONS = frozenset([
+    '-f', '--force', '-q', '--quiet', '-v', '--verbose', '--porcelain',
+    '--atomic', '--no-atomic', '--verify', '--no-verify', '-n', '--dry-run',
+    '--progress', '--no-progress', '--thin', '--no-thin',
+    '--force-with-lease',
+])
+
+# checkout options which don't affect which refs are updated
+_CHECKOUT_PLAIN_OPTIONS = frozenset(['-f', '--force', '-q', '--quiet'])
+
+
+class _AllRefs(object):
+
+    """Marker for when any of the refs may have changed."""
+
+    pass
+
+
+def _get_changed_refs_push(args, get_fetch_refspecs):
+    is_delete = False
+    positionals = []
+    for arg in args:
+        if arg in ('-d', '--delete'):
+            is_delete = True
+        elif arg.startswith('--force-with-lease='):
+            pass
+        elif arg.startswith('-'):
+            if arg not in _PUSH_PLAIN_OPTIONS:
+                # e.g. '--all', '--mirror', '--tags', '--prune'
+                return _AllRefs
+        else:
+            positionals.append(arg)
+
+    if len(positionals) < 2:
+        # we'd have to work out the default refspecs
+        return _AllRefs
+
+    remote = positionals[0]
+    fetch_refspecs = get_fetch_refspecs(remote)
+
+    changed = set()
+    for refspec in positionals[1:]:
+        refspec = refspec.lstrip('+')
+        if is_delete or ':' not in refspec:
+            src, dst = refspec, refspec
+        else:
+            src, _, dst = refspec.partition(':')
+            if not dst:
+                dst = src
+
+        if not dst or dst == 'HEAD':
+            # we'd have to work out what 'HEAD' refers to on the remote
+            return _AllRefs
+
+        if dst.startswith('refs/'):
+            remote_refs = [dst]
+        else:
+            remote_refs = ['refs/heads/' + dst, 'refs/tags/' + dst]
+
+        # pushing only changes our refs if they track the remote ones
+        for remote_ref in remote_refs:
+            for fetch_src, fetch_dst in fetch_refspecs:
+                local_ref = _map_refspec(remote_ref, fetch_src, fetch_dst)
+                if local_ref is not None:
+                    changed.add(local_ref)
+
+    return changed
+
+
+def _map_refspec(ref, src, dst):
+    if '*' not in src:
+        return dst if ref == src else None
+    prefix, _, suffix = src.partition('*')
+    is_match = (
+        ref.startswith(prefix) and
+        ref.endswith(suffix) and
+        len(ref) >= len(prefix) + len(suffix))
+    if not is_match:
+        return None
+    middle = ref[len(prefix):len(ref) - len(suffix)]
+    return dst.replace('*', middle, 1)
+
+
+def _get_changed_refs_branch(args):
+    names = []
+    for arg in args:
+        if arg in ('-d', '-D', '--delete', '-f', '--force'):
+            continue
+        if arg.startswith('-'):
+            # e.g. '--move', '--set-upstream-to'
+            return _AllRefs
+        names.append(arg)
+
+    if not names:
+        return set()
+
+    is_delete = any(a in ('-d', '-D', '--delete') for a in args)
+    if not is_delete:
+        # 'git branch <name> [<start-point>]'
+        names = names[:1]
+
+    return set('refs/heads/' + name for name in names)
+
+
+def _get_changed_refs_checkout(args):
+    branch_options = ('-b', '-B', '--orphan')
+    if args and args[0] in branch_options and len(args) >= 2:
+        # 'git checkout -b <new-branch> [<start-point>]'
+        if any(a.startswith('-') for a in args[1:]):
+            return _AllRefs
+        return set(['refs/heads/' + args[1]])
+
+    positionals = []
+    for arg in args:
+        if arg.startswith('-'):
+            if arg not in _CHECKOUT_PLAIN_OPTIONS:
+                return _AllRefs
+        else:
+            positionals.append(arg)
+
+    if len(positionals) != 1:
+        # e.g. checking out paths
+        return _AllRefs
+
+    target = positionals[0]
+    if target.startswith('refs/'):
+        # detaching HEAD doesn't change any refs
+        return set()
+
+    # checking out a branch that only exists on a remote will create it
+    return set(['refs/heads/' + target])
+
+
+def _get_changed_refs_update_ref(args):
+    positionals = [a for a in args if not a.startswith('-')]
+    if not positionals or not positionals[0].startswith('refs/'):
+        return _AllRefs
+    return set(positionals[:1])
+
+
+def _get_changed_refs(args, get_fetch_refspecs):
+    """Return the set of refs that running 'args' may change, or _AllRefs.
+
+    :args: the arguments to git, e.g. ('push', 'origin', 'master')
+    :get_fetch_refspecs: callable to return the fetch refspecs for a remote
+    :returns: a set of string ref names, or _AllRefs
+
+    """
+    if not args:
+        return _AllRefs
+
+    command = args[0]
+    command_args = args[1:]
+
+    if command in _READ_ONLY_COMMANDS:
+        return set()
+    elif command == 'push':
+        return _get_changed_refs_push(command_args, get_fetch_refspecs)
+    elif command == 'branch':
+        return _get_changed_refs_branch(command_args)
+    elif command == 'checkout':
+        return _get_changed_refs_checkout(command_args)
+    elif command == 'update-ref':
+        return _get_changed_refs_update_ref(command_args)
+
+    # e.g. 'fetch', 'commit', 'merge', 'reset'
+    return _AllRefs
+
 
 class Repo(object):
 
-    """Git callable that maintains a cache of refs for efficient querying."""
+    """Git callable that maintains a cache of refs for efficient querying.
+
+    Commands that can't change refs leave the cache as it is. Commands that
+    change known refs only cause those refs to be looked up again. Any other
+    command causes all the refs to be looked up again.
+
+    """
 
     def __init__(self, repo):
         """Initialise the repo to pass on calls to 'repo'."""
         super(Repo, self).__init__()
         self._repo = repo
+        self._ref_to_hash = None
         self._hash_ref_pairs = None
+        self._stale_refs = set()
+        self._remote_to_fetch_refspecs = None
 
     @property
     def hash_ref_pairs(self):
@@ -38,15 +247,26 @@ class Repo(object):
         :returns: a list of (sha1, name)
 
         """
-        if self._hash_ref_pairs is None:
-            self._hash_ref_pairs = phlgit_showref.hash_ref_pairs(self._repo)
+        self._update()
         return self._hash_ref_pairs
 
+    @property
+    def ref_to_hash(self):
+        """Return a dict of ref name to sha1 from the repo's list of refs.
+
+        Note that the dict must not be modified.
+
+        :returns: a dict of string ref name to string sha1
+
+        """
+        self._update()
+        return self._ref_to_hash
+
     def peek_hash_ref_pairs(self):
         """Return the current cached list of (sha1, name) tuples or None.
 
-        Don't attempt to update the cache if it's stale, just return the
-        current state as it is.
+        Don't attempt to reload all the refs if the cache is invalid, just
+        return None. Refs that are known to have changed are looked up.
 
         This is useful if trying to persist the state in some way.
 
@@ -54,6 +274,9 @@ class Repo(object):
         :returns: a list of (sha1, name)
 
         """
+        if self._ref_to_hash is None:
+            return None
+        self._update()
         return self._hash_ref_pairs
 
     def set_hash_ref_pairs(self, hash_ref_pairs):
@@ -66,12 +289,112 @@ class Repo(object):
         :returns: None
 
         """
-        self._hash_ref_pairs = hash_ref_pairs
+        self._stale_refs = set()
+        if hash_ref_pairs is None:
+            self._ref_to_hash = None
+            self._hash_ref_pairs = None
+        else:
+            self._ref_to_hash = dict((r, h) for h, r in hash_ref_pairs)
+            self._hash_ref_pairs = hash_ref_pairs
 
     def __call__(self, *args, **kwargs):
-        self._hash_ref_pairs = None
+        if self._ref_to_hash is not None:
+            changed_refs = _get_changed_refs(args, self._get_fetch_refspecs)
+            if changed_refs is _AllRefs:
+                self._ref_to_hash = None
+                self._hash_ref_pairs = None
+                self._stale_refs = set()
+            else:
+                self._stale_refs |= changed_refs
+
+        if args and args[0] in ('config', 'remote'):
+            self._remote_to_fetch_refspecs = None
+
         return self._repo(*args, **kwargs)
 
+    def _update(self):
+        if self._ref_to_hash is None:
+            hash_ref_pairs = phlgit_showref.hash_ref_pairs(self._repo)
+            self._ref_to_hash = dict((r, h) for h, r in hash_ref_pairs)
+            self._hash_ref_pairs = hash_ref_pairs
+            self._stale_refs = set()
+        elif self._stale_refs:
+            self._update_stale_refs()
+
+    def _update_stale_refs(self):
+        stale_refs = sorted(self._stale_refs)
+        self._stale_refs = set()
+
+        if any('[' in r or '\\' in r for r in stale_refs):
+            # these would be treated as patterns by 'for-each-ref'
+            self._ref_to_hash = None
+            self._update()
+            return
+
+        # 'for-each-ref' also matches the refs under the ones we ask for, so
+        # forget those as well as the refs themselves
+        ref_to_hash = dict(self._ref_to_hash)
+        for name in ref_to_hash.keys():
+            for stale in stale_refs:
+                if name == stale or name.startswith(stale + '/'):
+                    del ref_to_hash[name]
+                    break
+
+        output = self._repo(
+            'for-each-ref', '--format=%(objectname) %(refname)', *stale_refs)
+        for line in output.splitlines():
+            sha1, name = line.split()
+            ref_to_hash[name] = sha1
+
+        self._ref_to_hash = ref_to_hash
+        self._hash_ref_pairs = [
+            [ref_to_hash[ref], ref] for ref in sorted(ref_to_hash)
+        ]
+
+    def _get_fetch_refspecs(self, remote):
+        if self._remote_to_fetch_refspecs is None:
+            self._remote_to_fetch_refspecs = {}
+            for line in self._repo('config', '--list').splitlines():
+                key, _, value = line.partition('=')
+                is_fetch = key.startswith('remote.') and key.endswith('.fetch')
+                if not is_fetch or value.startswith('^'):
+                    continue
+                name = key[len('remote.'):-len('.fetch')]
+                src, _, dst = value.lstrip('+').partition(':')
+                if dst:
+                    self._remote_to_fetch_refspecs.setdefault(
+                        name, []).append((src, dst))
+        return self._remote_to_fetch_refspecs.get(remote, [])
+
+    # reading objects can't change the refs, so these don't reset the cache
+
+    def resolve_ref(self, ref):
+        """Return the string sha1 of the object named by 'ref', or None.
+
+        :ref: the string name of the object, e.g. 'origin/master', 'ed3a1'
+        :returns: the string sha1 of the object, or None if there's no object
+
+        """
+        return self._repo.resolve_ref(ref)
+
+    def read_blob(self, ref):
+        """Return the string content of the blob named by 'ref'.
+
+        :ref: the string name of the blob, e.g. 'origin/master:README'
+        :returns: the string content of the blob
+
+        """
+        return self._repo.read_blob(ref)
+
+    def read_commit(self, ref):
+        """Return a phlsys_git.Commit for the commit named by 'ref'.
+
+        :ref: the string name of the commit, e.g. 'origin/master', 'ed3a1'
+        :returns: a phlsys_git.Commit
+
+        """
+        return self._repo.read_commit(ref)
+
     # we don't implement this as it would be hard to guess when to invalidate
     # the cache when the client has direct access to the git directory
     #
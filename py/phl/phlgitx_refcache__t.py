@@ -0,0 +1,151 @@
+"""Test suite for phlgitx_refcache."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] the cached refs match 'git show-ref'
+# [ A] read-only commands don't cause the refs to be looked up again
+# [ B] pushes only cause the pushed tracking refs to be looked up again
+# [ B] deleting branches only causes those refs to be looked up again
+# [ B] creating branches only causes those refs to be looked up again
+# [ C] other commands cause all the refs to be looked up again
+# [ C] peeking doesn't look up all the refs if they are unknown
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] Test.test_A_Breathing
+# [ B] Test.test_B_IncrementalUpdates
+# [ C] Test.test_C_FullUpdates
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+import phlgit_showref
+import phlgitu_fixture
+
+import phlgitx_refcache
+
+
+class _CountingRepo(object):
+
+    def __init__(self, repo):
+        super(_CountingRepo, self).__init__()
+        self._repo = repo
+        self.commands = []
+
+    def __call__(self, *args, **kwargs):
+        self.commands.append(args[0])
+        return self._repo(*args, **kwargs)
+
+    def count(self, command):
+        return self.commands.count(command)
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.fixture = phlgitu_fixture.CentralisedWithTwoWorkers()
+        self.counting_repo = _CountingRepo(self.fixture.w0.repo)
+        self.repo = phlgitx_refcache.Repo(self.counting_repo)
+
+    def tearDown(self):
+        self.fixture.close()
+
+    def _assert_matches_show_ref(self):
+        expected = phlgit_showref.hash_ref_pairs(self.fixture.w0.repo)
+        self.assertEqual(expected, self.repo.hash_ref_pairs)
+        self.assertEqual(
+            dict((r, h) for h, r in expected), self.repo.ref_to_hash)
+
+    def test_A_Breathing(self):
+        # [ A] the cached refs match 'git show-ref'
+        self._assert_matches_show_ref()
+        self.assertEqual(1, self.counting_repo.count('show-ref'))
+
+        # [ A] read-only commands don't cause the refs to be looked up again
+        self.repo('log', '-1')
+        self.repo('rev-parse', 'HEAD')
+        self.repo('diff', 'HEAD')
+        self.repo('checkout', 'refs/heads/master')
+        self._assert_matches_show_ref()
+        self.assertEqual(1, self.counting_repo.count('show-ref'))
+        self.assertEqual(0, self.counting_repo.count('for-each-ref'))
+
+    def test_B_IncrementalUpdates(self):
+        self._assert_matches_show_ref()
+
+        # [ B] pushes only cause the pushed tracking refs to be looked up
+        #      again
+        self.repo('push', 'origin', 'HEAD:refs/heads/topic')
+        self.repo('push', 'origin', 'master:other')
+        self._assert_matches_show_ref()
+        self.assertIn('refs/remotes/origin/topic', self.repo.ref_to_hash)
+        self.assertIn('refs/remotes/origin/other', self.repo.ref_to_hash)
+
+        self.repo('push', 'origin', '--delete', 'topic')
+        self.repo('push', 'origin', ':refs/heads/other')
+        self._assert_matches_show_ref()
+        self.assertNotIn(
+            'refs/remotes/origin/topic', self.repo.ref_to_hash)
+        self.assertNotIn(
+            'refs/remotes/origin/other', self.repo.ref_to_hash)
+
+        # [ B] creating branches only causes those refs to be looked up
+        #      again
+        self.repo('branch', 'mybranch')
+        self.repo('checkout', '-b', 'newbranch')
+        self._assert_matches_show_ref()
+        self.assertIn('refs/heads/mybranch', self.repo.ref_to_hash)
+        self.assertIn('refs/heads/newbranch', self.repo.ref_to_hash)
+
+        # [ B] deleting branches only causes those refs to be looked up
+        #      again
+        self.repo('checkout', 'master')
+        self.repo('branch', '-D', 'mybranch', 'newbranch')
+        self._assert_matches_show_ref()
+        self.assertNotIn('refs/heads/mybranch', self.repo.ref_to_hash)
+
+        self.assertEqual(1, self.counting_repo.count('show-ref'))
+
+    def test_C_FullUpdates(self):
+        self._assert_matches_show_ref()
+
+        # [ C] other commands cause all the refs to be looked up again
+        self.fixture.w1.repo('push', 'origin', 'HEAD:refs/heads/fetched')
+        self.repo('fetch')
+        self._assert_matches_show_ref()
+        self.assertIn('refs/remotes/origin/fetched', self.repo.ref_to_hash)
+        self.assertEqual(2, self.counting_repo.count('show-ref'))
+
+        # [ C] peeking doesn't look up all the refs if they are unknown
+        self.repo('push', '--all', 'origin')
+        self.assertIsNone(self.repo.peek_hash_ref_pairs())
+        self.assertEqual(2, self.counting_repo.count('show-ref'))
+
+        self.repo('branch', 'mybranch')
+        self.assertIsNone(self.repo.peek_hash_ref_pairs())
+        self._assert_matches_show_ref()
+        self.assertEqual(3, self.counting_repo.count('show-ref'))
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
@@ -0,0 +1,145 @@
+"""Run git commands using the '.gitattributes' from a tree, without checkout.
+
+Git only reads '.gitattributes' files from the working tree, or from the
+index for the commands that load it, e.g. 'git diff <commit>...<commit>'
+doesn't. To consider the attributes of a particular commit, the usual option
+is to check it out, which rewrites the whole working tree.
+
+Instead, keep a linked worktree that contains nothing but the
+'.gitattributes' files of the tree of interest. Commands that are run there
+consider those attributes, and the main working tree is never touched.
+
+Note that '.git/info/attributes' is shared with the linked worktree, so
+overrides there still apply.
+
+"""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlgitx_treeattributes
+#
+# Public Classes:
+#   AttributesWorktree
+#    .repo_for_tree
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+
+import phlsys_fs
+import phlsys_git
+
+_WORKTREE_DIRNAME = 'attributes-worktree'
+_ATTRIBUTES_FILENAME = '.gitattributes'
+
+# records which tree the attributes in the worktree were written from
+_TREE_FILENAME = '.attributes-tree'
+
+
+class AttributesWorktree(object):
+
+    """A linked worktree that only holds the '.gitattributes' of a tree."""
+
+    def __init__(self, repo):
+        """Initialise to make the worktree for 'repo', when first needed.
+
+        :repo: a callable supporting git commands, e.g. repo("status")
+
+        """
+        super(AttributesWorktree, self).__init__()
+        self._repo = repo
+        self._path = None
+        self._worktree_repo = None
+
+    def repo_for_tree(self, treeish):
+        """Return a repo callable which uses the attributes from 'treeish'.
+
+        Note that the returned callable is only valid until the next call to
+        this function, from any process.
+
+        :treeish: the string name of the tree, e.g. 'origin/master'
+        :returns: a callable supporting git commands, e.g. repo("status")
+
+        """
+        self._ensure_worktree()
+
+        # the worktree may be shared with other processes, so keep track of
+        # which tree it holds on disk rather than in memory
+        tree = self._repo('rev-parse', treeish + '^{tree}').strip()
+        tree_path = os.path.join(self._path, _TREE_FILENAME)
+        if not os.path.exists(tree_path) or (
+                phlsys_fs.read_text_file(tree_path) != tree):
+            phlsys_fs.delete_file_if_exists(tree_path)
+            self._write_attributes(tree)
+            phlsys_fs.write_text_file(tree_path, tree)
+
+        return self._worktree_repo
+
+    def _ensure_worktree(self):
+        if self._path is None:
+            git_dir = self._repo('rev-parse', '--absolute-git-dir').strip()
+            self._path = os.path.join(git_dir, _WORKTREE_DIRNAME)
+
+        if os.path.isfile(os.path.join(self._path, '.git')):
+            if self._worktree_repo is None:
+                self._worktree_repo = phlsys_git.Repo(self._path)
+            return
+
+        # the worktree may be left over from a different clone, e.g. if the
+        # repo was moved, so start again
+        if os.path.exists(self._path):
+            shutil.rmtree(self._path)
+        self._repo('worktree', 'prune')
+        self._repo(
+            'worktree', 'add', '--detach', '--no-checkout', self._path)
+
+        # the index isn't used for attributes by the commands that we care
+        # about, it's just a cost to maintain
+        self._worktree_repo = phlsys_git.Repo(self._path)
+        self._worktree_repo('read-tree', '--empty')
+
+    def _write_attributes(self, tree):
+        for name in os.listdir(self._path):
+            if name == '.git':
+                continue
+            path = os.path.join(self._path, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+        ls_tree = self._repo('ls-tree', '-r', '-z', '--full-tree', tree)
+        for entry in ls_tree.split('\0'):
+            if not entry:
+                continue
+            info, path = entry.split('\t', 1)
+            object_type, sha1 = info.split()[1:]
+            filename = os.path.basename(path)
+            if object_type == 'blob' and filename == _ATTRIBUTES_FILENAME:
+                phlsys_fs.write_text_file(
+                    os.path.join(self._path, path),
+                    self._worktree_repo.read_blob(sha1))
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
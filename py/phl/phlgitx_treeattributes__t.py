@@ -0,0 +1,110 @@
+"""Test suite for phlgitx_treeattributes."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] only the '.gitattributes' files of the tree are in the worktree
+# [ A] switching trees removes attributes that aren't in the new tree
+# [ B] instances sharing a repo notice changes made by each other
+# [ B] a removed worktree is made again
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] Test.test_A_Breathing
+# [ B] Test.test_B_SharedWorktree
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import unittest
+
+import phlgitu_fixture
+
+import phlgitx_treeattributes
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.worker_context = phlgitu_fixture.lone_worker_context()
+        self.worker = self.worker_context.__enter__()
+        self.repo = self.worker.repo
+
+        os.mkdir(os.path.join(self.repo.working_dir, 'sub'))
+        self.worker.commit_new_file('add text', 'sub/text.txt', 'text')
+        self.worker.commit_new_file_on_new_branch(
+            'branch', 'add attributes', 'sub/.gitattributes', '*.txt -diff')
+        self.worker.checkout_master()
+
+    def tearDown(self):
+        self.worker_context.__exit__(None, None, None)
+
+    def _list_files(self, repo):
+        files = []
+        for dirpath, dirnames, filenames in os.walk(repo.working_dir):
+            if '.git' in filenames:
+                filenames.remove('.git')
+            files.extend(
+                os.path.relpath(os.path.join(dirpath, name), repo.working_dir)
+                for name in filenames
+                if not name.startswith('.attributes'))
+        return sorted(files)
+
+    def test_A_Breathing(self):
+        attributes = phlgitx_treeattributes.AttributesWorktree(self.repo)
+
+        # [ A] only the '.gitattributes' files of the tree are in the worktree
+        branch_repo = attributes.repo_for_tree('branch')
+        self.assertEqual(
+            ['sub/.gitattributes'], self._list_files(branch_repo))
+        self.assertEqual(
+            'sub/text.txt: diff: unset\n',
+            branch_repo('check-attr', 'diff', 'sub/text.txt'))
+
+        # [ A] switching trees removes attributes that aren't in the new tree
+        master_repo = attributes.repo_for_tree('master')
+        self.assertEqual([], self._list_files(master_repo))
+        self.assertEqual(
+            'sub/text.txt: diff: unspecified\n',
+            master_repo('check-attr', 'diff', 'sub/text.txt'))
+
+    def test_B_SharedWorktree(self):
+        attributes = phlgitx_treeattributes.AttributesWorktree(self.repo)
+        other_attributes = phlgitx_treeattributes.AttributesWorktree(
+            self.repo)
+
+        # [ B] instances sharing a repo notice changes made by each other
+        attributes.repo_for_tree('branch')
+        other_attributes.repo_for_tree('master')
+        branch_repo = attributes.repo_for_tree('branch')
+        self.assertEqual(
+            ['sub/.gitattributes'], self._list_files(branch_repo))
+
+        # [ B] a removed worktree is made again
+        shutil.rmtree(branch_repo.working_dir)
+        branch_repo = attributes.repo_for_tree('branch')
+        self.assertEqual(
+            ['sub/.gitattributes'], self._list_files(branch_repo))
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
@@ -10,6 +10,11 @@
 #    .cycle_results
 #    .finish_results
 #    .num_active_jobs
+#   PersistentCyclingPool
+#    .cycle_results
+#    .finish_results
+#    .num_active_jobs
+#    .num_workers
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -22,6 +27,7 @@ from __future__ import print_function
 import multiprocessing
 import multiprocessing.queues
 import os
+import resource
 
 import phlsys_timer
 
@@ -81,20 +87,7 @@ class CyclingPool(object):
         """
         super(CyclingPool, self).__init__()
 
-        if max_workers < 1:
-            raise ValueError(
-                'invalid value for max_workers: {}'.format(max_workers))
-
-        if max_overrunnable < 0:
-            raise ValueError(
-                'invalid value for max_overrunnable: {}'.format(
-                    max_overrunnable))
-
-        if max_overrunnable >= max_workers:
-            raise ValueError(
-                'invalid value for max_overrunnable: {}, should be less '
-                'than max_workers: {}'.format(
-                    max_overrunnable, max_workers))
+        _check_worker_limits(max_workers, max_overrunnable)
 
         self._job_list = job_list
         self._max_workers = max_workers
@@ -105,7 +98,7 @@ class CyclingPool(object):
         self._pool_list = _PoolList()
         self._active_job_index_set = set()
 
-    def cycle_results(self, overrun_secs):
+    def cycle_results(self, overrun_secs, job_index_set=None):
         """Yield the results from a run of all the jobs.
 
         If overrun_secs elapse and max_overrunnable is nonzero then jobs may be
@@ -118,6 +111,7 @@ class CyclingPool(object):
         the overrun job has finished.
 
         :overrun_secs: seconds to wait before considering leaving jobs behind
+        :job_index_set: the indices of the jobs to start, or None for all
         :yields: an (index, result) tuple
 
         """
@@ -129,7 +123,8 @@ class CyclingPool(object):
         def overrun_condition():
             return timer.duration >= overrun_secs
 
-        for index, result in self._cycle_results(overrun_condition):
+        for index, result in self._cycle_results(
+                overrun_condition, job_index_set):
             yield index, result
 
     def finish_results(self):
@@ -148,13 +143,13 @@ class CyclingPool(object):
             self._active_job_index_set.remove(index)
             yield index, result
 
-    def _cycle_results(self, overrun_condition):
+    def _cycle_results(self, overrun_condition, job_index_set=None):
 
         # clear up any dead pools and yield results
         for i, res in self._overrun_cycle_results():
             yield i, res
 
-        self._start_new_cycle()
+        self._start_new_cycle(job_index_set)
 
         # wait for results, overrun if half our workers are available
         should_break = False
@@ -169,16 +164,21 @@ class CyclingPool(object):
             for index, result in self._overrun_cycle_results():
                 yield index, result
 
-    def _start_new_cycle(self):
+    def _start_new_cycle(self, job_index_set=None):
+
+        inactive_job_index_set = _calc_inactive_job_index_set(
+            len(self._job_list), self._active_job_index_set, job_index_set)
+        if not inactive_job_index_set:
+            return
 
         active_workers = self._pool_list.count_active_workers()
-        max_new_workers = self._max_workers - active_workers
+        max_new_workers = min(
+            self._max_workers - active_workers,
+            len(inactive_job_index_set))
 
         pool = _Pool(self._job_list, max_new_workers)
 
         # schedule currently inactive jobs in the new pool
-        all_job_index_set = set(xrange(len(self._job_list)))
-        inactive_job_index_set = all_job_index_set - self._active_job_index_set
         for i in inactive_job_index_set:
             pool.add_job_index(i)
             self._active_job_index_set.add(i)
@@ -187,6 +187,308 @@ class CyclingPool(object):
         self._pool_list.add_pool(pool)
 
 
+class PersistentCyclingPool(object):
+
+    """Like CyclingPool, except that worker processes live across cycles.
+
+    Forking new workers every cycle means that any state which the jobs build
+    up while running is thrown away at the end of each cycle. Here the
+    workers are kept and each job is preferably run on the worker that ran it
+    last, so that such state stays warm.
+
+    As the worker's copy of a job is not renewed each cycle, jobs must also
+    support this protocol to keep the worker's copy in step:
+
+        job.get_data_for_worker(is_worker_current) -> data
+        job.merge_from_parent(data)
+
+    The first is called in this process before sending a job to a worker, the
+    second is called in the worker with the result, before calling the job.
+    If 'is_worker_current' is False then the worker's copy of the job may be
+    out of date, e.g. the job was last run on a different worker.
+
+    Idle workers are replaced if they have run 'max_jobs_per_worker' jobs or
+    if their peak resident set size has exceeded 'max_worker_rss_mb'.
+
+    """
+
+    def __init__(
+            self,
+            job_list,
+            max_workers,
+            max_overrunnable,
+            max_jobs_per_worker=None,
+            max_worker_rss_mb=None):
+        """Create a PersistentCyclingPool to cycle over 'job_list'.
+
+        :job_list: a list of callables to execute in worker processes
+        :max_workers: the maximum number of worker processes to make
+        :max_overrunnable: the maximum number of workers to leave behind
+        :max_jobs_per_worker: the number of jobs to run before replacing a
+            worker, or None to never replace on that basis
+        :max_worker_rss_mb: the peak RSS in MB above which to replace a
+            worker, or None to never replace on that basis
+
+        """
+        super(PersistentCyclingPool, self).__init__()
+
+        _check_worker_limits(max_workers, max_overrunnable)
+
+        if max_jobs_per_worker is not None and max_jobs_per_worker < 1:
+            raise ValueError(
+                'invalid value for max_jobs_per_worker: {}'.format(
+                    max_jobs_per_worker))
+
+        if max_worker_rss_mb is not None and max_worker_rss_mb < 1:
+            raise ValueError(
+                'invalid value for max_worker_rss_mb: {}'.format(
+                    max_worker_rss_mb))
+
+        self._job_list = job_list
+        self._max_workers = min(max_workers, len(job_list))
+        self._overunnable_workers = _calc_overrunnable_workers(
+            max_workers=max_workers,
+            max_overrunnable=max_overrunnable,
+            num_jobs=len(job_list))
+        self._max_jobs_per_worker = max_jobs_per_worker
+        self._max_worker_rss_mb = max_worker_rss_mb
+
+        # pychecker makes us do this, it won't recognise that
+        # multiprocessing.queues is a thing.
+        mp = multiprocessing
+        self._results_queue = mp.queues.SimpleQueue()
+
+        self._worker_dict = {}
+        self._retired_worker_list = []
+        self._next_worker_id = 0
+
+        # the number of results received so far, used to determine if a
+        # worker was forked after the last result for a job was merged
+        self._num_results = 0
+        self._job_index_to_last_result = {}
+
+        self._pending_job_index_list = []
+        self._active_job_index_set = set()
+
+    def cycle_results(self, overrun_secs, job_index_set=None):
+        """Yield the results from a run of all the jobs.
+
+        The semantics are the same as for CyclingPool.cycle_results.
+
+        :overrun_secs: seconds to wait before considering leaving jobs behind
+        :job_index_set: the indices of the jobs to start, or None for all
+        :yields: an (index, result) tuple
+
+        """
+        timer = phlsys_timer.Timer()
+        timer.start()
+
+        def overrun_condition():
+            return timer.duration >= overrun_secs
+
+        for index, result in self._cycle_results(
+                overrun_condition, job_index_set):
+            yield index, result
+
+    def finish_results(self):
+        """Yield the results from any outstanding jobs, block until done.
+
+        All the workers are stopped once the results are yielded.
+
+        """
+        while self._active_job_index_set:
+            for index, result in self._overrun_cycle_results():
+                yield index, result
+
+        for worker in self._worker_dict.itervalues():
+            worker.stop()
+        self._retired_worker_list.extend(self._worker_dict.itervalues())
+        self._worker_dict = {}
+        for worker in self._retired_worker_list:
+            worker.join()
+        self._retired_worker_list = []
+
+    @property
+    def num_active_jobs(self):
+        """Return the number of jobs not yet yielded."""
+        return len(self._active_job_index_set)
+
+    @property
+    def num_workers(self):
+        """Return the number of worker processes currently kept."""
+        return len(self._worker_dict)
+
+    def _count_busy_workers(self):
+        return sum(1 for w in self._worker_dict.itervalues() if w.is_busy)
+
+    def _overrun_cycle_results(self):
+
+        while not self._results_queue.empty():
+            worker_id, index, result, max_rss_mb = self._results_queue.get()
+
+            # the worker may have died after sending the result but before we
+            # read it, in which case its job was already retired and will be
+            # started again, so the result must be dropped
+            worker = self._worker_dict.get(worker_id)
+            if worker is None or index not in self._active_job_index_set:
+                continue
+
+            self._num_results += 1
+            self._job_index_to_last_result[index] = (
+                worker_id, self._num_results)
+            worker.finish_job(max_rss_mb)
+            self._active_job_index_set.remove(index)
+            yield index, result
+
+        # note that we must only fork new workers once the results have been
+        # merged by our caller, so that the new workers have the latest
+        # version of the jobs.
+        self._retire_workers()
+        self._dispatch_pending_jobs()
+
+    def _cycle_results(self, overrun_condition, job_index_set=None):
+
+        # yield results from any overrunning jobs
+        for i, res in self._overrun_cycle_results():
+            yield i, res
+
+        self._start_new_cycle(job_index_set)
+
+        should_break = False
+        while not should_break:
+
+            should_break = _calc_should_overrun(
+                num_active=self._count_busy_workers(),
+                num_overrunnable=self._overunnable_workers,
+                condition=overrun_condition,
+                is_finished=not self._active_job_index_set)
+
+            for index, result in self._overrun_cycle_results():
+                yield index, result
+
+    def _start_new_cycle(self, job_index_set=None):
+        inactive_job_index_set = _calc_inactive_job_index_set(
+            len(self._job_list), self._active_job_index_set, job_index_set)
+        for i in sorted(inactive_job_index_set):
+            self._pending_job_index_list.append(i)
+            self._active_job_index_set.add(i)
+        self._dispatch_pending_jobs()
+
+    def _retire_workers(self):
+
+        for worker_id, worker in self._worker_dict.items():
+            if not worker.is_alive():
+                # the worker died unexpectedly, make sure that its job is
+                # scheduled again next cycle rather than lost forever
+                if worker.is_busy:
+                    self._active_job_index_set.discard(worker.job_index)
+                worker.join()
+                del self._worker_dict[worker_id]
+                continue
+            if worker.is_busy:
+                continue
+            too_many_jobs = (
+                self._max_jobs_per_worker is not None and
+                worker.num_jobs >= self._max_jobs_per_worker)
+            too_big = (
+                self._max_worker_rss_mb is not None and
+                worker.max_rss_mb >= self._max_worker_rss_mb)
+            if too_many_jobs or too_big:
+                worker.stop()
+                self._retired_worker_list.append(worker)
+                del self._worker_dict[worker_id]
+
+        still_running = []
+        for worker in self._retired_worker_list:
+            if worker.is_alive():
+                still_running.append(worker)
+            else:
+                worker.join()
+        self._retired_worker_list = still_running
+
+    def _dispatch_pending_jobs(self):
+
+        while self._pending_job_index_list:
+            idle_workers = [
+                w for w in self._worker_dict.itervalues() if not w.is_busy
+            ]
+            if idle_workers:
+                worker = idle_workers[0]
+            elif len(self._worker_dict) < self._max_workers:
+                worker = self._start_worker()
+            else:
+                break
+
+            index = self._pop_pending_job_index_for_worker(worker)
+            job = self._job_list[index]
+            data = job.get_data_for_worker(
+                self._is_worker_current(worker, index))
+            worker.start_job(index, data)
+
+    def _start_worker(self):
+        worker = _PersistentWorker(
+            self._next_worker_id,
+            self._job_list,
+            self._results_queue,
+            self._num_results)
+        self._worker_dict[worker.worker_id] = worker
+        self._next_worker_id += 1
+        return worker
+
+    def _is_worker_current(self, worker, job_index):
+        last_result = self._job_index_to_last_result.get(job_index)
+        if last_result is None:
+            return True
+        last_worker_id, result_number = last_result
+        if last_worker_id == worker.worker_id:
+            return True
+        return worker.forked_after_result_number >= result_number
+
+    def _pop_pending_job_index_for_worker(self, worker):
+
+        # prefer jobs that last ran on this worker, then jobs that have no
+        # other living worker to go to, then anything else
+        orphan_position = None
+        for position, index in enumerate(self._pending_job_index_list):
+            last_result = self._job_index_to_last_result.get(index)
+            last_worker_id = last_result[0] if last_result else None
+            if last_worker_id == worker.worker_id:
+                return self._pending_job_index_list.pop(position)
+            is_orphan = last_worker_id not in self._worker_dict
+            if is_orphan and orphan_position is None:
+                orphan_position = position
+
+        if orphan_position is None:
+            orphan_position = 0
+
+        return self._pending_job_index_list.pop(orphan_position)
+
+
+def _check_worker_limits(max_workers, max_overrunnable):
+
+    if max_workers < 1:
+        raise ValueError(
+            'invalid value for max_workers: {}'.format(max_workers))
+
+    if max_overrunnable < 0:
+        raise ValueError(
+            'invalid value for max_overrunnable: {}'.format(
+                max_overrunnable))
+
+    if max_overrunnable >= max_workers:
+        raise ValueError(
+            'invalid value for max_overrunnable: {}, should be less '
+            'than max_workers: {}'.format(
+                max_overrunnable, max_workers))
+
+
+def _calc_inactive_job_index_set(
+        num_jobs, active_job_index_set, job_index_set):
+    if job_index_set is None:
+        job_index_set = set(xrange(num_jobs))
+    return set(job_index_set) - active_job_index_set
+
+
 def _calc_overrunnable_workers(max_workers, max_overrunnable, num_jobs):
     return min(
         max_workers - 1,
@@ -287,11 +589,76 @@ class _Pool(object):
         return not self._worker_list
 
 
-def _start_worker_process(job_list, work_queue, results_queue):
+class _PersistentWorker(object):
+
+    def __init__(
+            self, worker_id, job_list, results_queue, num_results_so_far):
+        super(_PersistentWorker, self).__init__()
+
+        # pychecker makes us do this, it won't recognise that
+        # multiprocessing.queues is a thing.
+        mp = multiprocessing
+        self._job_queue = mp.queues.SimpleQueue()
+
+        self.worker_id = worker_id
+        self.forked_after_result_number = num_results_so_far
+        self.num_jobs = 0
+        self.max_rss_mb = 0
+        self._job_index = None
+
+        self._process = _start_worker_process(
+            job_list,
+            self._job_queue,
+            results_queue,
+            target=_persistent_worker_process,
+            args=(worker_id,),
+            daemon=True)
+
+    @property
+    def job_index(self):
+        return self._job_index
+
+    @property
+    def is_busy(self):
+        return self._job_index is not None
+
+    def start_job(self, job_index, data):
+        assert not self.is_busy
+        self._job_index = job_index
+        self._job_queue.put((job_index, data))
+
+    def finish_job(self, max_rss_mb):
+        assert self.is_busy
+        self._job_index = None
+        self.num_jobs += 1
+        self.max_rss_mb = max_rss_mb
+
+    def stop(self):
+        # the worker process will stop when it processes 'None'
+        self._job_queue.put(None)
+
+    def is_alive(self):
+        return self._process.is_alive()
+
+    def join(self):
+        self._process.join()
+
+
+def _start_worker_process(
+        job_list,
+        work_queue,
+        results_queue,
+        target=None,
+        args=(),
+        daemon=False):
+
+    if target is None:
+        target = _worker_process
 
     worker = multiprocessing.Process(
-        target=_worker_process,
-        args=(job_list, work_queue, results_queue))
+        target=target,
+        args=(job_list, work_queue, results_queue) + tuple(args))
+    worker.daemon = daemon
 
     pid = os.getpid()
 
@@ -321,6 +688,23 @@ def _worker_process(job_list, work_queue, results_queue):
         results_queue.put((job_index, results))
 
 
+def _persistent_worker_process(job_list, work_queue, results_queue, worker_id):
+    while True:
+        item = work_queue.get()
+        if item is None:
+            break
+        job_index, data = item
+        job = job_list[job_index]
+        job.merge_from_parent(data)
+        results = job()
+        results_queue.put((worker_id, job_index, results, _get_max_rss_mb()))
+
+
+def _get_max_rss_mb():
+    # N.B. 'ru_maxrss' is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+
+
 # -----------------------------------------------------------------------------
 # Copyright (C) 2014-2015 Bloomberg Finance L.P.
 #
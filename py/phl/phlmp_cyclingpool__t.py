@@ -36,6 +36,17 @@
 # [ H] CyclingPool processes all jobs at least once when overrunning
 # [ H] CyclingPool does not duplicate overrun jobs
 # [ H] CyclingPool reports active overrunning jobs
+# [ I] persistent pool returns correct results for job indices
+# [ I] persistent pool uses current state of jobs from parent
+# [ I] persistent pool re-uses the same workers across cycles
+# [ I] persistent pool stops all workers after 'finish_results'
+# [ J] persistent pool replaces workers after max_jobs_per_worker
+# [ K] persistent pool reports active jobs when overrunning
+# [ K] persistent pool does not start overrunning jobs again
+# [ K] persistent pool finishes all overrun jobs
+# [ L] pools only start the jobs in 'job_index_set'
+# [ M] persistent pool drops results from workers that were retired
+# [ M] persistent pool drops results for jobs that aren't active
 # -----------------------------------------------------------------------------
 # Tests:
 # [ A] test_A_pool_breathing
@@ -46,6 +57,11 @@
 # [ F] test_F_can_overrun
 # [ G] test_G_can_cycle
 # [ H] test_H_can_overrun_cycle
+# [ I] test_I_persistent_breathing
+# [ J] test_J_persistent_recycles_workers
+# [ K] test_K_persistent_can_overrun
+# [ L] test_L_job_index_set
+# [ M] test_M_persistent_drops_late_results
 # =============================================================================
 
 from __future__ import absolute_import
@@ -54,6 +70,7 @@ from __future__ import print_function
 
 import collections
 import multiprocessing
+import os
 import unittest
 
 import phlmp_cyclingpool
@@ -79,6 +96,25 @@ class _LockedJob(object):
             return self.value
 
 
+class _PersistentTestJob(object):
+
+    def __init__(self, value, lock=None):
+        self.value = value
+        self.lock = lock
+
+    def get_data_for_worker(self, is_worker_current):
+        return self.value
+
+    def merge_from_parent(self, data):
+        self.value = data
+
+    def __call__(self):
+        if self.lock is not None:
+            with self.lock:
+                pass
+        return self.value, os.getpid()
+
+
 def _false_condition():
     return False
 
@@ -450,6 +486,158 @@ class Test(unittest.TestCase):
 
         return result_list
 
+    def test_I_persistent_breathing(self):
+
+        num_loops = 3
+        num_jobs = 100
+        job_list = [_PersistentTestJob(i) for i in xrange(num_jobs)]
+        max_workers = max(2, multiprocessing.cpu_count())
+        max_overrunnable = max_workers // 2
+
+        pool = phlmp_cyclingpool.PersistentCyclingPool(
+            job_list, max_workers, max_overrunnable)
+
+        pid_set_list = []
+        for i in xrange(num_loops):
+            loop_offset = i * num_jobs
+            pid_set = set()
+            result_list = []
+            for index, result in pool._cycle_results(_false_condition):
+                value, pid = result
+                # [ I] persistent pool returns correct results for job indices
+                # [ I] persistent pool uses current state of jobs from parent
+                self.assertEqual(index + loop_offset, value)
+                result_list.append(value)
+                pid_set.add(pid)
+            pid_set_list.append(pid_set)
+
+            self.assertSetEqual(
+                set(result_list),
+                set(xrange(loop_offset, loop_offset + num_jobs)))
+            self.assertEqual(pool.num_active_jobs, 0)
+
+            for job in job_list:
+                job.value += num_jobs
+
+        # [ I] persistent pool re-uses the same workers across cycles
+        all_pids = set.union(*pid_set_list)
+        self.assertTrue(len(all_pids) <= max_workers)
+        self.assertNotIn(os.getpid(), all_pids)
+
+        # [ I] persistent pool stops all workers after 'finish_results'
+        self.assertFalse(list(pool.finish_results()))
+        self.assertEqual(pool.num_workers, 0)
+
+    def test_J_persistent_recycles_workers(self):
+
+        max_workers = 2
+        job_list = [_PersistentTestJob(i) for i in xrange(max_workers)]
+        pool = phlmp_cyclingpool.PersistentCyclingPool(
+            job_list, max_workers, 0, max_jobs_per_worker=1)
+
+        pid_set_list = []
+        for _ in xrange(2):
+            pid_set_list.append(set(
+                result[1]
+                for _, result in pool._cycle_results(_false_condition)))
+
+        # [ J] persistent pool replaces workers after max_jobs_per_worker
+        self.assertFalse(pid_set_list[0] & pid_set_list[1])
+
+        list(pool.finish_results())
+
+    def test_K_persistent_can_overrun(self):
+
+        lock = multiprocessing.Lock()
+
+        max_workers = 10
+        max_overrunnable = max_workers // 2
+        input_list = list(xrange(max_workers))
+        block_input_list = input_list[:max_overrunnable]
+        normal_input_list = input_list[max_overrunnable:]
+
+        job_list = [_PersistentTestJob(i, lock) for i in block_input_list]
+        job_list += [_PersistentTestJob(i) for i in normal_input_list]
+
+        result_list = []
+        pool = phlmp_cyclingpool.PersistentCyclingPool(
+            job_list, max_workers, max_overrunnable)
+
+        # Acquire lock before starting cycles, to ensure that blocking jobs
+        # jobs won't complete. This will force the pool to overrun those jobs.
+        with lock:
+            for _ in xrange(2):
+                for index, result in pool._cycle_results(_true_condition):
+                    self.assertEqual(index, result[0])
+                    result_list.append(result[0])
+
+                # [ K] persistent pool reports active jobs when overrunning
+                self.assertEqual(pool.num_active_jobs, max_overrunnable)
+
+        # [ K] persistent pool does not start overrunning jobs again
+        self.assertEqual(
+            sorted(result_list),
+            sorted(normal_input_list + normal_input_list))
+
+        for index, result in pool.finish_results():
+            result_list.append(result[0])
+
+        # [ K] persistent pool finishes all overrun jobs
+        self.assertSetEqual(set(result_list), set(input_list))
+        self.assertEqual(pool.num_active_jobs, 0)
+
+    def test_L_job_index_set(self):
+
+        num_jobs = 10
+        job_index_set = {1, 3, 5}
+        max_workers = 4
+        max_overrunnable = max_workers // 2
+
+        pool_list = [
+            phlmp_cyclingpool.CyclingPool(
+                [_TestJob(i) for i in xrange(num_jobs)],
+                max_workers,
+                max_overrunnable),
+            phlmp_cyclingpool.PersistentCyclingPool(
+                [_PersistentTestJob(i) for i in xrange(num_jobs)],
+                max_workers,
+                max_overrunnable),
+        ]
+
+        for pool in pool_list:
+            index_set = set(
+                i for i, _ in pool._cycle_results(
+                    _false_condition, job_index_set))
+
+            # [ L] pools only start the jobs in 'job_index_set'
+            self.assertSetEqual(index_set, job_index_set)
+
+            self.assertFalse(list(pool._cycle_results(_false_condition, [])))
+            list(pool.finish_results())
+
+    def test_M_persistent_drops_late_results(self):
+
+        num_jobs = 2
+        pool = phlmp_cyclingpool.PersistentCyclingPool(
+            [_PersistentTestJob(i) for i in xrange(num_jobs)], 1, 0)
+        self.assertEqual(
+            sorted(i for i, _ in pool._cycle_results(_false_condition)),
+            range(num_jobs))
+        worker_id = next(iter(pool._worker_dict))
+
+        # [ M] persistent pool drops results from workers that were retired
+        pool._active_job_index_set.add(0)
+        pool._results_queue.put((worker_id + 1, 0, (0, 0), 1))
+        self.assertFalse(list(pool._overrun_cycle_results()))
+        pool._active_job_index_set.clear()
+
+        # [ M] persistent pool drops results for jobs that aren't active
+        pool._results_queue.put((worker_id, 1, (1, 0), 1))
+        self.assertFalse(list(pool._overrun_cycle_results()))
+
+        self.assertEqual(pool.num_active_jobs, 0)
+        list(pool.finish_results())
+
 
 # -----------------------------------------------------------------------------
 # Copyright (C) 2014 Bloomberg Finance L.P.
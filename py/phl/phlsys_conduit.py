@@ -15,6 +15,8 @@
 #    .ping
 #   MultiConduit
 #    .call_as_user
+#    .raw_call_as_user
+#    .raw_call
 #    .conduit_uri
 #   CallMultiConduitAsUser
 #
@@ -22,8 +24,14 @@
 #   act_as_user_context
 #   make_conduit_uri
 #   make_phab_example_conduit
+#   call_concurrently
+#   get_call_stats
+#   reset_call_stats
+#   merge_call_stats
+#   close_idle_connections
 #
 # Public Assignments:
+#   CallStats
 #   SESSION_ERROR
 #   CONDUITPROXY_ERROR_CONNECT
 #   CONDUITPROXY_ERROR_BADAUTH
@@ -36,10 +44,18 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import base64
+import collections
 import contextlib
 import hashlib
+import httplib
 import json
 import logging
+import os
+import socket
+import StringIO
+import sys
+import threading
 import time
 import urllib
 import urllib2
@@ -51,6 +67,12 @@ import phlsys_multiprocessing
 
 _URLLIB_TIMEOUT = 600
 
+# Phabricator supports 5 simultaneous connections per user by default:
+#
+#   conf/default.conf.php:  'auth.sessions.conduit'       => 5,
+#
+_MAX_SESSIONS_PER_USER = 5
+
 # TODO: handle re-authentication when the token expires
 # TODO: allow connections without specifying user details where possible
 
@@ -131,6 +153,391 @@ def make_phab_example_conduit():
         test_data.PHAB.certificate)
 
 
+def call_concurrently(conduit, call_list, max_workers=None):
+    """Return the list of results from making the independent 'call_list'.
+
+    Each call is made on a separate thread, with at most 'max_workers' calls
+    in flight at once. The results are returned in the same order as the
+    calls in 'call_list'.
+
+    If any of the calls raise then the first exception in 'call_list' order
+    is re-raised, after all the calls have finished.
+
+    Usage Example:
+        conduit = make_phab_example_conduit()
+        call_concurrently(
+            conduit, [("user.whoami", None), ("conduit.ping", None)])
+
+    :conduit: a callable like Conduit, MultiConduit or CallMultiConduitAsUser
+    :call_list: an iterable of (method, param_dict) to call
+    :max_workers: the maximum number of threads to use, or None for default
+    :returns: a list of results, in 'call_list' order
+
+    """
+    call_list = list(call_list)
+    if max_workers is None:
+        max_workers = _MAX_SESSIONS_PER_USER
+
+    results = [None] * len(call_list)
+    exc_infos = [None] * len(call_list)
+    pending = collections.deque(enumerate(call_list))
+
+    def worker():
+        while True:
+            try:
+                index, (method, param_dict) = pending.popleft()
+            except IndexError:
+                return
+            try:
+                results[index] = conduit(method, param_dict)
+            except Exception:
+                exc_infos[index] = sys.exc_info()
+
+    threads = [
+        threading.Thread(target=worker)
+        for _ in xrange(min(max_workers, len(call_list)))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for exc_info in exc_infos:
+        if exc_info is not None:
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+    return results
+
+
+CallStats = collections.namedtuple(
+    'phlsys_conduit__CallStats',
+    ['calls', 'new_connections', 'reused_connections', 'total_secs',
+     'max_secs'])
+
+
+def get_call_stats():
+    """Return a dict of method to CallStats, for calls made by this process.
+
+    The counts of new and reused connections show the saving made by keeping
+    connections alive, compared to connecting once per call.
+
+    :returns: a dict of string method name to CallStats
+
+    """
+    with _STATS_LOCK:
+        return {
+            method: CallStats(*stats)
+            for method, stats in _METHOD_TO_STATS.iteritems()
+        }
+
+
+def reset_call_stats():
+    """Forget the stats gathered by this process so far.
+
+    :returns: None
+
+    """
+    with _STATS_LOCK:
+        _METHOD_TO_STATS.clear()
+
+
+def merge_call_stats(method_to_stats):
+    """Add the supplied stats to those of this process.
+
+    This is useful for gathering the stats of other processes, e.g. workers.
+
+    :method_to_stats: a dict of string method name to CallStats
+    :returns: None
+
+    """
+    with _STATS_LOCK:
+        for method, call_stats in method_to_stats.iteritems():
+            stats = _METHOD_TO_STATS.setdefault(method, [0, 0, 0, 0.0, 0.0])
+            stats[0] += call_stats.calls
+            stats[1] += call_stats.new_connections
+            stats[2] += call_stats.reused_connections
+            stats[3] += call_stats.total_secs
+            stats[4] = max(stats[4], call_stats.max_secs)
+
+
+_STATS_LOCK = threading.Lock()
+_METHOD_TO_STATS = {}
+
+
+def _record_call(method, secs, is_reused_connection):
+    with _STATS_LOCK:
+        stats = _METHOD_TO_STATS.setdefault(method, [0, 0, 0, 0.0, 0.0])
+        stats[0] += 1
+        if is_reused_connection:
+            stats[2] += 1
+        else:
+            stats[1] += 1
+        stats[3] += secs
+        stats[4] = max(stats[4], secs)
+
+
+class _ConnectionPool(object):
+
+    """Keep idle HTTP/1.1 connections, so they may be reused by later calls.
+
+    Connections are keyed on the (scheme, netloc, proxy) that they were made
+    for. Sockets must not be shared with forked processes, so the pool is
+    emptied if it is used from a different process to the one that filled it.
+
+    """
+
+    def __init__(self):
+        super(_ConnectionPool, self).__init__()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._key_to_idle = collections.defaultdict(list)
+
+    def get(self, key):
+        """Return an idle connection for 'key', or None if there are none."""
+        with self._lock:
+            self._check_pid()
+            idle = self._key_to_idle[key]
+            if idle:
+                return idle.pop()
+        return None
+
+    def put(self, key, connection):
+        """Make 'connection' available for reuse by later calls to 'get'."""
+        with self._lock:
+            self._check_pid()
+            self._key_to_idle[key].append(connection)
+
+    def clear(self):
+        """Close all the idle connections."""
+        with self._lock:
+            for idle in self._key_to_idle.itervalues():
+                for connection in idle:
+                    connection.close()
+            self._key_to_idle.clear()
+
+    def _check_pid(self):
+        pid = os.getpid()
+        if pid != self._pid:
+            # don't close them, the sockets are still in use by the parent
+            self._key_to_idle.clear()
+            self._pid = pid
+
+
+_CONNECTION_POOL = _ConnectionPool()
+
+
+def close_idle_connections():
+    """Close the connections kept alive for reuse by this process.
+
+    :returns: None
+
+    """
+    _CONNECTION_POOL.clear()
+
+
+def _make_connection(scheme, netloc, proxy):
+    proxy_headers = {}
+    if proxy:
+        if '://' not in proxy:
+            proxy = 'http://' + proxy
+        proxy_url = urlparse.urlsplit(proxy)
+        # pylint: disable=E1101
+        if proxy_url.username:
+            credentials = '{}:{}'.format(
+                urllib.unquote(proxy_url.username),
+                urllib.unquote(proxy_url.password or ''))
+            proxy_headers['Proxy-Authorization'] = 'Basic {}'.format(
+                base64.b64encode(credentials))
+        connect_netloc = proxy_url.hostname
+        if proxy_url.port:
+            connect_netloc += ':{}'.format(proxy_url.port)
+        # pylint: enable=E1101
+    else:
+        connect_netloc = netloc
+
+    if scheme == 'https':
+        connection = httplib.HTTPSConnection(
+            connect_netloc, timeout=_URLLIB_TIMEOUT)
+        if proxy:
+            host, _, port = netloc.partition(':')
+            connection.set_tunnel(host, int(port) if port else None,
+                                  proxy_headers)
+            proxy_headers = {}
+    else:
+        connection = httplib.HTTPConnection(
+            connect_netloc, timeout=_URLLIB_TIMEOUT)
+
+    return connection, proxy_headers
+
+
+class _UnsentRequestError(Exception):
+
+    """The server closed the connection without processing the request."""
+
+    def __init__(self, exc_info):
+        super(_UnsentRequestError, self).__init__(str(exc_info[1]))
+        self.exc_info = exc_info
+
+
+def _post_once(connection, selector, body, headers):
+    """Return (response, data) from POSTing 'body' on 'connection'.
+
+    Raise _UnsentRequestError if the server can't have processed the request,
+    so that it's safe to send again. Conduit calls may write, e.g. to create
+    a comment, so if the server may have processed the request then the
+    original error is raised.
+
+    """
+    try:
+        connection.request('POST', selector, body, headers)
+    except socket.timeout:
+        raise
+    except (httplib.HTTPException, socket.error):
+        raise _UnsentRequestError(sys.exc_info())
+
+    try:
+        response = connection.getresponse()
+    except httplib.BadStatusLine as e:
+        # an empty status line means the server closed the connection without
+        # responding, as it does when an idle connection is timed out
+        if not _is_empty_status_line(e):
+            raise
+        raise _UnsentRequestError(sys.exc_info())
+
+    data = response.read()
+    return response, data
+
+
+def _is_empty_status_line(bad_status_line):
+    """Return True if 'bad_status_line' was raised for an empty status line.
+
+    Versions of httplib differ in how they report this.
+
+        >>> _is_empty_status_line(httplib.BadStatusLine("''"))
+        True
+
+        >>> _is_empty_status_line(httplib.BadStatusLine('HTTP/1.1 2000'))
+        False
+
+    """
+    return bad_status_line.line in ('', "''") or (
+        bad_status_line.line.startswith('No status line received'))
+
+
+def _get_proxy(scheme, netloc, http_proxy, https_proxy):
+    """Return the address of the proxy to use for 'scheme', or None.
+
+    If neither 'http_proxy' or 'https_proxy' are supplied then use the
+    proxies from the environment, as urllib2.urlopen does. That is, honour
+    the 'http_proxy', 'https_proxy' and 'no_proxy' environment variables.
+
+    """
+    if http_proxy or https_proxy:
+        return https_proxy if scheme == 'https' else http_proxy
+
+    proxy = urllib.getproxies().get(scheme)
+    if proxy and urllib.proxy_bypass(netloc):
+        proxy = None
+    return proxy
+
+
+def _post(url, body, http_proxy, https_proxy):
+    """Return (data, is_reused_connection) from POSTing 'body' to 'url'.
+
+    Follow up to '_MAX_REDIRECTS' redirects, POSTing 'body' again to the new
+    location each time. Note that urllib2.urlopen would instead have dropped
+    the body and made a GET request, which conduit can't answer.
+
+    Raise urllib2.HTTPError if the final response status is not 200.
+
+    """
+    for _ in xrange(_MAX_REDIRECTS):
+        try:
+            return _post_no_redirect(url, body, http_proxy, https_proxy)
+        except urllib2.HTTPError as e:
+            location = e.hdrs.get('Location') if e.hdrs else None
+            if e.code not in _REDIRECT_CODES or not location:
+                raise
+            new_url = urlparse.urljoin(url, location)
+            logging.warning(
+                "phlsys_conduit: redirected from {} to {}, consider "
+                "updating the uri".format(url, new_url))
+            url = new_url
+
+    return _post_no_redirect(url, body, http_proxy, https_proxy)
+
+
+_MAX_REDIRECTS = 5
+
+# 303 is left out as it asks us to GET the new location, which won't work
+_REDIRECT_CODES = (301, 302, 307, 308)
+
+
+def _post_no_redirect(url, body, http_proxy, https_proxy):
+    """Return (data, is_reused_connection) from POSTing 'body' to 'url'.
+
+    Raise urllib2.HTTPError if the response status is not 200.
+
+    """
+    url_parts = urlparse.urlsplit(url)
+    # pylint: disable=E1101
+    scheme = url_parts.scheme
+    netloc = url_parts.netloc
+    selector = urlparse.urlunsplit(
+        ('', '', url_parts.path or '/', url_parts.query, ''))
+    # pylint: enable=E1101
+
+    proxy = _get_proxy(scheme, netloc, http_proxy, https_proxy)
+    if proxy and scheme != 'https':
+        # plain http proxies expect the full url in the request line
+        selector = url
+
+    key = (scheme, netloc, proxy)
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+    connection = _CONNECTION_POOL.get(key)
+    is_reused = connection is not None
+    if not is_reused:
+        connection, proxy_headers = _make_connection(scheme, netloc, proxy)
+        headers.update(proxy_headers)
+        connection.proxy_headers = proxy_headers
+    else:
+        headers.update(connection.proxy_headers)
+
+    while True:
+        try:
+            response, data = _post_once(connection, selector, body, headers)
+            break
+        except _UnsentRequestError as e:
+            connection.close()
+            if not is_reused:
+                raise e.exc_info[0], e.exc_info[1], e.exc_info[2]
+            # the server may have closed the idle connection, try once more
+            # with a fresh connection
+            is_reused = False
+            connection, proxy_headers = _make_connection(scheme, netloc, proxy)
+            connection.proxy_headers = proxy_headers
+            headers.update(proxy_headers)
+        except Exception:
+            connection.close()
+            raise
+
+    if response.will_close:
+        connection.close()
+    else:
+        _CONNECTION_POOL.put(key, connection)
+
+    if response.status != 200:
+        raise urllib2.HTTPError(
+            url,
+            response.status,
+            response.reason,
+            response.msg,
+            StringIO.StringIO(data))
+
+    return data, is_reused
+
+
 class ConduitException(Exception):
 
     def __init__(self, method, error, errormsg, result, obj, uri, actAsUser):
@@ -282,17 +689,10 @@ class Conduit(object):
             "output": "json",
         })
 
-        if self._https_proxy or self._http_proxy:
-            proxy = {}
-            if self._https_proxy:
-                proxy['https'] = self._https_proxy
-            if self._http_proxy:
-                proxy['http'] = self._http_proxy
-            proxy_handler = urllib2.ProxyHandler(proxy)
-            opener = urllib2.build_opener(proxy_handler)
-            data = opener.open(path, body, _URLLIB_TIMEOUT).read()
-        else:
-            data = urllib2.urlopen(path, body, _URLLIB_TIMEOUT).read()
+        start = time.time()
+        data, is_reused_connection = _post(
+            path, body, self._http_proxy, self._https_proxy)
+        _record_call(method, time.time() - start, is_reused_connection)
 
         return json.loads(data)
 
@@ -345,21 +745,23 @@ class Conduit(object):
 
 class MultiConduit(object):
 
-    """A conduit that supports multi-processing."""
+    """A conduit that supports multi-processing.
+
+    Each session is authenticated when it's first needed and is then reused,
+    at most 'max_sessions' are used at once.
+
+    """
 
     def __init__(self, *args, **kwargs):
+        max_sessions = kwargs.pop('max_sessions', _MAX_SESSIONS_PER_USER)
 
         def factory():
             return Conduit(*args, **kwargs)
 
-        # Phabricator supports 5 simultaneous connections per user
-        # by default:
-        #
-        #   conf/default.conf.php:  'auth.sessions.conduit'       => 5,
-        #
-        max_sessions_per_user = 5
+        # the conduits share the connections kept alive by this process,
+        # so we only need to limit the number of sessions here
         self._conduits = phlsys_multiprocessing.MultiResource(
-            max_sessions_per_user, factory)
+            max_sessions, factory)
 
     def call_as_user(self, user, *args, **kwargs):
         with self._conduits.resource_context() as conduit:
@@ -370,6 +772,15 @@ class MultiConduit(object):
         with self._conduits.resource_context() as conduit:
             return conduit(*args, **kwargs)
 
+    def raw_call_as_user(self, user, *args, **kwargs):
+        with self._conduits.resource_context() as conduit:
+            with act_as_user_context(conduit, user):
+                return conduit.raw_call(*args, **kwargs)
+
+    def raw_call(self, *args, **kwargs):
+        with self._conduits.resource_context() as conduit:
+            return conduit.raw_call(*args, **kwargs)
+
     @property
     def conduit_uri(self):
         with self._conduits.resource_context() as conduit:
@@ -0,0 +1,255 @@
+"""Test suite for phlsys_conduit."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] connections are kept alive and reused between calls
+# [ A] call stats report the calls, new and reused connections per method
+# [ A] call stats from other processes can be merged in
+# [ B] connections closed by the server are replaced transparently
+# [ C] concurrent calls return results in the order they were requested
+# [ C] concurrent calls re-raise the first error, in call order
+# [ D] proxies are taken from the environment if none are supplied
+# [ D] 'no_proxy' in the environment is honoured
+# [ E] redirects are followed, re-sending the call
+# [ F] calls aren't sent again if the server may have processed them
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] Test.test_A_Breathing
+# [ B] Test.test_B_ReconnectAfterServerClose
+# [ C] Test.test_C_CallConcurrently
+# [ D] Test.test_D_EnvironmentProxies
+# [ E] Test.test_E_FollowRedirects
+# [ F] Test.test_F_NoResendAfterProcessing
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import BaseHTTPServer
+import SocketServer
+import httplib
+import json
+import os
+import threading
+import unittest
+import urlparse
+
+import phlsys_conduit
+
+
+class _FakeConduitHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    # keep connections alive between requests
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, *args, **kwargs):
+        BaseHTTPServer.BaseHTTPRequestHandler.__init__(self, *args, **kwargs)
+        self.headers = None  # for pychecker
+        self.rfile = None  # for pychecker
+        self.wfile = None  # for pychecker
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.num_connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.getheader('Content-Length'))
+        body = urlparse.parse_qs(self.rfile.read(length))
+        params = json.loads(body['params'][0])
+        method = self.path.rsplit('/', 1)[-1]
+
+        with self.server.lock:
+            self.server.path_list.append(self.path)
+
+        if '/redirect/' in self.path:
+            self.send_response(307)
+            self.send_header(
+                'Location', self.path.replace('/redirect/', '/'))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if method == 'test.truncate':
+            # pretend that the connection was lost mid-response
+            self.send_response(200)
+            self.send_header('Content-Length', '100')
+            self.end_headers()
+            self.wfile.write('{"result"')
+            self.close_connection = 1
+            return
+
+        response = {'result': None, 'error_code': None, 'error_info': None}
+        if method == 'test.echo':
+            response['result'] = params['value']
+        else:
+            response['error_code'] = 'ERR-CONDUIT-CALL'
+            response['error_info'] = method
+
+        data = json.dumps(response)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+        if self.server.close_after_response:
+            self.close_connection = 1
+
+    def log_message(self, format, *args):
+        pass  # don't print output to stderr
+
+
+class _FakeConduitServer(SocketServer.ThreadingTCPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        SocketServer.ThreadingTCPServer.__init__(
+            self, ('localhost', 0), _FakeConduitHandler)
+        self.lock = threading.Lock()
+        self.num_connections = 0
+        self.close_after_response = False
+        self.path_list = []
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.server = _FakeConduitServer()
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        host, port = self.server.server_address
+        self.uri = 'http://{}:{}/api/'.format(host, port)
+        phlsys_conduit.close_idle_connections()
+        phlsys_conduit.reset_call_stats()
+
+    def tearDown(self):
+        phlsys_conduit.close_idle_connections()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_A_Breathing(self):
+        conduit = phlsys_conduit.Conduit(self.uri)
+        for i in xrange(5):
+            self.assertEqual(i, conduit('test.echo', {'value': i}))
+
+        # [ A] connections are kept alive and reused between calls
+        self.assertEqual(1, self.server.num_connections)
+
+        # [ A] call stats report the calls, new and reused connections per
+        #      method
+        stats = phlsys_conduit.get_call_stats()['test.echo']
+        self.assertEqual(5, stats.calls)
+        self.assertEqual(1, stats.new_connections)
+        self.assertEqual(4, stats.reused_connections)
+        self.assertGreaterEqual(stats.total_secs, stats.max_secs)
+
+        # [ A] call stats from other processes can be merged in
+        phlsys_conduit.merge_call_stats({
+            'test.echo': phlsys_conduit.CallStats(2, 1, 1, 100.0, 99.0),
+            'test.other': phlsys_conduit.CallStats(1, 1, 0, 1.0, 1.0),
+        })
+        merged_stats = phlsys_conduit.get_call_stats()
+        self.assertEqual(
+            (7, 2, 5, stats.total_secs + 100.0, 99.0),
+            tuple(merged_stats['test.echo']))
+        self.assertEqual(
+            (1, 1, 0, 1.0, 1.0), tuple(merged_stats['test.other']))
+
+        phlsys_conduit.reset_call_stats()
+        self.assertEqual({}, phlsys_conduit.get_call_stats())
+
+    def test_B_ReconnectAfterServerClose(self):
+        self.server.close_after_response = True
+        conduit = phlsys_conduit.Conduit(self.uri)
+
+        # [ B] connections closed by the server are replaced transparently
+        for i in xrange(3):
+            self.assertEqual(i, conduit('test.echo', {'value': i}))
+        self.assertEqual(3, self.server.num_connections)
+
+    def test_C_CallConcurrently(self):
+        conduit = phlsys_conduit.Conduit(self.uri)
+        call_list = [('test.echo', {'value': i}) for i in xrange(20)]
+
+        # [ C] concurrent calls return results in the order they were
+        #      requested
+        self.assertEqual(
+            range(20),
+            phlsys_conduit.call_concurrently(conduit, call_list, 4))
+        self.assertLessEqual(self.server.num_connections, 4)
+
+        # [ C] concurrent calls re-raise the first error, in call order
+        call_list[3] = ('test.fail3', None)
+        call_list[7] = ('test.fail7', None)
+        with self.assertRaises(phlsys_conduit.ConduitException) as context:
+            phlsys_conduit.call_concurrently(conduit, call_list)
+        self.assertEqual('test.fail3', context.exception.method)
+
+    def test_D_EnvironmentProxies(self):
+        host, port = self.server.server_address
+        proxy = 'http://{}:{}'.format(host, port)
+        remote_uri = 'http://conduit.invalid/api/'
+        old_environ = dict(os.environ)
+        try:
+            os.environ['http_proxy'] = proxy
+
+            # [ D] proxies are taken from the environment if none are
+            #      supplied
+            conduit = phlsys_conduit.Conduit(remote_uri)
+            self.assertEqual(1, conduit('test.echo', {'value': 1}))
+            self.assertEqual(
+                [remote_uri + 'test.echo'], self.server.path_list)
+
+            # [ D] 'no_proxy' in the environment is honoured
+            os.environ['http_proxy'] = 'http://proxy.invalid:1'
+            os.environ['no_proxy'] = host
+            conduit = phlsys_conduit.Conduit(self.uri)
+            self.assertEqual(2, conduit('test.echo', {'value': 2}))
+        finally:
+            os.environ.clear()
+            os.environ.update(old_environ)
+
+    def test_E_FollowRedirects(self):
+        conduit = phlsys_conduit.Conduit(self.uri + 'redirect/')
+
+        # [ E] redirects are followed, re-sending the call
+        self.assertEqual(3, conduit('test.echo', {'value': 3}))
+        self.assertEqual(
+            ['/api/redirect/test.echo', '/api/test.echo'],
+            self.server.path_list)
+
+    def test_F_NoResendAfterProcessing(self):
+        conduit = phlsys_conduit.Conduit(self.uri)
+        self.assertEqual(1, conduit('test.echo', {'value': 1}))
+
+        # [ F] calls aren't sent again if the server may have processed them
+        with self.assertRaises(httplib.IncompleteRead):
+            conduit('test.truncate', {})
+        self.assertEqual(
+            ['/api/test.echo', '/api/test.truncate'], self.server.path_list)
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
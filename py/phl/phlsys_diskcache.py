@@ -0,0 +1,187 @@
+"""Size-bounded cache of values, stored compressed in a directory on disk."""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlsys_diskcache
+#
+# Public Classes:
+#   DiskCache
+#    .get
+#    .set
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import cPickle as pickle
+import errno
+import hashlib
+import os
+import zlib
+
+import phlsys_fs
+
+_ENTRY_SUFFIX = '.zpickle'
+
+# when evicting, remove entries until we're this fraction of the max size so
+# that we don't have to scan the directory again on the very next write
+_EVICT_TO_FRACTION = 0.75
+
+
+class DiskCache(object):
+
+    """Size-bounded cache of values, stored compressed in a directory on disk.
+
+    Values are pickled and compressed, one file per entry. When the total
+    size of the entries exceeds the limit then the least recently used ones
+    are removed. Reading an entry counts as using it.
+
+    Several processes may share the same directory, entries are written
+    atomically and missing or corrupt entries are treated as absent.
+
+    Usage example:
+
+        >>> with phlsys_fs.chtmpdir_context():
+        ...     cache = DiskCache('cache', 1024)
+        ...     cache.set('key', {'value': 1})
+        ...     cache.get('key')
+        {'value': 1}
+
+        >>> with phlsys_fs.chtmpdir_context():
+        ...     DiskCache('cache', 1024).get('missing') is None
+        True
+
+    """
+
+    def __init__(self, dir_path, max_size_bytes):
+        """Initialise to store entries in 'dir_path', up to 'max_size_bytes'.
+
+        The directory is created when the first entry is written.
+
+        :dir_path: the string path of the directory to store entries in
+        :max_size_bytes: the maximum total size of the stored entries
+
+        """
+        super(DiskCache, self).__init__()
+        self._dir_path = dir_path
+        self._max_size_bytes = max_size_bytes
+
+        # estimate of the total size of the entries, this doesn't account for
+        # writes from other processes so it's re-calculated when evicting
+        self._size_bytes = None
+
+    def get(self, key, default=None):
+        """Return the value stored for string 'key', or 'default' if none.
+
+        :key: the string key the value was stored with
+        :default: the value to return if there's no usable entry for 'key'
+        :returns: the stored value or 'default'
+
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return default
+
+        try:
+            value = pickle.loads(zlib.decompress(data))
+        except Exception:
+            # the entry is corrupt, e.g. it was written by an incompatible
+            # version, so it's no good to anyone
+            phlsys_fs.delete_file_if_exists(path)
+            return default
+
+        # mark the entry as recently used, it may have been evicted already
+        try:
+            os.utime(path, None)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+        return value
+
+    def set(self, key, value):
+        """Store 'value' for string 'key', evicting old entries if necessary.
+
+        :key: the string key to store the value with
+        :value: a picklable value to store
+        :returns: None
+
+        """
+        data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+        if self._size_bytes is None:
+            self._size_bytes = sum(size for _, size, _ in self._entries())
+
+        phlsys_fs.write_text_file_atomic(self._entry_path(key), data)
+        self._size_bytes += len(data)
+
+        if self._size_bytes > self._max_size_bytes:
+            self._evict()
+
+    def _entry_path(self, key):
+        name = hashlib.sha1(key).hexdigest() + _ENTRY_SUFFIX
+        return os.path.join(self._dir_path, name)
+
+    def _entries(self):
+        """Return a list of (mtime, size, path) for each entry on disk."""
+        try:
+            names = os.listdir(self._dir_path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return []
+
+        entries = []
+        for name in names:
+            if not name.endswith(_ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self._dir_path, name)
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                # another process may have evicted it
+                if e.errno != errno.ENOENT:
+                    raise
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        size_bytes = sum(size for _, size, _ in entries)
+        target_bytes = self._max_size_bytes * _EVICT_TO_FRACTION
+
+        for _, size, path in entries:
+            if size_bytes <= target_bytes:
+                break
+            phlsys_fs.delete_file_if_exists(path)
+            size_bytes -= size
+
+        self._size_bytes = size_bytes
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
@@ -0,0 +1,114 @@
+"""Test suite for phlsys_diskcache."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] values are read back as they were stored
+# [ A] values are shared between instances using the same directory
+# [ B] the least recently used entries are evicted when over the size limit
+# [ C] corrupt entries are treated as missing and removed
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] Test.test_A_Breathing
+# [ B] Test.test_B_Eviction
+# [ C] Test.test_C_CorruptEntries
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import phlsys_diskcache
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.path, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _entry_paths(self):
+        return [
+            os.path.join(self.cache_path, name)
+            for name in os.listdir(self.cache_path)
+        ]
+
+    def _set_entry_mtime(self, cache, key, mtime):
+        # pylint: disable=protected-access
+        path = cache._entry_path(key)
+        # pylint: enable=protected-access
+        os.utime(path, (mtime, mtime))
+
+    def test_A_Breathing(self):
+        cache = phlsys_diskcache.DiskCache(self.cache_path, 1024 * 1024)
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual('default', cache.get('key', 'default'))
+
+        # [ A] values are read back as they were stored
+        value = (u'unicode \u2603', [1, 2], {'a': None})
+        cache.set('key', value)
+        self.assertEqual(value, cache.get('key'))
+        cache.set('key', 'new value')
+        self.assertEqual('new value', cache.get('key'))
+
+        # [ A] values are shared between instances using the same directory
+        other_cache = phlsys_diskcache.DiskCache(self.cache_path, 1024 * 1024)
+        self.assertEqual('new value', other_cache.get('key'))
+
+    def test_B_Eviction(self):
+        value = os.urandom(1000)
+        cache = phlsys_diskcache.DiskCache(self.cache_path, 3500)
+        for i, key in enumerate(['a', 'b', 'c']):
+            cache.set(key, value)
+            self._set_entry_mtime(cache, key, 1000 + i)
+        self.assertEqual(3, len(self._entry_paths()))
+
+        # reading 'a' makes 'b' the least recently used
+        self.assertEqual(value, cache.get('a'))
+
+        # [ B] the least recently used entries are evicted when over the size
+        #      limit
+        cache.set('d', value)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(value, cache.get('a'))
+        self.assertEqual(value, cache.get('d'))
+        self.assertEqual(2, len(self._entry_paths()))
+
+    def test_C_CorruptEntries(self):
+        cache = phlsys_diskcache.DiskCache(self.cache_path, 1024 * 1024)
+        cache.set('key', 'value')
+        path, = self._entry_paths()
+        with open(path, 'wb') as f:
+            f.write('not compressed')
+
+        # [ C] corrupt entries are treated as missing and removed
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual([], self._entry_paths())
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
@@ -5,8 +5,17 @@
 # phlsys_git
 #
 # Public Classes:
+#   ObjectError
 #   Repo
 #    .working_dir
+#    .resolve_ref
+#    .read_object
+#    .read_blob
+#    .read_commit
+#    .close_object_readers
+#
+# Public Assignments:
+#   Commit
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -16,15 +25,96 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
 import os
+import subprocess
 
 import phlsys_subprocess
 
 
+"""NamedTuple to represent a commit object read from the repository.
+
+:sha1: the string sha1 of the commit
+:tree: the string sha1 of the tree of the commit
+:parents: a list of the string sha1s of the parents of the commit
+:author: the 'author' line of the commit, e.g. 'name <email> time tz'
+:committer: the 'committer' line of the commit, e.g. 'name <email> time tz'
+:message: the full commit message
+
+"""
+Commit = collections.namedtuple(
+    'phlsys_git__Commit',
+    ['sha1', 'tree', 'parents', 'author', 'committer', 'message'])
+
+
+class ObjectError(Exception):
+    pass
+
+
+class _CatFile(object):
+
+    """A long-lived 'git cat-file' process for looking up objects."""
+
+    def __init__(self, working_dir, batch_option):
+        super(_CatFile, self).__init__()
+        self._pid = os.getpid()
+        with open(os.devnull, 'w') as devnull:
+            self._process = subprocess.Popen(
+                ['git', 'cat-file', batch_option],
+                cwd=working_dir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=devnull)
+
+    def is_usable(self):
+        """Return True if the process is running and was started by us."""
+        return self._pid == os.getpid() and self._process.poll() is None
+
+    def query(self, name):
+        """Return (sha1, type, size) for 'name' or None if it's missing.
+
+        If the process was started with '--batch' then the content of the
+        object must be read with 'read_content' before the next query.
+
+        """
+        if '\n' in name:
+            raise ValueError("object names can't contain newlines")
+        try:
+            self._process.stdin.write(name + '\n')
+            self._process.stdin.flush()
+            header = self._process.stdout.readline()
+        except IOError:
+            self.close()
+            raise
+        if not header:
+            self.close()
+            raise ObjectError("'git cat-file' exited unexpectedly")
+
+        fields = header.split()
+        if len(fields) != 3:
+            # e.g. '<name> missing' or '<name> ambiguous'
+            return None
+        sha1, object_type, size = fields
+        return sha1, object_type, int(size)
+
+    def read_content(self, size):
+        content = self._process.stdout.read(size)
+        self._process.stdout.read(1)  # skip the newline after the content
+        return content
+
+    def close(self):
+        # don't interfere with the process of our parent, if we were forked
+        if self.is_usable():
+            self._process.stdin.close()
+            self._process.wait()
+
+
 class Repo(object):
 
     def __init__(self, workingDir):
         self._workingDir = os.path.abspath(workingDir)
+        self._batch = None
+        self._batch_check = None
 
     # def __call__(*args, stdin=None): <-- supported in Python 3
     def __call__(self, *args, **kwargs):
@@ -32,13 +122,137 @@ class Repo(object):
         assert(not kwargs)
         result = phlsys_subprocess.run(
             'git', *args,
-            stdin=stdin, workingDir=self._workingDir)
+            stdin=stdin,
+            workingDir=self._workingDir,
+            statsKey=(self._workingDir, 'git ' + _get_subcommand(args)))
         return result.stdout
 
     @property
     def working_dir(self):
         return self._workingDir
 
+    def __getstate__(self):
+        # the object readers can't be sent to other processes
+        state = dict(self.__dict__)
+        state['_batch'] = None
+        state['_batch_check'] = None
+        return state
+
+    def resolve_ref(self, ref):
+        """Return the string sha1 of the object named by 'ref', or None.
+
+        The object readers are long-lived 'git cat-file' processes, started
+        on first use. They save spawning a new git process for each lookup.
+
+        :ref: the string name of the object, e.g. 'origin/master', 'ed3a1'
+        :returns: the string sha1 of the object, or None if there's no object
+
+        """
+        self._batch_check = self._get_cat_file(
+            self._batch_check, '--batch-check')
+        info = self._batch_check.query(ref)
+        return info[0] if info is not None else None
+
+    def read_object(self, ref):
+        """Return (sha1, type, content) of the object named by 'ref'.
+
+        Raise ObjectError if there's no such object.
+
+        :ref: the string name of the object, e.g. 'origin/master:README'
+        :returns: a tuple of (string sha1, string type, string content)
+
+        """
+        self._batch = self._get_cat_file(self._batch, '--batch')
+        info = self._batch.query(ref)
+        if info is None:
+            raise ObjectError("no object named '{}'".format(ref))
+        sha1, object_type, size = info
+        return sha1, object_type, self._batch.read_content(size)
+
+    def read_blob(self, ref):
+        """Return the string content of the blob named by 'ref'.
+
+        Raise ObjectError if there's no such blob.
+
+        :ref: the string name of the blob, e.g. 'origin/master:README'
+        :returns: the string content of the blob
+
+        """
+        _, object_type, content = self.read_object(ref)
+        if object_type != 'blob':
+            raise ObjectError(
+                "'{}' is a {}, not a blob".format(ref, object_type))
+        return content
+
+    def read_commit(self, ref):
+        """Return a Commit for the commit named by 'ref'.
+
+        Annotated tags are followed to the commit that they point to.
+        Raise ObjectError if there's no such commit.
+
+        :ref: the string name of the commit, e.g. 'origin/master', 'ed3a1'
+        :returns: a Commit
+
+        """
+        sha1, object_type, content = self.read_object(ref + '^{commit}')
+        assert object_type == 'commit'
+
+        headers, _, message = content.partition('\n\n')
+        tree = None
+        parents = []
+        author = None
+        committer = None
+        for line in headers.splitlines():
+            key, _, value = line.partition(' ')
+            if key == 'tree':
+                tree = value
+            elif key == 'parent':
+                parents.append(value)
+            elif key == 'author':
+                author = value
+            elif key == 'committer':
+                committer = value
+
+        return Commit(
+            sha1=sha1,
+            tree=tree,
+            parents=parents,
+            author=author,
+            committer=committer,
+            message=message)
+
+    def close_object_readers(self):
+        """Stop the object reader processes, they'll restart when needed."""
+        for cat_file in (self._batch, self._batch_check):
+            if cat_file is not None:
+                cat_file.close()
+        self._batch = None
+        self._batch_check = None
+
+    def _get_cat_file(self, cat_file, batch_option):
+        if cat_file is None or not cat_file.is_usable():
+            cat_file = _CatFile(self._workingDir, batch_option)
+        return cat_file
+
+
+def _get_subcommand(args):
+    """Return the git subcommand in 'args', skipping any global options.
+
+    Usage examples:
+        >>> _get_subcommand(['fetch', '--prune'])
+        'fetch'
+        >>> _get_subcommand(['-c', 'user.name=x', 'commit', '-m', 'msg'])
+        'commit'
+
+    """
+    args = iter(args)
+    for arg in args:
+        if arg in ('-c', '-C'):
+            next(args, None)
+        elif not arg.startswith('-'):
+            return arg
+    return ''
+
 
 # -----------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
@@ -0,0 +1,136 @@
+"""Test suite for phlsys_git."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] refs resolve to the same sha1 as 'git rev-parse'
+# [ A] missing refs resolve to None
+# [ A] refs that change are resolved to their new sha1
+# [ B] blobs are read with the same content as 'git show'
+# [ B] reading missing objects or objects of the wrong type raises
+# [ C] commits are read with their tree, parents, author and message
+# [ D] object readers restart after being closed
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] Test.test_A_ResolveRef
+# [ B] Test.test_B_ReadBlob
+# [ C] Test.test_C_ReadCommit
+# [ D] Test.test_D_CloseObjectReaders
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import phlsys_git
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.repo = phlsys_git.Repo(self.path)
+        self.repo('init')
+        self.repo('config', 'user.name', 'Test User')
+        self.repo('config', 'user.email', 'test@server.test')
+        self._commit('README', 'first\n', 'initial commit')
+        self._commit('README', 'second\n', 'second commit\n\nbody')
+
+    def tearDown(self):
+        self.repo.close_object_readers()
+        shutil.rmtree(self.path)
+
+    def _commit(self, filename, content, message):
+        with open(os.path.join(self.path, filename), 'w') as f:
+            f.write(content)
+        self.repo('add', filename)
+        self.repo('commit', '-m', message)
+
+    def _rev_parse(self, ref):
+        return self.repo('rev-parse', ref).strip()
+
+    def test_A_ResolveRef(self):
+        # [ A] refs resolve to the same sha1 as 'git rev-parse'
+        self.repo('branch', 'topic', 'HEAD~1')
+        for ref in ('HEAD', 'HEAD~1', 'topic', 'refs/heads/topic'):
+            self.assertEqual(self._rev_parse(ref), self.repo.resolve_ref(ref))
+
+        # [ A] missing refs resolve to None
+        self.assertIsNone(self.repo.resolve_ref('refs/heads/missing'))
+        self.assertIsNone(self.repo.resolve_ref('0' * 40))
+
+        # [ A] refs that change are resolved to their new sha1
+        self.repo('branch', 'new', 'HEAD~1')
+        self.assertEqual(
+            self._rev_parse('HEAD~1'), self.repo.resolve_ref('new'))
+        self.repo('branch', '-f', 'new', 'HEAD')
+        self.assertEqual(self._rev_parse('HEAD'), self.repo.resolve_ref('new'))
+
+    def test_B_ReadBlob(self):
+        # [ B] blobs are read with the same content as 'git show'
+        self.assertEqual('second\n', self.repo.read_blob('HEAD:README'))
+        self.assertEqual('first\n', self.repo.read_blob('HEAD~1:README'))
+        self.assertEqual(
+            self.repo('show', 'HEAD:README'),
+            self.repo.read_blob('HEAD:README'))
+
+        # [ B] reading missing objects or objects of the wrong type raises
+        self.assertRaises(
+            phlsys_git.ObjectError, self.repo.read_blob, 'HEAD:MISSING')
+        self.assertRaises(
+            phlsys_git.ObjectError, self.repo.read_blob, 'HEAD')
+        self.assertRaises(
+            phlsys_git.ObjectError, self.repo.read_commit, 'HEAD:README')
+
+        # the reader is still usable after errors
+        self.assertEqual('second\n', self.repo.read_blob('HEAD:README'))
+
+    def test_C_ReadCommit(self):
+        # [ C] commits are read with their tree, parents, author and message
+        commit = self.repo.read_commit('HEAD')
+        self.assertEqual(self._rev_parse('HEAD'), commit.sha1)
+        self.assertEqual(self._rev_parse('HEAD^{tree}'), commit.tree)
+        self.assertEqual([self._rev_parse('HEAD~1')], commit.parents)
+        self.assertEqual(
+            self.repo('log', '-1', '--format=%an <%ae> %ad', '--date=raw'),
+            commit.author + '\n')
+        self.assertEqual(
+            self.repo('log', '-1', '--format=%cn <%ce> %cd', '--date=raw'),
+            commit.committer + '\n')
+        self.assertEqual('second commit\n\nbody\n', commit.message)
+
+        self.assertEqual([], self.repo.read_commit('HEAD~1').parents)
+
+    def test_D_CloseObjectReaders(self):
+        head = self._rev_parse('HEAD')
+        self.assertEqual(head, self.repo.resolve_ref('HEAD'))
+        self.repo.close_object_readers()
+
+        # [ D] object readers restart after being closed
+        self.assertEqual(head, self.repo.resolve_ref('HEAD'))
+        self.assertEqual('second\n', self.repo.read_blob('HEAD:README'))
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
@@ -0,0 +1,375 @@
+"""Gather counters and histograms in-process, report them for monitoring.
+
+Metrics are identified by a name and a dict of labels, as in Prometheus.
+Histograms count observations into fixed buckets, so that they are cheap to
+record and to merge, and quantiles like p50 and p99 can be estimated from
+them.
+
+Registries from other processes can be merged together, e.g. to gather the
+metrics of worker processes into their parent.
+
+Usage example:
+
+    >>> registry = Registry(buckets=(0.1, 1))
+    >>> registry.increment('requests_total', {'method': 'query'})
+    >>> registry.observe('request_seconds', {'method': 'query'}, 0.5)
+    >>> other = Registry(buckets=(0.1, 1))
+    >>> other.merge_data(registry.get_data_for_merging())
+    >>> other.get_counter('requests_total', {'method': 'query'})
+    1
+    >>> print(other.to_prometheus_text(), end='')
+    # TYPE request_seconds histogram
+    request_seconds_bucket{method="query",le="0.1"} 0
+    request_seconds_bucket{method="query",le="1"} 1
+    request_seconds_bucket{method="query",le="+Inf"} 1
+    request_seconds_sum{method="query"} 0.5
+    request_seconds_count{method="query"} 1
+    # TYPE requests_total counter
+    requests_total{method="query"} 1
+
+"""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlsys_metrics
+#
+# Public Classes:
+#   Registry
+#    .increment
+#    .observe
+#    .get_counter
+#    .get_histogram
+#    .get_data_for_merging
+#    .merge_data
+#    .reset
+#    .to_summary
+#    .to_prometheus_text
+#
+# Public Functions:
+#   estimate_quantile
+#   start_http_server
+#
+# Public Assignments:
+#   DEFAULT_BUCKETS
+#   Histogram
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import BaseHTTPServer
+import bisect
+import collections
+import threading
+
+# upper bounds in seconds, suitable for the duration of remote operations
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# 'bucket_counts' has a count for each of the buckets, plus one for the
+# observations that were larger than the last bucket
+Histogram = collections.namedtuple(
+    'phlsys_metrics__Histogram',
+    ['buckets', 'bucket_counts', 'sum', 'count'])
+
+
+class Registry(object):
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Initialise an empty registry.
+
+        :buckets: the sorted upper bounds of the buckets of the histograms
+        :returns: None
+
+        """
+        super(Registry, self).__init__()
+        self._buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def increment(self, name, labels, value=1):
+        """Add 'value' to the counter 'name' with 'labels'.
+
+        :name: the string name of the counter
+        :labels: a dict of string label name to string value
+        :value: the number to add
+        :returns: None
+
+        """
+        key = (name, _make_label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        """Record 'value' in the histogram 'name' with 'labels'.
+
+        :name: the string name of the histogram
+        :labels: a dict of string label name to string value
+        :value: the number to record, e.g. a duration in seconds
+        :returns: None
+
+        """
+        key = (name, _make_label_key(labels))
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = [[0] * (len(self._buckets) + 1), 0, 0]
+                self._histograms[key] = histogram
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def get_counter(self, name, labels):
+        """Return the value of the counter 'name' with 'labels', or 0.
+
+        :name: the string name of the counter
+        :labels: a dict of string label name to string value
+        :returns: a number
+
+        """
+        key = (name, _make_label_key(labels))
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def get_histogram(self, name, labels):
+        """Return the Histogram 'name' with 'labels', or None.
+
+        :name: the string name of the histogram
+        :labels: a dict of string label name to string value
+        :returns: a Histogram or None
+
+        """
+        key = (name, _make_label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                return None
+            return Histogram(
+                self._buckets, tuple(histogram[0]), histogram[1], histogram[2])
+
+    def get_data_for_merging(self):
+        """Return a picklable copy of the metrics, see 'merge_data'.
+
+        :returns: an opaque object to pass to 'merge_data'
+
+        """
+        with self._lock:
+            return (
+                self._buckets,
+                dict(self._counters),
+                {k: [list(h[0]), h[1], h[2]]
+                 for k, h in self._histograms.iteritems()})
+
+    def merge_data(self, data):
+        """Add the metrics from another registry's 'get_data_for_merging'.
+
+        :data: the result of 'get_data_for_merging' from another registry
+        :returns: None
+
+        """
+        buckets, counters, histograms = data
+        if buckets != self._buckets:
+            raise ValueError(
+                "can't merge histograms with different buckets: {} {}".format(
+                    buckets, self._buckets))
+        with self._lock:
+            for key, value in counters.iteritems():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, (bucket_counts, total, count) in histograms.iteritems():
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    self._histograms[key] = [list(bucket_counts), total, count]
+                else:
+                    histogram[0] = [
+                        a + b for a, b in zip(histogram[0], bucket_counts)
+                    ]
+                    histogram[1] += total
+                    histogram[2] += count
+
+    def reset(self):
+        """Forget all the metrics recorded so far.
+
+        :returns: None
+
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_summary(self):
+        """Return a JSON-friendly dict summarising the metrics.
+
+        Histograms are summarised by their count, sum and estimated p50, p90
+        and p99.
+
+        :returns: a dict with lists of 'counters' and 'histograms'
+
+        """
+        data = self.get_data_for_merging()
+        _, counters, histograms = data
+        counter_list = [
+            {'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in sorted(counters.iteritems())
+        ]
+        histogram_list = []
+        for (name, labels), (bucket_counts, total, count) in sorted(
+                histograms.iteritems()):
+            histogram = Histogram(self._buckets, bucket_counts, total, count)
+            histogram_list.append({
+                'name': name,
+                'labels': dict(labels),
+                'count': count,
+                'sum': total,
+                'p50': estimate_quantile(histogram, 0.5),
+                'p90': estimate_quantile(histogram, 0.9),
+                'p99': estimate_quantile(histogram, 0.99),
+            })
+        return {'counters': counter_list, 'histograms': histogram_list}
+
+    def to_prometheus_text(self):
+        """Return the metrics in the Prometheus text exposition format.
+
+        :returns: a string
+
+        """
+        _, counters, histograms = self.get_data_for_merging()
+        name_to_lines = collections.defaultdict(list)
+
+        for (name, labels), value in sorted(counters.iteritems()):
+            name_to_lines[(name, 'counter')].append(
+                '{}{} {}'.format(name, _format_labels(labels), value))
+
+        for (name, labels), (bucket_counts, total, count) in sorted(
+                histograms.iteritems()):
+            lines = name_to_lines[(name, 'histogram')]
+            cumulative = 0
+            bounds = [_format_number(b) for b in self._buckets] + ['+Inf']
+            for bound, bucket_count in zip(bounds, bucket_counts):
+                cumulative += bucket_count
+                lines.append('{}_bucket{} {}'.format(
+                    name,
+                    _format_labels(labels + (('le', bound),)),
+                    cumulative))
+            lines.append('{}_sum{} {}'.format(
+                name, _format_labels(labels), _format_number(total)))
+            lines.append('{}_count{} {}'.format(
+                name, _format_labels(labels), count))
+
+        text = ''
+        for (name, metric_type), lines in sorted(name_to_lines.iteritems()):
+            text += '# TYPE {} {}\n'.format(name, metric_type)
+            text += ''.join(line + '\n' for line in lines)
+        return text
+
+
+def estimate_quantile(histogram, quantile):
+    """Return the estimated 'quantile' of the 'histogram', or None if empty.
+
+    The value is interpolated linearly within the bucket that it falls in, as
+    Prometheus does. If it falls beyond the last bucket then the upper bound
+    of the last bucket is returned.
+
+    Usage example:
+
+        >>> estimate_quantile(Histogram((1, 2), (0, 4, 0), 6, 4), 0.5)
+        1.5
+
+    :histogram: a Histogram
+    :quantile: the quantile to estimate, e.g. 0.99
+    :returns: a float or None
+
+    """
+    if not histogram.count:
+        return None
+
+    rank = quantile * histogram.count
+    cumulative = 0
+    lower_bound = 0
+    for bound, bucket_count in zip(histogram.buckets, histogram.bucket_counts):
+        if bucket_count and cumulative + bucket_count >= rank:
+            fraction = (rank - cumulative) / bucket_count
+            return lower_bound + (bound - lower_bound) * fraction
+        cumulative += bucket_count
+        lower_bound = bound
+
+    return float(histogram.buckets[-1]) if histogram.buckets else None
+
+
+def start_http_server(registry, port, host='localhost'):
+    """Serve the metrics of 'registry' at '/metrics' in a background thread.
+
+    The metrics are in the Prometheus text exposition format.
+
+    :registry: the Registry to serve
+    :port: the integer port to listen on, 0 to pick a free one
+    :host: the string host to listen on
+    :returns: the BaseHTTPServer.HTTPServer, call 'shutdown' to stop it
+
+    """
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.to_prometheus_text()
+            self.send_response(200)
+            self.send_header(
+                'Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            # don't write each request to stderr
+            pass
+
+    server = BaseHTTPServer.HTTPServer((host, port), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def _make_label_key(labels):
+    return tuple(sorted(labels.iteritems()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(name, _escape_label_value(value))
+        for name, value in labels) + '}'
+
+
+def _escape_label_value(value):
+    return str(value).replace(
+        '\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_number(number):
+    return repr(number) if isinstance(number, float) else str(number)
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
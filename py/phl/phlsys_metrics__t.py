@@ -0,0 +1,132 @@
+"""Test suite for phlsys_metrics."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] counters and histograms are kept separately for each set of labels
+# [ A] merging adds the metrics of another registry
+# [ A] can't merge histograms with different buckets
+# [ B] quantiles are estimated within the buckets they fall in
+# [ C] metrics are served over http in the prometheus text format
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] Test.test_A_Breathing
+# [ B] Test.test_B_Quantiles
+# [ C] Test.test_C_HttpServer
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+import urllib2
+
+import phlsys_metrics
+
+
+class Test(unittest.TestCase):
+
+    def test_A_Breathing(self):
+        registry = phlsys_metrics.Registry(buckets=(1, 10))
+        registry.increment('calls', {'repo': 'a'})
+        registry.increment('calls', {'repo': 'a'})
+        registry.increment('calls', {'repo': 'b'}, 5)
+        registry.observe('seconds', {'repo': 'a', 'op': 'x'}, 0.5)
+        registry.observe('seconds', {'op': 'x', 'repo': 'a'}, 5)
+        registry.observe('seconds', {'repo': 'a', 'op': 'x'}, 50)
+
+        # [ A] counters and histograms are kept separately for each set of
+        #      labels
+        self.assertEqual(2, registry.get_counter('calls', {'repo': 'a'}))
+        self.assertEqual(5, registry.get_counter('calls', {'repo': 'b'}))
+        self.assertEqual(0, registry.get_counter('calls', {'repo': 'c'}))
+        histogram = registry.get_histogram('seconds', {'repo': 'a', 'op': 'x'})
+        self.assertEqual((1, 1, 1), histogram.bucket_counts)
+        self.assertEqual(55.5, histogram.sum)
+        self.assertEqual(3, histogram.count)
+        self.assertIsNone(registry.get_histogram('seconds', {'repo': 'a'}))
+
+        # [ A] merging adds the metrics of another registry
+        other = phlsys_metrics.Registry(buckets=(1, 10))
+        other.increment('calls', {'repo': 'a'})
+        other.observe('seconds', {'repo': 'a', 'op': 'x'}, 0.1)
+        other.merge_data(registry.get_data_for_merging())
+        other.merge_data(registry.get_data_for_merging())
+        self.assertEqual(5, other.get_counter('calls', {'repo': 'a'}))
+        self.assertEqual(10, other.get_counter('calls', {'repo': 'b'}))
+        histogram = other.get_histogram('seconds', {'repo': 'a', 'op': 'x'})
+        self.assertEqual((3, 2, 2), histogram.bucket_counts)
+        self.assertEqual(7, histogram.count)
+
+        registry.reset()
+        self.assertEqual(0, registry.get_counter('calls', {'repo': 'a'}))
+        self.assertEqual({'counters': [], 'histograms': []},
+                         registry.to_summary())
+
+        # [ A] can't merge histograms with different buckets
+        different = phlsys_metrics.Registry(buckets=(1, 2))
+        with self.assertRaises(ValueError):
+            different.merge_data(other.get_data_for_merging())
+
+    def test_B_Quantiles(self):
+        registry = phlsys_metrics.Registry(buckets=(1, 2, 4))
+        for _ in xrange(98):
+            registry.observe('seconds', {}, 0.5)
+        registry.observe('seconds', {}, 3)
+        registry.observe('seconds', {}, 100)
+        histogram = registry.get_histogram('seconds', {})
+
+        # [ B] quantiles are estimated within the buckets they fall in
+        p50 = phlsys_metrics.estimate_quantile(histogram, 0.5)
+        self.assertAlmostEqual(50 / 98, p50)
+        self.assertAlmostEqual(
+            3, phlsys_metrics.estimate_quantile(histogram, 0.985))
+        self.assertEqual(4, phlsys_metrics.estimate_quantile(histogram, 0.99))
+        self.assertEqual(4, phlsys_metrics.estimate_quantile(histogram, 1))
+
+        summary = registry.to_summary()['histograms'][0]
+        self.assertEqual(100, summary['count'])
+        self.assertAlmostEqual(p50, summary['p50'])
+
+        empty = phlsys_metrics.Histogram((1, 2), (0, 0, 0), 0, 0)
+        self.assertIsNone(phlsys_metrics.estimate_quantile(empty, 0.5))
+
+    def test_C_HttpServer(self):
+        registry = phlsys_metrics.Registry(buckets=(1,))
+        registry.increment('calls', {'repo': 'quote"d'})
+        server = phlsys_metrics.start_http_server(registry, 0)
+        try:
+            url = 'http://localhost:{}/'.format(server.server_address[1])
+
+            # [ C] metrics are served over http in the prometheus text format
+            text = urllib2.urlopen(url + 'metrics').read()
+            self.assertEqual(
+                '# TYPE calls counter\n'
+                'calls{repo="quote\\"d"} 1\n',
+                text)
+            with self.assertRaises(urllib2.HTTPError):
+                urllib2.urlopen(url + 'other')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
@@ -145,7 +145,12 @@ class MultiResource(object):
     def resource_context(self):
         resource = self._free_resources.get()
         if resource is _NotAResource:
-            resource = self._factory()
+            try:
+                resource = self._factory()
+            except BaseException:
+                # don't lose the slot, so that we may try again later
+                self._free_resources.put(_NotAResource)
+                raise
 
         try:
             yield resource
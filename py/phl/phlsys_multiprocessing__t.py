@@ -51,6 +51,25 @@ class Test(unittest.TestCase):
         with multi_resource.resource_context() as resource:
             self.assertEqual("resource", resource)
 
+    def test_multiresource_factory_raises(self):
+
+        attempts = []
+
+        def factory():
+            attempts.append(None)
+            if len(attempts) == 1:
+                raise Exception("failed to create resource")
+            return "resource"
+
+        # make sure that a failure to create the resource doesn't use up
+        # the allowance of resources
+        multi_resource = phlsys_multiprocessing.MultiResource(1, factory)
+        with self.assertRaises(Exception):
+            with multi_resource.resource_context():
+                pass
+        with multi_resource.resource_context() as resource:
+            self.assertEqual("resource", resource)
+
     def test_multiresource_changes_propagate(self):
 
         def worker(resource):
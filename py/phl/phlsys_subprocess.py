@@ -11,9 +11,13 @@
 # Public Functions:
 #   run
 #   run_commands
+#   get_process_stats
+#   reset_process_stats
+#   merge_process_stats
 #
 # Public Assignments:
 #   RunResult
+#   ProcessStats
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -24,13 +28,21 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
+import os
+import resource
 import subprocess
 import sys
+import threading
+import time
 
 RunResult = collections.namedtuple(
     'phlsys_subprocess__RunResult',
     ['stdout', 'stderr'])
 
+ProcessStats = collections.namedtuple(
+    'phlsys_subprocess__ProcessStats',
+    ['count', 'wall_secs', 'cpu_secs', 'stdout_bytes'])
+
 
 class Error(Exception):
     """Base class for exceptions in this module."""
@@ -76,6 +88,10 @@ def run(*args, **kwargs):
     Raise a 'CalledProcessError' if the return code is not equal to
     zero; also echo extra information to stderr.
 
+    The cost of the command is recorded against its 'statsKey', see
+    'get_process_stats'. By default this is the working directory and the
+    name of the command.
+
     Usage examples:
         Echoing 'hello stdout' to stdout:
         >>> run('echo', 'hello stdout')
@@ -86,7 +102,7 @@ def run(*args, **kwargs):
         phlsys_subprocess__RunResult(stdout='3\\n2\\n1\\n', stderr='')
 
     :*args: a tuple of strings corresponding to command-line arguments
-    :**kwargs: keyword arguments corresponding to the special
+    :**kwargs: 'workingDir', 'stdin' and 'statsKey'
     :returns: a RunResult corresponding to the output of the command
 
     """
@@ -96,8 +112,13 @@ def run(*args, **kwargs):
     #       return the return value via the RunResult
     workingDir = kwargs.pop("workingDir", None)
     stdin = kwargs.pop("stdin", None)
+    statsKey = kwargs.pop("statsKey", None)
     assert not kwargs
     cmd = args
+    if statsKey is None:
+        statsKey = (workingDir or '', os.path.basename(cmd[0]))
+    start_secs = time.time()
+    start_cpu_secs = _children_cpu_secs()
     try:
         p = subprocess.Popen(
             cmd,
@@ -111,6 +132,12 @@ def run(*args, **kwargs):
             "OSError: unable to locate command: {0}\n".format(" ".join(cmd)))
         raise
 
+    _record_process(
+        statsKey,
+        time.time() - start_secs,
+        _children_cpu_secs() - start_cpu_secs,
+        len(out))
+
     # pylint has faulty detection of POpen members:
     # http://www.logilab.org/ticket/46273
     # pylint: disable=E1101
@@ -156,6 +183,74 @@ def run_commands(*commands):
         run(*c.split())
 
 
+def get_process_stats():
+    """Return a dict of stats key to ProcessStats, for 'run' in this process.
+
+    The 'cpu_secs' are the user and system time of the child processes that
+    finished during each 'run'. If other child processes finish concurrently
+    then their time will be included too.
+
+    Usage examples:
+        >>> reset_process_stats()
+        >>> _ = run('echo', 'hello', workingDir='/')
+        >>> stats = get_process_stats()[('/', 'echo')]
+        >>> stats.count, stats.stdout_bytes
+        (1, 6)
+
+    :returns: a dict of stats key to ProcessStats
+
+    """
+    with _STATS_LOCK:
+        return {
+            key: ProcessStats(*stats)
+            for key, stats in _KEY_TO_STATS.iteritems()
+        }
+
+
+def reset_process_stats():
+    """Forget the stats gathered by this process so far.
+
+    :returns: None
+
+    """
+    with _STATS_LOCK:
+        _KEY_TO_STATS.clear()
+
+
+def merge_process_stats(key_to_stats):
+    """Add the supplied stats to those of this process.
+
+    This is useful for gathering the stats of other processes, e.g. workers.
+
+    :key_to_stats: a dict of stats key to ProcessStats
+    :returns: None
+
+    """
+    with _STATS_LOCK:
+        for key, process_stats in key_to_stats.iteritems():
+            stats = _KEY_TO_STATS.setdefault(key, [0, 0.0, 0.0, 0])
+            for i, value in enumerate(process_stats):
+                stats[i] += value
+
+
+_STATS_LOCK = threading.Lock()
+_KEY_TO_STATS = {}
+
+
+def _children_cpu_secs():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _record_process(key, wall_secs, cpu_secs, stdout_bytes):
+    with _STATS_LOCK:
+        stats = _KEY_TO_STATS.setdefault(key, [0, 0.0, 0.0, 0])
+        stats[0] += 1
+        stats[1] += wall_secs
+        stats[2] += cpu_secs
+        stats[3] += stdout_bytes
+
+
 # -----------------------------------------------------------------------------
 # Copyright (C) 2013-2016 Bloomberg Finance L.P.
 #
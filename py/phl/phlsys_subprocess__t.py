@@ -76,6 +76,34 @@ class PhlsysSubprocessTests(unittest.TestCase):
             cmd)
         # self.assertTrue(cmd in stderr.out)
 
+    def test_process_stats(self):
+        """Stats are recorded per key and can be merged."""
+        phlsys_subprocess.reset_process_stats()
+        phlsys_subprocess.run("echo", "hello", workingDir="/")
+        phlsys_subprocess.run("echo", "hello", workingDir="/")
+        phlsys_subprocess.run("echo", statsKey="custom")
+        self.assertRaises(
+            phlsys_subprocess.CalledProcessError,
+            phlsys_subprocess.run,
+            "false",
+            workingDir="/")
+
+        stats = phlsys_subprocess.get_process_stats()
+        self.assertEqual(
+            set([("/", "echo"), ("/", "false"), "custom"]), set(stats))
+        self.assertEqual(2, stats[("/", "echo")].count)
+        self.assertEqual(12, stats[("/", "echo")].stdout_bytes)
+        self.assertEqual(1, stats[("/", "false")].count)
+        self.assertEqual(1, stats["custom"].stdout_bytes)
+
+        phlsys_subprocess.merge_process_stats(stats)
+        merged = phlsys_subprocess.get_process_stats()
+        self.assertEqual(4, merged[("/", "echo")].count)
+        self.assertEqual(24, merged[("/", "echo")].stdout_bytes)
+
+        phlsys_subprocess.reset_process_stats()
+        self.assertEqual({}, phlsys_subprocess.get_process_stats())
+
 
 # -----------------------------------------------------------------------------
 # Copyright (C) 2013-2015 Bloomberg Finance L.P.
@@ -0,0 +1,198 @@
+"""Thread-safe cache of values that expire, coalescing concurrent misses."""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlsys_ttlcache
+#
+# Public Classes:
+#   TtlCache
+#    .get_or_call
+#    .invalidate
+#    .stats
+#
+# Public Assignments:
+#   CacheStats
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import sys
+import threading
+import time
+
+# 'coalesced' counts the callers that waited for another caller's miss to be
+# filled, rather than making the same call again themselves
+CacheStats = collections.namedtuple(
+    'phlsys_ttlcache__CacheStats',
+    ['hits', 'misses', 'coalesced', 'invalidations', 'entries'])
+
+
+class _Pending(object):
+
+    """A value that one caller is fetching, that others may wait for."""
+
+    def __init__(self, generation):
+        super(_Pending, self).__init__()
+        self.generation = generation
+        self.event = threading.Event()
+        self.value = None
+        self.exc_info = None
+
+
+class TtlCache(object):
+
+    """Thread-safe cache of values that expire after a fixed time.
+
+    If several threads miss on the same key at once then only the first will
+    call to fetch the value, the others will wait for its result. If the call
+    raises then they will all raise the same exception, nothing is cached.
+
+    Note that the cached values are shared between callers, they must not be
+    modified.
+
+    Usage example:
+
+        >>> cache = TtlCache(60)
+        >>> cache.get_or_call('key', lambda: 'value')
+        'value'
+        >>> cache.get_or_call('key', lambda: 'other value')
+        'value'
+        >>> cache.invalidate()
+        >>> cache.get_or_call('key', lambda: 'other value')
+        'other value'
+        >>> cache.stats
+        phlsys_ttlcache__CacheStats(hits=1, misses=2, coalesced=0, \
+invalidations=1, entries=1)
+
+    """
+
+    def __init__(self, ttl_secs, max_entries=10000, clock=time.time):
+        """Initialise an empty cache.
+
+        :ttl_secs: the number of seconds to keep each value for
+        :max_entries: the most values to keep, the oldest are dropped first
+        :clock: a callable returning the current time in seconds
+
+        """
+        super(TtlCache, self).__init__()
+        self._ttl_secs = ttl_secs
+        self._max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._pending = {}
+
+        # incremented on each invalidation, values fetched during an older
+        # generation may be stale and so are not stored
+        self._generation = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._invalidations = 0
+
+    def get_or_call(self, key, fetch):
+        """Return the value for 'key', calling 'fetch' to get it if needed.
+
+        :key: a hashable key for the value
+        :fetch: a callable that takes no arguments and returns the value
+        :returns: the cached or fetched value
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expiry, value = entry
+                if expiry > self._clock():
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+
+            pending = self._pending.get(key)
+            is_fetcher = pending is None
+            if is_fetcher:
+                self._misses += 1
+                pending = _Pending(self._generation)
+                self._pending[key] = pending
+            else:
+                self._coalesced += 1
+
+        if not is_fetcher:
+            pending.event.wait()
+            if pending.exc_info is not None:
+                raise pending.exc_info[0], pending.exc_info[1], \
+                    pending.exc_info[2]
+            return pending.value
+
+        try:
+            value = fetch()
+        except BaseException:
+            pending.exc_info = sys.exc_info()
+            with self._lock:
+                del self._pending[key]
+            pending.event.set()
+            raise
+
+        with self._lock:
+            del self._pending[key]
+            if pending.generation == self._generation:
+                self._entries[key] = (self._clock() + self._ttl_secs, value)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+
+        pending.value = value
+        pending.event.set()
+        return value
+
+    def invalidate(self, predicate=None):
+        """Forget the values with keys that satisfy 'predicate', or all.
+
+        Values that are being fetched at the time won't be stored, as they
+        may have been fetched before the change that caused this.
+
+        :predicate: a callable taking a key and returning True to forget it
+        :returns: None
+
+        """
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            if predicate is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if predicate(k)]:
+                    del self._entries[key]
+
+    @property
+    def stats(self):
+        """Return the CacheStats of this cache so far."""
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                coalesced=self._coalesced,
+                invalidations=self._invalidations,
+                entries=len(self._entries))
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
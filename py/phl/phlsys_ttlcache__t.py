@@ -0,0 +1,145 @@
+"""Test suite for phlsys_ttlcache."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] values are cached until they expire
+# [ A] the oldest values are dropped when there are too many
+# [ B] invalidating forgets the matching values only
+# [ B] values fetched during an invalidation are not stored
+# [ C] concurrent misses on the same key make only one call
+# [ C] errors are raised to all the waiting callers and not cached
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] Test.test_A_Breathing
+# [ B] Test.test_B_Invalidate
+# [ C] Test.test_C_Coalescing
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+import unittest
+
+import phlsys_ttlcache
+
+
+class _Clock(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Test(unittest.TestCase):
+
+    def test_A_Breathing(self):
+        clock = _Clock()
+        cache = phlsys_ttlcache.TtlCache(10, max_entries=2, clock=clock)
+
+        # [ A] values are cached until they expire
+        self.assertEqual(1, cache.get_or_call('a', lambda: 1))
+        clock.now = 9
+        self.assertEqual(1, cache.get_or_call('a', lambda: 2))
+        clock.now = 10
+        self.assertEqual(3, cache.get_or_call('a', lambda: 3))
+        self.assertEqual((1, 2, 0, 0, 1), tuple(cache.stats))
+
+        # [ A] the oldest values are dropped when there are too many
+        cache.get_or_call('b', lambda: 'b')
+        cache.get_or_call('c', lambda: 'c')
+        self.assertEqual(2, cache.stats.entries)
+        self.assertEqual(4, cache.get_or_call('a', lambda: 4))
+        self.assertEqual('c', cache.get_or_call('c', lambda: None))
+
+    def test_B_Invalidate(self):
+        cache = phlsys_ttlcache.TtlCache(10)
+        cache.get_or_call(('x', 1), lambda: 'x1')
+        cache.get_or_call(('y', 1), lambda: 'y1')
+
+        # [ B] invalidating forgets the matching values only
+        cache.invalidate(lambda key: key[0] == 'x')
+        self.assertEqual('x2', cache.get_or_call(('x', 1), lambda: 'x2'))
+        self.assertEqual('y1', cache.get_or_call(('y', 1), lambda: 'y2'))
+
+        # [ B] values fetched during an invalidation are not stored
+        def fetch_and_invalidate():
+            cache.invalidate(lambda key: key[0] == 'y')
+            return 'z1'
+
+        self.assertEqual(
+            'z1', cache.get_or_call(('z', 1), fetch_and_invalidate))
+        self.assertEqual('z2', cache.get_or_call(('z', 1), lambda: 'z2'))
+        self.assertEqual(2, cache.stats.invalidations)
+
+    def test_C_Coalescing(self):
+        cache = phlsys_ttlcache.TtlCache(10)
+        num_threads = 5
+        release = threading.Event()
+        calls = []
+        results = []
+        errors = []
+
+        def fetch():
+            calls.append(None)
+            release.wait()
+            if len(calls) == 1:
+                raise Exception('fetch failed')
+            return 'value'
+
+        def worker():
+            try:
+                results.append(cache.get_or_call('key', fetch))
+            except Exception as e:
+                errors.append(e)
+
+        def run_threads():
+            thread_list = [
+                threading.Thread(target=worker) for _ in xrange(num_threads)
+            ]
+            for thread in thread_list:
+                thread.start()
+
+            # wait for the other threads to start waiting on the first
+            while cache.stats.coalesced < (num_threads - 1) * len(calls):
+                release.wait(0.01)
+            release.set()
+            for thread in thread_list:
+                thread.join()
+            release.clear()
+
+        # [ C] errors are raised to all the waiting callers and not cached
+        run_threads()
+        self.assertEqual(1, len(calls))
+        self.assertEqual(num_threads, len(errors))
+        self.assertIs(errors[0], errors[-1])
+
+        # [ C] concurrent misses on the same key make only one call
+        run_threads()
+        self.assertEqual(2, len(calls))
+        self.assertEqual(['value'] * num_threads, results)
+        self.assertEqual(2, cache.stats.misses)
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
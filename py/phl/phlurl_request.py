@@ -11,11 +11,14 @@
 #   join_url
 #   split_url
 #   get_many
+#   get_many_conditional
 #   get
 #
 # Public Assignments:
 #   SplitUrlResult
 #   GroupUrlResult
+#   UrlValidators
+#   ConditionalGetResult
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -27,6 +30,7 @@ from __future__ import print_function
 import base64
 import collections
 import httplib
+import threading
 import traceback
 import urlparse
 
@@ -60,6 +64,17 @@ GroupUrlResult = collections.namedtuple(
     'phlurl_request__GroupUrlResult',
     ['http', 'https'])
 
+# the response headers which let us make a conditional request for a url
+UrlValidators = collections.namedtuple(
+    'phlurl_request__UrlValidators',
+    ['etag', 'last_modified'])
+
+# 'error' is None if the request succeeded, otherwise it's an Error and the
+# other fields are None. 'content' is the empty string if the status is 304.
+ConditionalGetResult = collections.namedtuple(
+    'phlurl_request__ConditionalGetResult',
+    ['status', 'content', 'validators', 'error'])
+
 
 class Error(Exception):
     pass
@@ -146,9 +161,30 @@ def _group_urls(url_list):
     return GroupUrlResult(http=http_requests, https=https_requests)
 
 
-def _request(connection, verb, request):
+def _make_conditional_headers(validators):
+    headers = {}
+    if validators is not None:
+        if validators.etag is not None:
+            headers['If-None-Match'] = validators.etag
+        if validators.last_modified is not None:
+            headers['If-Modified-Since'] = validators.last_modified
+    return headers
+
+
+def _request(connection, verb, request, extra_headers=None):
+    """Return a tuple (status, content, validators) from making 'request'.
+
+    :connection: the httplib connection to make the request on
+    :verb: the string HTTP method to use, e.g. 'GET'
+    :request: the SplitUrlResult to make the request for
+    :extra_headers: a dict of headers to send in addition to any auth
+    :returns: a tuple (int status, string content, UrlValidators)
+
+    """
     try:
         headers = {}
+        if extra_headers:
+            headers.update(extra_headers)
         if request.username:
             auth = base64.b64encode(
                 '%s:%s' % (request.username, request.password))
@@ -157,7 +193,14 @@ def _request(connection, verb, request):
                            url=request.path,
                            headers=headers)
         response = connection.getresponse()
-        return (response.status, response.read())
+
+        # N.B. we must read the whole response before the connection can be
+        # used again
+        content = response.read()
+        validators = UrlValidators(
+            response.getheader('etag'),
+            response.getheader('last-modified'))
+        return (response.status, content, validators)
     except Exception as e:
         tb = traceback.format_exc()
         message = """Was trying to {verb} the url {request.url}.
@@ -177,36 +220,164 @@ Here is the original traceback:
         raise Error(message)
 
 
-def get_many(url_list):
+def get_many(url_list, max_connections_per_host=None, timeout=None):
     """Return a dict of {url: content_str} from the supplied 'url_list'.
 
     Attempts to re-use connections where possible.
 
+    If 'max_connections_per_host' is None then the urls are requested one
+    after another. Otherwise each host is requested from concurrently, with up
+    to 'max_connections_per_host' connections to each host.
+
     Note that this shouldn't be used to download large files, there is a
     default timeout in place to prevent blocking for large amounts of time.
 
     :url_list: a list of string urls, e.g. 'http://www.bloomberg.com/'
+    :max_connections_per_host: the int max connections per host, or None
+    :timeout: the seconds to wait on each request, or None for the default
     :returns: a list of string contents
 
     """
-    urls = _group_urls(url_list)
+    url_to_validators = {url: None for url in url_list}
     results = {}
 
-    for host_port, request_list in urls.http.iteritems():
-        http = httplib.HTTPConnection(
-            host_port[0], host_port[1], timeout=_HTTPLIB_TIMEOUT)
-        for request in request_list:
-            results[request.url] = _request(http, 'GET', request)
+    for url, result in _get_many(
+            url_to_validators,
+            max_connections_per_host,
+            timeout).iteritems():
+        if result.error is not None:
+            raise result.error
+        results[url] = (result.status, result.content)
+
+    return results
+
+
+def get_many_conditional(
+        url_to_validators, max_connections_per_host=1, timeout=None):
+    """Return a dict of {url: ConditionalGetResult} from 'url_to_validators'.
+
+    If validators are supplied for a url then a conditional request is made,
+    using the 'If-None-Match' and 'If-Modified-Since' headers. If the server
+    finds that the content is unchanged then it will respond with '304 Not
+    Modified' and no content, saving us from downloading it again.
+
+    Each host is requested from concurrently, with up to
+    'max_connections_per_host' connections to each host. This means that a
+    slow host will not hold up the requests to other hosts.
 
+    Errors do not prevent the requests to other urls, they are recorded in
+    the 'error' field of the result for the failing url.
+
+    :url_to_validators: a dict of string url to UrlValidators or None
+    :max_connections_per_host: the int max connections per host
+    :timeout: the seconds to wait on each request, or None for the default
+    :returns: a dict of string url to ConditionalGetResult
+
+    """
+    if max_connections_per_host < 1:
+        raise ValueError(
+            'invalid value for max_connections_per_host: {}'.format(
+                max_connections_per_host))
+
+    return _get_many(url_to_validators, max_connections_per_host, timeout)
+
+
+def _get_many(url_to_validators, max_connections_per_host, timeout):
+
+    if timeout is None:
+        timeout = _HTTPLIB_TIMEOUT
+
+    urls = _group_urls(url_to_validators.iterkeys())
+    results = {}
+
+    connection_request_lists = []
+    for host_port, request_list in urls.http.iteritems():
+        connection_request_lists.append(
+            (httplib.HTTPConnection, host_port, request_list))
     for host_port, request_list in urls.https.iteritems():
-        https = httplib.HTTPSConnection(
-            host_port[0], host_port[1], timeout=_HTTPLIB_TIMEOUT)
-        for request in request_list:
-            results[request.url] = _request(https, 'GET', request)
+        connection_request_lists.append(
+            (httplib.HTTPSConnection, host_port, request_list))
+
+    if max_connections_per_host is None:
+        for connection_type, host_port, request_list in (
+                connection_request_lists):
+            _get_request_list(
+                connection_type,
+                host_port,
+                collections.deque(request_list),
+                url_to_validators,
+                timeout,
+                results,
+                stop_on_error=True)
+        return results
+
+    thread_list = []
+    for connection_type, host_port, request_list in connection_request_lists:
+
+        # note that the 'popleft' operation of deque is thread-safe, so we
+        # can share the queue of requests between the connections to a host
+        request_queue = collections.deque(request_list)
+
+        num_connections = min(max_connections_per_host, len(request_list))
+        for _ in xrange(num_connections):
+            thread = threading.Thread(
+                target=_get_request_list,
+                args=(
+                    connection_type,
+                    host_port,
+                    request_queue,
+                    url_to_validators,
+                    timeout,
+                    results))
+            thread.daemon = True
+            thread.start()
+            thread_list.append(thread)
+
+    for thread in thread_list:
+        thread.join()
 
     return results
 
 
+def _get_request_list(
+        connection_type,
+        host_port,
+        request_queue,
+        url_to_validators,
+        timeout,
+        results,
+        stop_on_error=False):
+
+    # HTTP/1.1 connections are persistent by default, so we'll make all the
+    # requests on the same connection unless the server closes it.
+    connection = connection_type(host_port[0], host_port[1], timeout=timeout)
+    try:
+        while True:
+            try:
+                request = request_queue.popleft()
+            except IndexError:
+                break
+
+            headers = _make_conditional_headers(
+                url_to_validators.get(request.url))
+            try:
+                status, content, validators = _request(
+                    connection, 'GET', request, headers)
+            except Error as e:
+                if stop_on_error:
+                    raise
+                results[request.url] = ConditionalGetResult(
+                    None, None, None, e)
+
+                # the connection may be in a bad state, start a new one
+                connection.close()
+            else:
+                results[request.url] = ConditionalGetResult(
+                    status, content, validators, None)
+    finally:
+        connection.close()
+
+
 def get(url):
     """Return the content of the supplied url.
 
@@ -12,6 +12,10 @@
 # [ D] Connections to host are reused for subsequent requests to same host/port
 # [ E] Basic authentication is used if username/password details are provided
 # [ F] '301 moved permanently' HTTP redirection is handled properly
+# [ G] Concurrent requests return the same results as sequential ones
+# [ H] Conditional requests return validators from the response
+# [ H] Conditional requests with matching validators return 304
+# [ H] Conditional requests report errors per url, without failing others
 # -----------------------------------------------------------------------------
 # Tests:
 # [ A] Test.test_join_url
@@ -21,6 +25,8 @@
 # [ D] HttpTest.test_get_many
 # [CE] HttpTest_Auth.test_get
 # [DE] HttpTest_Auth.test_get_many
+# [ G] HttpTest.test_get_many_concurrent
+# [ H] HttpTest_Conditional.test_get_many_conditional
 # =============================================================================
 
 from __future__ import absolute_import
@@ -51,6 +57,31 @@ class HttpReqHandler(BaseHTTPServer.BaseHTTPRequestHandler):
         pass  # don't print output to stderr
 
 
+class ConditionalHttpReqHandler(HttpReqHandler):
+
+    # keep connections alive between requests
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, *args, **kwargs):
+        HttpReqHandler.__init__(self, *args, **kwargs)
+        self.headers = None  # for pychecker
+        self.wfile = None  # for pychecker
+
+    def do_GET(self):
+        if self.headers.getheader('If-None-Match') == '"etag"':
+            self.send_response(304)
+            self.send_header('ETag', '"etag"')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header('ETag', '"etag"')
+            self.send_header('Content-type', 'text/plain')
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write('OK')
+
+
 class BasicAuthHttpReqHandler(HttpReqHandler):
 
     def __init__(self, *args, **kwargs):
@@ -215,6 +246,71 @@ class HttpTest(unittest.TestCase):
             phlurl_request.get_many(expected.iterkeys()),
             expected)
 
+    def test_get_many_concurrent(self):
+
+        expected = {
+            self._url('http://{host}:{port}/a'): (200, 'OK'),
+            self._url('http://{host}:{port}/b'): (200, 'OK'),
+            self._url('http://{host}:{port}/c'): (200, 'OK'),
+        }
+
+        # [ G] Concurrent requests return the same results as sequential ones
+        self.assertEqual(
+            phlurl_request.get_many(
+                expected.iterkeys(), max_connections_per_host=2),
+            expected)
+
+    def _url(self, format_string):
+        return format_string.format(
+            host=self.httpd_host,
+            port=self.httpd_port)
+
+
+class HttpTest_Conditional(unittest.TestCase):
+
+    def __init__(self, data):
+        super(HttpTest_Conditional, self).__init__(data)
+        self.httpd_process = None
+        self.httpd_host = None
+        self.httpd_port = None
+
+    def setUp(self):
+        self.httpd_process, self.httpd_host, self.httpd_port = start_httpd(
+            ConditionalHttpReqHandler)
+
+    def tearDown(self):
+        self.httpd_process.terminate()
+
+    def test_get_many_conditional(self):
+
+        url_a = self._url('http://{host}:{port}/a')
+        url_b = self._url('http://{host}:{port}/b')
+
+        results = phlurl_request.get_many_conditional({url_a: None})
+        result = results[url_a]
+        self.assertEqual((result.status, result.content), (200, 'OK'))
+
+        # [ H] Conditional requests return validators from the response
+        self.assertEqual(result.validators.etag, '"etag"')
+
+        # [ H] Conditional requests with matching validators return 304
+        results = phlurl_request.get_many_conditional({
+            url_a: result.validators,
+            url_b: None,
+        })
+        self.assertEqual(results[url_a].status, 304)
+        self.assertEqual(results[url_b].status, 200)
+
+        # [ H] Conditional requests report errors per url, without failing
+        #      others
+        bad_url = 'http://{host}:1/'.format(host=self.httpd_host)
+        results = phlurl_request.get_many_conditional({
+            url_a: None,
+            bad_url: None,
+        })
+        self.assertEqual(results[url_a].status, 200)
+        self.assertIsInstance(results[bad_url].error, phlurl_request.Error)
+
     def _url(self, format_string):
         return format_string.format(
             host=self.httpd_host,
@@ -11,6 +11,7 @@
 #    .refresh
 #    .get_data_for_merging
 #    .merge_data_consume_only
+#    .merge_data_overwrite
 #    .load
 #    .dump
 #   FileCacheWatcherWrapper
@@ -27,6 +28,7 @@ from __future__ import print_function
 
 import collections
 import hashlib
+import httplib
 import json
 import os
 
@@ -40,12 +42,30 @@ _HashHexdigestHasChanged = collections.namedtuple(
 
 class Watcher(object):
 
-    def __init__(self, requester_object=None):
+    def __init__(
+            self,
+            requester_object=None,
+            max_connections_per_host=1,
+            timeout=None):
+        """Create a new Watcher.
+
+        :requester_object: an object like 'phlurl_request', or None for that
+        :max_connections_per_host: the int max connections per host to use
+            when refreshing
+        :timeout: the seconds to wait on each request, None for the default
+
+        """
         super(Watcher, self).__init__()
         self._results = {}
         self._requester_object = requester_object
         if self._requester_object is None:
             self._requester_object = phlurl_request
+        self._max_connections_per_host = max_connections_per_host
+        self._timeout = timeout
+
+        # the etag and last-modified headers from the last response for each
+        # url, these aren't saved so the first refresh will fetch everything
+        self._url_to_validators = {}
 
     def _request_and_set_has_changed(self, url, has_changed):
         (status, content) = self._requester_object.get(url)
@@ -91,12 +111,43 @@ class Watcher(object):
         return True
 
     def refresh(self):
+        """Re-request all the urls and update whether they have changed.
+
+        Urls which can't be requested are considered to have changed, so that
+        whatever is watching them can find out what's wrong. Requests are made
+        conditionally where possible, so unchanged urls cost little.
+
+        :returns: a list of (url, error) for the urls that failed
+
+        """
         # XXX: it's safe to refresh multiple times - the 'has changed' flag
         #      is only consumed on 'has_url_recently_changed'
-        url_contents = self._requester_object.get_many(self._results.keys())
-        for url, (status, contents) in url_contents.iteritems():
+        url_to_validators = {
+            url: self._url_to_validators.get(url) for url in self._results
+        }
+        url_results = self._requester_object.get_many_conditional(
+            url_to_validators,
+            max_connections_per_host=self._max_connections_per_host,
+            timeout=self._timeout)
+
+        failed_urls = []
+        for url, result in url_results.iteritems():
             old_result = self._results[url]
 
+            if result.error is not None:
+                failed_urls.append((url, result.error))
+                self._url_to_validators.pop(url, None)
+                self._results[url] = _HashHexdigestHasChanged(
+                    old_result.hash_hexdigest, True)
+                continue
+
+            # the server says that the content is the same as last time
+            if result.status == httplib.NOT_MODIFIED:
+                continue
+
+            self._url_to_validators[url] = result.validators
+            contents = result.content
+
             # Note that hash objects can't be compared directly so we much
             # first convert them to a representation that can be compared, in
             # this case we've chosen the hexdigest.
@@ -113,6 +164,8 @@ class Watcher(object):
             self._results[url] = _HashHexdigestHasChanged(
                 new_hash, has_changed)
 
+        return failed_urls
+
     def get_data_for_merging(self):
         return {k: tuple(v) for k, v in self._results.iteritems()}
 
@@ -139,6 +192,18 @@ class Watcher(object):
                     self._results[url] = _HashHexdigestHasChanged(
                         ours.hash_hexdigest, False)
 
+    def merge_data_overwrite(self, data):
+        """Merge in data such as returned from get_data_for_merging().
+
+        For each url mentioned in data, overwrite our data with theirs.
+
+        :data: a dict as returned from get_data_for_merging()
+        :returns: None
+
+        """
+        for key, value in data.iteritems():
+            self._results[key] = _HashHexdigestHasChanged(*value)
+
     def load(self, f):
         """Load data from the supplied file pointer, overwriting existing data.
 
@@ -162,9 +227,15 @@ class Watcher(object):
 
 class FileCacheWatcherWrapper(object):
 
-    def __init__(self, filename, requester_object=None):
+    def __init__(
+            self,
+            filename,
+            requester_object=None,
+            max_connections_per_host=1,
+            timeout=None):
         self._filename = os.path.abspath(filename)
-        self._watcher = Watcher(requester_object)
+        self._watcher = Watcher(
+            requester_object, max_connections_per_host, timeout)
 
         # load the url watcher cache (if any)
         if os.path.isfile(self._filename):
@@ -13,6 +13,10 @@
 # [ D] can't consume newness in merge_data_consume_only() with unmatched hashes
 # [ E] b.merge_data_consume_only(a.get_data_for_merging()) copies elements
 #      which are present in b but not in a.
+# [ F] refresh doesn't consider urls changed if the server responds with 304
+# [ F] refresh sends the validators from the last response for each url
+# [ F] refresh considers urls which failed to have changed
+# [ F] refresh returns the urls which failed
 # -----------------------------------------------------------------------------
 # Tests:
 # [ A] test_A_Breathing
@@ -20,6 +24,7 @@
 # [ C] test_C_MergeConsumeMatching
 # [ D] test_D_MergeNotConsumeUnmatching
 # [ E] test_E_MergeConsumeNew
+# [ F] test_F_ConditionalRefresh
 # =============================================================================
 
 from __future__ import absolute_import
@@ -30,6 +35,7 @@ import unittest
 
 import phlsys_fs
 
+import phlurl_request
 import phlurl_watcher
 
 
@@ -49,6 +55,46 @@ class _MockRequesterObject(object):
             result[url] = self.get(url)
         return result
 
+    def get_many_conditional(
+            self, url_to_validators, max_connections_per_host, timeout):
+        result = {}
+        for url in url_to_validators:
+            status, content = self.get(url)
+            result[url] = phlurl_request.ConditionalGetResult(
+                status, content, None, None)
+        return result
+
+
+class _ConditionalMockRequesterObject(object):
+
+    def __init__(self):
+        self.content = 'content'
+        self.is_failing = False
+        self.sent_validators = {}
+
+    def get(self, url):
+        return (200, self.content)
+
+    def get_many_conditional(
+            self, url_to_validators, max_connections_per_host, timeout):
+        result = {}
+        etag = self.content + '-etag'
+        for url, validators in url_to_validators.iteritems():
+            self.sent_validators[url] = validators
+            if self.is_failing:
+                result[url] = phlurl_request.ConditionalGetResult(
+                    None, None, None, phlurl_request.Error('failed'))
+            elif validators is not None and validators.etag == etag:
+                result[url] = phlurl_request.ConditionalGetResult(
+                    304, '', validators, None)
+            else:
+                result[url] = phlurl_request.ConditionalGetResult(
+                    200,
+                    self.content,
+                    phlurl_request.UrlValidators(etag, None),
+                    None)
+        return result
+
 
 class Test(unittest.TestCase):
 
@@ -217,6 +263,39 @@ class Test(unittest.TestCase):
             #      elements which are present in b but not in a.
             self.assertEqual(data_after_merge, watcher.get_data_for_merging())
 
+    def test_F_ConditionalRefresh(self):
+
+        requester = _ConditionalMockRequesterObject()
+        url = 'http://host.test'
+
+        watcher = phlurl_watcher.Watcher(requester)
+        self.assertTrue(watcher.has_url_recently_changed(url))
+
+        # the first refresh can't be conditional
+        self.assertEqual(watcher.refresh(), [])
+        self.assertIsNone(requester.sent_validators[url])
+
+        # [ F] refresh sends the validators from the last response for each url
+        self.assertEqual(watcher.refresh(), [])
+        self.assertEqual(
+            requester.sent_validators[url].etag, 'content-etag')
+
+        # [ F] refresh doesn't consider urls changed if the server responds
+        #      with 304
+        self.assertFalse(watcher.peek_has_url_recently_changed(url))
+
+        requester.content = 'new content'
+        watcher.refresh()
+        self.assertTrue(watcher.has_url_recently_changed(url))
+
+        # [ F] refresh considers urls which failed to have changed
+        requester.is_failing = True
+        failed_urls = watcher.refresh()
+        self.assertTrue(watcher.peek_has_url_recently_changed(url))
+
+        # [ F] refresh returns the urls which failed
+        self.assertEqual([u for u, _ in failed_urls], [url])
+
 
 # -----------------------------------------------------------------------------
 # Copyright (C) 2013-2015 Bloomberg Finance L.P.
@@ -8,6 +8,16 @@ become difficult to audit.
 Conduit-proxy allows a single admin role-account user to be re-used without
 giving away admin credentials directly to multiple parties.
 
+Responses to read-only methods may optionally be cached for a short time, see
+'--cache-ttl'.
+
+Statistics are served as JSON from '/stats', e.g. 'curl localhost:8000/stats'.
+For each client and conduit method there are counts of the requests, errors
+and bytes in and out, along with the latency of the requests. The clients
+that made the most requests are listed first. The number of cache hits and
+misses is also included. The statistics may also be written to a file
+periodically, see '--stats-path'.
+
 """
 # =============================================================================
 # CONTENTS
@@ -29,23 +39,75 @@ from __future__ import division
 from __future__ import print_function
 
 import BaseHTTPServer
+import SocketServer
 import argparse
 import json
 import logging
 import os
 import ssl
+import threading
 import time
 import urlparse
 
 import phlsys_conduit
+import phlsys_fs
 import phlsys_makeconduit
+import phlsys_metrics
+import phlsys_ttlcache
 
 _USAGE_EXAMPLES = """
 usage examples:
     proxy the local phabricator install on port 8000, with password 'squirrel':
     $ conduit-proxy --uri http://127.0.0.1 --port 8000 --secret squirrel
+
+    as above, caching responses to the default read-only methods for 10 secs:
+    $ conduit-proxy --uri http://127.0.0.1 --port 8000 --secret squirrel \\
+        --cache-ttl 10
 """
 
+# methods that only read from Phabricator, so their responses may be cached.
+# note that 'phid.query' isn't included as it describes objects of all the
+# applications, so its responses would be made stale by most writes
+_DEFAULT_CACHE_METHODS = [
+    'differential.query',
+    'project.query',
+    'repository.query',
+    'user.query',
+]
+
+# methods that are known to only read from Phabricator, calls to them don't
+# clear the cache. calls to any other methods are assumed to be writes.
+_READ_ONLY_METHODS = frozenset([
+    'conduit.getcapabilities',
+    'conduit.ping',
+    'conduit.query',
+    'differential.find',
+    'differential.getcommitmessage',
+    'differential.getcommitpaths',
+    'differential.getdiff',
+    'differential.getrawdiff',
+    'differential.getrevision',
+    'differential.getrevisioncomments',
+    'differential.parsecommitmessage',
+    'differential.query',
+    'differential.querydiffs',
+    'diffusion.querycommits',
+    'file.download',
+    'file.info',
+    'maniphest.info',
+    'maniphest.query',
+    'phid.lookup',
+    'phid.query',
+    'project.query',
+    'repository.query',
+    'user.query',
+    'user.whoami',
+])
+
+# applications whose cached responses may be made stale by writes to any
+# other application
+_CROSS_APPLICATIONS = frozenset(['phid'])
+
 logger = logging.getLogger(__name__)  # 'logger' is not allcaps by convention
 
 # TODO: authentication beyond a public secret
@@ -78,6 +140,53 @@ def main():
         required=True,
         help="the magic word used to gain access")
 
+    parser.add_argument(
+        '--max-sessions',
+        metavar="COUNT",
+        type=int,
+        default=5,
+        help="the number of sessions with conduit to share between clients, "
+             "this is also the most requests that will be forwarded to "
+             "conduit at once. requests are handled on separate threads, "
+             "so a slow request won't hold up the others while there are "
+             "sessions free. note that Phabricator allows 5 sessions per "
+             "user by default.")
+
+    parser.add_argument(
+        '--cache-ttl',
+        metavar="SECS",
+        type=float,
+        default=0,
+        help="cache the responses to the '--cache-methods' for this many "
+             "seconds, 0 to disable caching. identical requests that "
+             "arrive while the first is still being answered will share "
+             "its response. calls to methods that aren't known to be "
+             "read-only, e.g. 'differential.createcomment', are assumed to "
+             "be writes and clear the cached responses for the same "
+             "application, and for 'phid'. the default is %(default)s.")
+
+    parser.add_argument(
+        '--cache-methods',
+        metavar="METHOD",
+        nargs='+',
+        default=_DEFAULT_CACHE_METHODS,
+        help="the read-only conduit methods to cache the responses of, "
+             "the default is '%(default)s'.")
+
+    parser.add_argument(
+        '--stats-path',
+        metavar="PATH",
+        help="periodically write the statistics that are served from "
+             "'/stats' to this file, as JSON.")
+
+    parser.add_argument(
+        '--stats-interval',
+        metavar="SECS",
+        type=float,
+        default=60,
+        help="the number of seconds between writes to '--stats-path', "
+             "the default is %(default)s.")
+
     args = parser.parse_args()
 
     _setup_logging()
@@ -97,11 +206,40 @@ def _setup_logging():
     logging.getLogger().addHandler(console)
 
 
+class _ThreadingHTTPServer(
+        SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    """Handle each request on a separate thread."""
+
+    daemon_threads = True
+
+    # many clients may connect at once, don't refuse them while busy
+    request_queue_size = 128
+
+
 def _httpd_serve_forever(args):
     """Use '_RequestHandler' to serve webpages forever, optionally with ssl."""
+    uri, user, cert, _ = phlsys_makeconduit.get_uri_user_cert_explanation(
+        args.uri, args.user, args.cert)
+    conduit = phlsys_conduit.MultiConduit(
+        uri, user, cert, max_sessions=args.max_sessions)
+
+    # authenticate the first session now, so that bad credentials are
+    # reported before serving anything
+    conduit.raw_call('conduit.ping')
+
+    cache = None
+    if args.cache_ttl > 0:
+        cache = phlsys_ttlcache.TtlCache(args.cache_ttl)
+
+    traffic_stats = _TrafficStats()
+    if args.stats_path:
+        _start_writing_stats(
+            args.stats_path, args.stats_interval, cache, traffic_stats)
+
     server_address = ('', args.port)
-    factory = _request_handler_factory(args)
-    httpd = BaseHTTPServer.HTTPServer(server_address, factory)
+    factory = _request_handler_factory(args, conduit, cache, traffic_stats)
+    httpd = _ThreadingHTTPServer(server_address, factory)
     if args.sslcert:
         certpath = os.path.abspath(args.sslcert)
         print(certpath)
@@ -112,23 +250,155 @@ def _httpd_serve_forever(args):
     httpd.serve_forever()
 
 
+class _TrafficStats(object):
+
+    """Thread-safe running totals of the requests of each client and method.
+
+    The client is identified by the user they supply, they all share the same
+    secret. Requests without the secret are counted together, so that anyone
+    who can reach the proxy can't make it keep stats for any number of
+    clients or methods. Only 'conduit.connect' keeps its own method name, as
+    clients are expected to try it.
+
+    """
+
+    _UNKNOWN_CLIENT = '(unknown)'
+    _UNAUTHENTICATED = '(unauthenticated)'
+
+    def __init__(self):
+        super(_TrafficStats, self).__init__()
+        self._metrics = phlsys_metrics.Registry()
+        self._start_time = time.time()
+
+    def record(
+            self,
+            client,
+            method,
+            is_authenticated,
+            seconds,
+            bytes_in,
+            bytes_out,
+            response):
+        """Record a request that has been answered.
+
+        :client: the string name of the client, or None if unknown
+        :method: the string name of the conduit method
+        :is_authenticated: True if the client supplied the secret
+        :seconds: the time taken to answer the request
+        :bytes_in: the size of the request body
+        :bytes_out: the size of the response body
+        :response: the dict response to the request, None if there was none
+        :returns: None
+
+        """
+        if not is_authenticated:
+            client = self._UNAUTHENTICATED
+            if method != 'conduit.connect':
+                method = self._UNAUTHENTICATED
+
+        # clients are expected to try to connect, it's not an error
+        is_error = response is None or response.get('error_code') not in (
+            None, phlsys_conduit.CONDUITPROXY_ERROR_CONNECT)
+
+        labels = {
+            'client': client or self._UNKNOWN_CLIENT,
+            'method': method,
+        }
+        self._metrics.increment('requests', labels)
+        self._metrics.increment('errors', labels, int(is_error))
+        self._metrics.increment('bytes_in', labels, bytes_in)
+        self._metrics.increment('bytes_out', labels, bytes_out)
+        self._metrics.observe('latency_secs', labels, seconds)
+
+    def to_report(self):
+        """Return a JSON-friendly dict of the totals so far.
+
+        The 'traffic' is a list with an entry for each client and method,
+        most requests first.
+
+        :returns: a dict
+
+        """
+        summary = self._metrics.to_summary()
+        key_to_traffic = {}
+
+        def get_traffic(labels):
+            key = (labels['client'], labels['method'])
+            traffic = key_to_traffic.get(key)
+            if traffic is None:
+                traffic = dict(labels)
+                key_to_traffic[key] = traffic
+            return traffic
+
+        for counter in summary['counters']:
+            get_traffic(counter['labels'])[counter['name']] = counter['value']
+        for histogram in summary['histograms']:
+            latency = dict(histogram)
+            del latency['name']
+            del latency['labels']
+            get_traffic(histogram['labels'])[histogram['name']] = latency
+
+        traffic_list = sorted(
+            key_to_traffic.itervalues(),
+            key=lambda t: (-t['requests'], t['client'], t['method']))
+        return {
+            'uptime_secs': time.time() - self._start_time,
+            'traffic': traffic_list,
+        }
+
+
+def _make_stats(cache, traffic_stats):
+    """Return a JSON-friendly dict of the stats served from '/stats'."""
+    stats = traffic_stats.to_report()
+    stats['cache'] = cache.stats._asdict() if cache is not None else None
+    return stats
+
+
+def _start_writing_stats(path, interval_secs, cache, traffic_stats):
+    """Start a thread to write the '/stats' to 'path' every 'interval_secs'.
+
+    The thread won't stop the process from exiting.
+
+    """
+
+    def write_stats_forever():
+        while True:
+            time.sleep(interval_secs)
+            try:
+                phlsys_fs.write_text_file_atomic(
+                    path,
+                    json.dumps(
+                        _make_stats(cache, traffic_stats),
+                        sort_keys=True,
+                        indent=1))
+            except Exception:
+                logger.exception("failed to write stats to {}".format(path))
+
+    thread = threading.Thread(target=write_stats_forever)
+    thread.daemon = True
+    thread.start()
+
+
 class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
 
     """Handle POST requests by calling out to conduit and reporting back.
 
-    Note that we don't have to worry about threading here as httpd is
-    single-threaded.
+    Handle GET requests for '/stats' by reporting the traffic stats.
+
+    Note that requests are handled concurrently on separate threads, the
+    'conduit', 'cache' and 'traffic_stats' are shared between them.
 
     """
 
-    def __init__(self, conduitproxy_args, *args):
+    def __init__(
+            self, conduitproxy_args, conduit, cache, traffic_stats, *args):
 
-        # setup the long-running conduit for the proxy
+        # use the long-running conduit, cache and stats of the proxy, 'cache'
+        # is None if caching is disabled
         self.__conduitproxy_args = conduitproxy_args
-        self.__conduit = phlsys_makeconduit.make_conduit(
-            self.__conduitproxy_args.uri,
-            self.__conduitproxy_args.user,
-            self.__conduitproxy_args.cert)
+        self.__conduit = conduit
+        self.__cache = cache
+        self.__traffic_stats = traffic_stats
 
         self.path = None  # for pychecker
         self.rfile = None  # for pychecker
@@ -141,9 +411,34 @@ class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
 
     def do_POST(self):
         """Handle http POST requests, override of base class function."""
-
-        # do this before sending any response as we may raise an exception
-        content = self.__get_content(self.__get_post_body())
+        start = time.time()
+        conduit_method = self.path[5:]
+        post_body = self.__get_post_body()
+        client = None
+        is_authenticated = False
+        response = None
+        content = ''
+
+        try:
+            # decode before calling conduit, so that the client is recorded
+            # even if the call raises
+            conduit_data, client, certificate, act_as_user = \
+                self.__decode_request(conduit_method, post_body)
+            is_authenticated = certificate == self.__conduitproxy_args.secret
+
+            # do this before sending any response as we may raise an exception
+            response = self.__get_response(
+                conduit_method, conduit_data, certificate, act_as_user)
+            content = json.dumps(response)
+        finally:
+            self.__traffic_stats.record(
+                client,
+                conduit_method,
+                is_authenticated,
+                time.time() - start,
+                len(post_body),
+                len(content),
+                response)
 
         # send the response back to the client
         self.send_response(200)
@@ -151,31 +446,45 @@ class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(content)
 
-    def __get_content(self, post_body):
-        """Decode the request and determine the appropriate content."""
-        conduit_method = self.path[5:]
+    def do_GET(self):
+        """Handle http GET requests, override of base class function."""
+        if self.path != '/stats':
+            self.send_error(404)
+            return
+
+        content = json.dumps(
+            _make_stats(self.__cache, self.__traffic_stats),
+            sort_keys=True,
+            indent=1)
+
+        self.send_response(200)
+        self.send_header("Content-type", "text/json")
+        self.end_headers()
+        self.wfile.write(content)
+
+    def __decode_request(self, conduit_method, post_body):
+        """Decode the request and the details of the client that made it.
+
+        :returns: a tuple of (conduit_data, username, certificate, act_as_user)
+
+        """
         conduit_data = _object_from_urlencoded_json(post_body)
         conduit_proxy_data = conduit_data.get('__conduit__', None)
 
         username = _get_key_or_none(conduit_proxy_data, "user")
+        if conduit_method == 'conduit.connect':
+            username = conduit_data.get('user', None)
         certificate = _get_key_or_none(conduit_proxy_data, "cert")
-
-        self.__handle_act_as_user(conduit_proxy_data)
+        act_as_user = _get_key_or_none(conduit_proxy_data, "actAsUser")
 
         # TODO: log revision id as well, if relevant
         logger.info("user {user} - {method}".format(
             user=username, method=conduit_method))
 
-        response = self.__get_response(
-            conduit_method,
-            conduit_data,
-            certificate)
+        return conduit_data, username, certificate, act_as_user
 
-        content = json.dumps(response)
-
-        return content
-
-    def __get_response(self, conduit_method, conduit_data, certificate):
+    def __get_response(
+            self, conduit_method, conduit_data, certificate, act_as_user):
         """Act on the decoded request and determine the appropriate response.
 
         Note that this may or may not result in a communication with
@@ -196,10 +505,39 @@ class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                     "error_info": "Incorrect user or cert",
                 }
             else:
-                response = self.__conduit.raw_call(
-                    conduit_method, conduit_data)
+                response = self.__call_conduit(
+                    conduit_method, conduit_data, act_as_user)
         return response
 
+    def __call_conduit(self, conduit_method, conduit_data, act_as_user):
+        """Return the response from conduit, or the cache if possible."""
+
+        def call():
+            if act_as_user:
+                return self.__conduit.raw_call_as_user(
+                    act_as_user, conduit_method, conduit_data)
+            else:
+                return self.__conduit.raw_call(conduit_method, conduit_data)
+
+        if self.__cache is None:
+            return call()
+
+        cache_methods = self.__conduitproxy_args.cache_methods
+        if conduit_method in cache_methods:
+            key = _make_cache_key(conduit_method, conduit_data, act_as_user)
+            return self.__cache.get_or_call(key, call)
+
+        is_stale = _make_is_stale_predicate(conduit_method, cache_methods)
+        if is_stale is None:
+            return call()
+
+        # invalidate even if the call fails, as it may have been partially
+        # applied
+        try:
+            return call()
+        finally:
+            self.__cache.invalidate(is_stale)
+
     def __get_post_body(self):
         """Return the content that was supplied to us by the client.
 
@@ -209,21 +547,6 @@ class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
         content_len = int(self.headers.getheader('content-length', 0))
         return self.rfile.read(content_len)
 
-    def __handle_act_as_user(self, conduit_proxy_data):
-        """Set our conduit to impersonate another user, if requested."""
-        act_as_user = None
-        if conduit_proxy_data:
-            # Note that we may throw here if conduit_proxy_data is not a dict,
-            # this is ok because the BaseHTTPRequestHandler will handle it for
-            # us.
-            # TODO: check assumption that it handles this for us
-            act_as_user = conduit_proxy_data.get('actAsUser', None)
-        if act_as_user:
-            self.__conduit.set_act_as_user(act_as_user)
-        else:
-            if self.__conduit.get_act_as_user():
-                self.__conduit.clear_act_as_user()
-
 
 def _object_from_urlencoded_json(encoded):
     """Return the python object represented by the supplied 'encoded'.
@@ -237,26 +560,92 @@ def _object_from_urlencoded_json(encoded):
     return conduit_data
 
 
+def _make_cache_key(conduit_method, conduit_data, act_as_user):
+    """Return a hashable key identifying the supplied request.
+
+    Requests which differ only in the order of their parameters or in their
+    authentication will have the same key.
+
+        >>> _make_cache_key(
+        ...     'user.query', {'b': 1, 'a': [2], '__conduit__': {}}, None)
+        ('user.query', '{"a":[2],"b":1}', None)
+
+    :conduit_method: the string name of the conduit method
+    :conduit_data: the dict of parameters for the method
+    :act_as_user: the string username to act as, or None
+    :returns: a tuple
+
+    """
+    params = dict(
+        (k, v) for k, v in conduit_data.iteritems() if k != '__conduit__')
+    canonical_params = json.dumps(
+        params, sort_keys=True, separators=(',', ':'))
+    return (conduit_method, canonical_params, act_as_user)
+
+
+def _make_is_stale_predicate(conduit_method, cache_methods):
+    """Return a predicate for the cache keys made stale by 'conduit_method'.
+
+    Return None if 'conduit_method' only reads from Phabricator. Otherwise
+    the method is assumed to write, which may change what the methods of the
+    same application return, and those of the '_CROSS_APPLICATIONS'.
+
+        >>> _make_is_stale_predicate('differential.querydiffs', []) is None
+        True
+        >>> _make_is_stale_predicate('custom.query', ['custom.query']) is None
+        True
+        >>> is_stale = _make_is_stale_predicate(
+        ...     'differential.createcomment', [])
+        >>> is_stale(('differential.query', '{}', None))
+        True
+        >>> is_stale(('phid.query', '{}', None))
+        True
+        >>> is_stale(('user.query', '{}', None))
+        False
+
+    :conduit_method: the string name of the conduit method
+    :cache_methods: the string names of the methods that are cached
+    :returns: a callable taking a cache key and returning a bool, or None
+
+    """
+    if conduit_method in _READ_ONLY_METHODS or conduit_method in cache_methods:
+        return None
+
+    stale_applications = _CROSS_APPLICATIONS | set(
+        [_get_application(conduit_method)])
+    return lambda key: _get_application(key[0]) in stale_applications
+
+
+def _get_application(conduit_method):
+    """Return the name of the application of the supplied 'conduit_method'.
+
+        >>> _get_application('differential.query')
+        'differential'
+
+    """
+    return conduit_method.split('.', 1)[0]
+
+
 def _get_key_or_none(d, key):
     return d.get(key, None) if d else None
 
 
-def _request_handler_factory(custom_param):
+def _request_handler_factory(*custom_params):
     """Return a function that creates a '__RequestHandler'.
 
     This allows us to provide a 'factory function' suitable for passing to
     BaseHTTPServer.HTTPServer(), whilst providing our own custom first
-    argument.
+    arguments.
 
     There doesn't appear to be another way for us to construct our
-    '__RequestHandler' with a custom argument.
+    '__RequestHandler' with custom arguments.
 
-    :returns: a '__RequestHandler' factory function with a pre-baked argument
+    :returns: a '__RequestHandler' factory function with pre-baked arguments
 
     """
 
     def factory(*args):
-        return _RequestHandler(custom_param, *args)
+        return _RequestHandler(*(custom_params + args))
 
     return factory
 
@@ -0,0 +1,123 @@
+"""Test suite for poxcmd_conduitproxy."""
+# =============================================================================
+#                                   TEST PLAN
+# -----------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] traffic is totalled for each client and method, most requests first
+# [ A] responses with errors and requests without responses count as errors
+# [ A] failing to 'conduit.connect' to the proxy isn't counted as an error
+# [ A] unauthenticated requests are all counted together
+# [ B] stats include the cache stats if there is a cache, None otherwise
+# -----------------------------------------------------------------------------
+# Tests:
+# [ A] Test.test_A_TrafficStats
+# [ B] Test.test_B_MakeStats
+# =============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+import phlsys_conduit
+import phlsys_ttlcache
+
+import poxcmd_conduitproxy
+
+
+_OK_RESPONSE = {'result': 1, 'error_code': None, 'error_info': None}
+_ERROR_RESPONSE = {
+    'result': None, 'error_code': 'ERR-CONDUIT-CALL', 'error_info': 'no'}
+_CONNECT_RESPONSE = {
+    'result': None,
+    'error_code': phlsys_conduit.CONDUITPROXY_ERROR_CONNECT,
+    'error_info': 'no need to connect to the proxy',
+}
+
+
+def _traffic_to_tuples(report):
+    return [
+        (t['client'], t['method'], t['requests'], t['errors'])
+        for t in report['traffic']
+    ]
+
+
+class Test(unittest.TestCase):
+
+    def test_A_TrafficStats(self):
+        stats = poxcmd_conduitproxy._TrafficStats()
+        record = stats.record
+
+        record('bob', 'user.query', True, 0.1, 10, 20, _OK_RESPONSE)
+        record('alice', 'user.query', True, 0.1, 10, 20, _ERROR_RESPONSE)
+        record('alice', 'user.query', True, 0.1, 10, 20, None)
+        record('bob', 'differential.query', True, 0.1, 10, 20, _OK_RESPONSE)
+        record('alice', 'conduit.connect', False, 0.1, 10, 20,
+               _CONNECT_RESPONSE)
+        record('mallory', 'no.such', False, 0.1, 10, 20, _ERROR_RESPONSE)
+        record(None, 'other.method', False, 0.1, 10, 0, None)
+
+        report = stats.to_report()
+        self.assertGreaterEqual(report['uptime_secs'], 0)
+
+        # [ A] traffic is totalled for each client and method, most requests
+        #      first
+        # [ A] responses with errors and requests without responses count as
+        #      errors
+        # [ A] failing to 'conduit.connect' to the proxy isn't counted as an
+        #      error
+        # [ A] unauthenticated requests are all counted together
+        self.assertEqual(
+            [
+                ('(unauthenticated)', '(unauthenticated)', 2, 2),
+                ('alice', 'user.query', 2, 2),
+                ('(unauthenticated)', 'conduit.connect', 1, 0),
+                ('bob', 'differential.query', 1, 0),
+                ('bob', 'user.query', 1, 0),
+            ],
+            _traffic_to_tuples(report))
+
+        alice_traffic = report['traffic'][1]
+        self.assertEqual(20, alice_traffic['bytes_in'])
+        self.assertEqual(40, alice_traffic['bytes_out'])
+        self.assertEqual(2, alice_traffic['latency_secs']['count'])
+
+    def test_B_MakeStats(self):
+        traffic_stats = poxcmd_conduitproxy._TrafficStats()
+        traffic_stats.record('bob', 'user.query', True, 0.1, 1, 2, None)
+
+        # [ B] stats include the cache stats if there is a cache, None
+        #      otherwise
+        stats = poxcmd_conduitproxy._make_stats(None, traffic_stats)
+        self.assertIsNone(stats['cache'])
+        self.assertEqual(1, len(stats['traffic']))
+
+        cache = phlsys_ttlcache.TtlCache(60)
+        cache.get_or_call('key', lambda: 'value')
+        cache.get_or_call('key', lambda: 'value')
+        stats = poxcmd_conduitproxy._make_stats(cache, traffic_stats)
+        self.assertEqual(1, stats['cache']['hits'])
+        self.assertEqual(1, stats['cache']['misses'])
+        self.assertEqual(1, stats['cache']['entries'])
+        self.assertEqual(1, len(stats['traffic']))
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
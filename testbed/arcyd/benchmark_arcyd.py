@@ -0,0 +1,305 @@
+"""Measure the throughput of arcyd offline, without a Phabricator instance.
+
+This makes N local repositories, each with M review branches, and has arcyd
+process them for K cycles with 'abdi_processrepoarglist.do'. Phabricator is
+replaced by an in-process 'abdt_conduitmock.ConduitMock', so the results are
+repeatable and may be compared between commits.
+
+The first cycle creates the reviews and their tracker branches, the later
+cycles find them all still in review and have nothing to push.
+
+The results are written as JSON:
+
+    cycle_time_secs: the time of each cycle, as reported by arcyd
+    git_processes: the number of git processes started in each cycle
+    git_subcommands: the count and time of each git subcommand, in total
+    conduit_calls: the number of calls to each Conduit method, in total
+    peak_rss_mb: the peak resident set size of arcyd
+    peak_child_rss_mb: the peak resident set size of its child processes
+
+Note that the mock Conduit only lives in this process, so arcyd is run with a
+single worker.
+
+Usage:
+
+    python benchmark_arcyd.py [--repos N] [--branches M] [--cycles K]
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import collections
+import distutils.spawn
+import json
+import logging
+import os
+import resource
+import shutil
+import stat
+import sys
+import tempfile
+
+# append our module dirs to sys.path, which is the list of paths to search
+# for modules this is so we can import our libraries directly
+# N.B. this magic is only really passable up-front in the entrypoint module
+PARENT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+BASE_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(os.path.join(BASE_DIR, "py", "abd"))
+sys.path.append(os.path.join(BASE_DIR, "py", "phl"))
+
+import phldef_conduit  # noqa: E402
+import phlgitu_fixture  # noqa: E402
+import phlmail_mocksender  # noqa: E402
+
+import abdt_conduitmock  # noqa: E402
+import abdt_fs  # noqa: E402
+
+import abdi_processrepoarglist  # noqa: E402
+import abdi_repo  # noqa: E402
+import abdi_repoargs  # noqa: E402
+
+# count each git process with a line in a file, then run the real git
+_GIT_WRAPPER = """#!/bin/sh
+echo >> '{count_path}'
+exec '{git_path}' "$@"
+"""
+
+# arcyd runs this at the end of each cycle, record the cycle report along
+# with the count of git processes so far, stop arcyd after the last cycle
+_REPORT_COMMAND = """#!/bin/sh
+report=$(cat)
+echo "$(wc -l < '{count_path}') $report" >> '{report_path}'
+if [ "$(wc -l < '{report_path}')" -ge {cycles} ]; then
+    touch '{killfile_path}'
+fi
+"""
+
+
+class _CountingConduit(object):
+
+    def __init__(self, conduit):
+        self._conduit = conduit
+        self.counts = collections.Counter()
+
+    def __getattr__(self, name):
+        attr = getattr(self._conduit, name)
+        if not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            self.counts[name] += 1
+            return attr(*args, **kwargs)
+
+        return counted
+
+
+class _ReviewStateCache(object):
+
+    """Stand in for phlcon_reviewstatecache, the mock needs no refreshing."""
+
+    def __init__(self):
+        self.active_reviews = set()
+
+    def refresh_active_reviews(self):
+        pass
+
+    def merge_additional_active_reviews(self, active_reviews):
+        self.active_reviews |= set(active_reviews)
+
+    def get_known_states(self, review_ids):
+        return {}
+
+
+class _ConduitManager(object):
+
+    """Stand in for abdi_processrepoarglist._ConduitManager."""
+
+    def __init__(self, conduit):
+        self._conduit = conduit
+        self._cache = _ReviewStateCache()
+
+    def get_conduit_and_cache_for_args(self, args):
+        return self._conduit, self._cache
+
+    def refresh_conduits(self):
+        pass
+
+
+def _write_script(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+
+
+def _make_repo_config(name, repo_url):
+    parser = argparse.ArgumentParser()
+    abdi_repoargs.setup_parser(parser)
+    return parser.parse_args([
+        '--instance-uri', 'http://conduitmock.test/api/',
+        '--arcyd-user', 'arcyd',
+        '--arcyd-cert', 'cert',
+        '--admin-emails', 'admin@server.test',
+        '--repo-desc', name,
+        '--repo-path', 'var/repo/' + name,
+        '--repo-url', repo_url,
+        '--try-touch-path', abdt_fs.Layout.repo_try(name),
+        '--ok-touch-path', abdt_fs.Layout.repo_ok(name),
+    ])
+
+
+def _make_repos(repo_count, branch_count):
+    """Return a list of (fixture, (name, config)) for new repositories."""
+    fixture_config_list = []
+    for i in xrange(repo_count):
+        name = 'repo{}'.format(i)
+        fixture = phlgitu_fixture.CentralisedWithWorkers(1)
+        worker = fixture.workers[0]
+        for j in xrange(branch_count):
+            worker.commit_new_file_on_new_branch(
+                'arcyd-review/change{}/master'.format(j),
+                'add file{}\n\ntest plan: none'.format(j),
+                'file{}'.format(j),
+                base='master')
+        worker.repo('push', '-q', 'origin', '--all')
+
+        repo_url = fixture.central_repo.working_dir
+        config = _make_repo_config(name, repo_url)
+        abdi_repo.setup_repo(repo_url, config.repo_path)
+        fixture_config_list.append((fixture, (name, config)))
+    return fixture_config_list
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repos', type=int, default=5)
+    parser.add_argument('--branches', type=int, default=10)
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument(
+        '--output',
+        metavar='PATH',
+        help="write the results here instead of to stdout.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    # the reviews must be authored by a user that the mock Conduit knows
+    for role in ('AUTHOR', 'COMMITTER'):
+        os.environ['GIT_{}_NAME'.format(role)] = phldef_conduit.ALICE.user
+        os.environ['GIT_{}_EMAIL'.format(role)] = phldef_conduit.ALICE.email
+
+    original_cwd = os.getcwd()
+    tmp_dir = tempfile.mkdtemp()
+    fixture_config_list = []
+    try:
+        bin_dir = os.path.join(tmp_dir, 'bin')
+        arcyd_dir = os.path.join(tmp_dir, 'arcyd')
+        count_path = os.path.join(tmp_dir, 'git_count')
+        report_path = os.path.join(tmp_dir, 'reports')
+        report_command = os.path.join(bin_dir, 'report')
+        os.makedirs(bin_dir)
+        os.makedirs(arcyd_dir)
+
+        os.chdir(arcyd_dir)
+        abdt_fs.initialise_here()
+        fixture_config_list = _make_repos(args.repos, args.branches)
+
+        _write_script(
+            os.path.join(bin_dir, 'git'),
+            _GIT_WRAPPER.format(
+                count_path=count_path,
+                git_path=distutils.spawn.find_executable('git')))
+        _write_script(
+            report_command,
+            _REPORT_COMMAND.format(
+                count_path=count_path,
+                report_path=report_path,
+                cycles=args.cycles,
+                killfile_path=os.path.abspath(abdt_fs.Layout.killfile)))
+        open(count_path, 'w').close()
+        os.environ['PATH'] = bin_dir + os.pathsep + os.environ['PATH']
+
+        conduit_data = abdt_conduitmock.ConduitMockData()
+        conduit = _CountingConduit(
+            abdt_conduitmock.ConduitMock(conduit_data, is_traced=False))
+        abdi_processrepoarglist.do(
+            [name_config for _, name_config in fixture_config_list],
+            sys_admin_emails=[],
+            sleep_secs=0,
+            is_no_loop=False,
+            external_report_command=report_command,
+            mail_sender=phlmail_mocksender.MailSender(),
+            max_workers=1,
+            overrun_secs=0,
+            diff_cache_max_mb=0,
+            conduit_manager=_ConduitManager(conduit))
+
+        cycle_time_list = []
+        git_process_list = []
+        git_subcommands = collections.defaultdict(collections.Counter)
+        last_git_count = 0
+        with open(report_path) as f:
+            for line in f:
+                git_count, report = line.split(' ', 1)
+                report = json.loads(report)
+                cycle_time_list.append(report['cycle_time_secs'])
+                for stats in report['process_stats']:
+                    if stats['command'].startswith('git '):
+                        subcommand = git_subcommands[stats['command']]
+                        for field in ('count', 'wall_secs', 'cpu_secs'):
+                            subcommand[field] += stats[field]
+                git_process_list.append(int(git_count) - last_git_count)
+                last_git_count = int(git_count)
+
+        # 'ru_maxrss' is in kilobytes on Linux
+        results = {
+            'repos': args.repos,
+            'branches': args.branches,
+            'cycles': args.cycles,
+            'reviews_created': len(conduit_data.revisions),
+            'cycle_time_secs': cycle_time_list,
+            'git_processes': git_process_list,
+            'git_subcommands': git_subcommands,
+            'conduit_calls': dict(conduit.counts),
+            'peak_rss_mb': resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'peak_child_rss_mb': resource.getrusage(
+                resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        }
+    finally:
+        os.chdir(original_cwd)
+        for fixture, _ in fixture_config_list:
+            fixture.close()
+        shutil.rmtree(tmp_dir)
+
+    output = json.dumps(results, sort_keys=True, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
@@ -31,6 +31,11 @@ $arcyon task-query --status spite
 $arcyon task-query --status duplicate
 
 $arcyon query --branch mybranch
+$arcyon query --all
+$arcyon query --all --page-size 1 --format-type json
+$arcyon query --all --statuses Accepted --update-max-age "1 weeks"
+
+printf '%s\n' '{"method": "conduit.ping"}' '{"id": 2, "method": "differential.query", "params": {"limit": 1}}' | $arcyon batch --jobs 2
 
 # -----------------------------------------------------------------------------
 # Copyright (C) 2014-2015 Bloomberg Finance L.P.
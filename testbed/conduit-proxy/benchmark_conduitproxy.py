@@ -0,0 +1,280 @@
+"""Measure the throughput of conduit-proxy with many concurrent clients.
+
+This starts a fake Conduit upstream which takes a fixed time to answer each
+call, starts conduit-proxy in front of it and has many clients call through
+the proxy at once. The upstream may also expire sessions after a number of
+calls, to exercise re-authentication.
+
+The results are printed as JSON, including the number of sessions that the
+proxy made with the upstream and the most calls it forwarded at once. If the
+proxy is caching then its '/stats' are included too.
+
+Usage:
+
+    python benchmark_conduitproxy.py [--clients N] [--requests N]
+        [--max-sessions N] [--upstream-delay SECS] [--session-lifetime N]
+        [--cache-ttl SECS]
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import BaseHTTPServer
+import SocketServer
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib2
+import urlparse
+
+# append our module dirs to sys.path, which is the list of paths to search
+# for modules this is so we can import our libraries directly
+# N.B. this magic is only really passable up-front in the entrypoint module
+PARENT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+BASE_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(os.path.join(BASE_DIR, "py", "phl"))
+
+import phlsys_conduit  # noqa: E402
+
+_CONDUIT_PROXY = os.path.join(BASE_DIR, 'proto', 'conduit-proxy')
+_SECRET = 'squirrel'
+
+
+class _FakeUpstreamHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    # keep connections alive between requests
+    protocol_version = 'HTTP/1.1'
+
+    # send each response in one piece, to avoid delayed acks from the client
+    wbufsize = -1
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.getheader('Content-Length'))
+        body = urlparse.parse_qs(self.rfile.read(length))
+        params = json.loads(body['params'][0])
+        method = self.path.rsplit('/', 1)[-1]
+
+        response = {'result': None, 'error_code': None, 'error_info': None}
+        if method == 'conduit.connect':
+            with server.lock:
+                server.connects += 1
+                session_key = 'session{}'.format(server.connects)
+                server.session_to_calls[session_key] = 0
+            response['result'] = {
+                'sessionKey': session_key,
+                'connectionID': server.connects,
+            }
+        else:
+            session_key = params['__conduit__'].get('sessionKey')
+            with server.lock:
+                calls = server.session_to_calls.get(session_key)
+                is_valid = calls is not None and (
+                    not server.session_lifetime or
+                    calls < server.session_lifetime)
+                if is_valid:
+                    server.session_to_calls[session_key] += 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(
+                        server.max_in_flight, server.in_flight)
+                else:
+                    server.session_errors += 1
+            if is_valid:
+                time.sleep(server.delay)
+                with server.lock:
+                    server.calls += 1
+                    server.in_flight -= 1
+                response['result'] = method
+            else:
+                response['error_code'] = phlsys_conduit.SESSION_ERROR
+                response['error_info'] = 'Session key is not present.'
+
+        data = json.dumps(response)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # don't print output to stderr
+
+
+class _FakeUpstreamServer(SocketServer.ThreadingTCPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, delay, session_lifetime):
+        SocketServer.ThreadingTCPServer.__init__(
+            self, ('localhost', 0), _FakeUpstreamHandler)
+        self.delay = delay
+        self.session_lifetime = session_lifetime
+        self.lock = threading.Lock()
+        self.session_to_calls = {}
+        self.connects = 0
+        self.calls = 0
+        self.session_errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+def _get_free_port():
+    sock = socket.socket()
+    sock.bind(('localhost', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def _wait_for_port(port, process):
+    while True:
+        if process.poll() is not None:
+            raise Exception("conduit-proxy stopped unexpectedly")
+        try:
+            socket.create_connection(('localhost', port)).close()
+            return
+        except socket.error:
+            time.sleep(0.1)
+
+
+def _percentile(sorted_values, percent):
+    index = int(round(percent / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=10)
+    parser.add_argument('--max-sessions', type=int, default=5)
+    parser.add_argument('--upstream-delay', type=float, default=0.05)
+    parser.add_argument(
+        '--session-lifetime',
+        type=int,
+        default=0,
+        help="expire upstream sessions after this many calls, 0 for never.")
+    parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=0,
+        help="have the proxy cache responses for this long, 0 for never.")
+    args = parser.parse_args()
+
+    upstream = _FakeUpstreamServer(args.upstream_delay, args.session_lifetime)
+    upstream_thread = threading.Thread(target=upstream.serve_forever)
+    upstream_thread.daemon = True
+    upstream_thread.start()
+    upstream_uri = 'http://localhost:{}/api/'.format(
+        upstream.server_address[1])
+
+    tmp_dir = tempfile.mkdtemp()
+    port = _get_free_port()
+    proxy = subprocess.Popen(
+        [
+            sys.executable, _CONDUIT_PROXY,
+            '--uri', upstream_uri,
+            '--user', 'proxyuser',
+            '--cert', 'proxycert',
+            '--secret', _SECRET,
+            '--port', str(port),
+            '--max-sessions', str(args.max_sessions),
+            '--cache-ttl', str(args.cache_ttl),
+        ],
+        cwd=tmp_dir,
+        stdout=open(os.devnull, 'w'),
+        stderr=subprocess.STDOUT)
+    try:
+        _wait_for_port(port, proxy)
+        proxy_uri = 'http://localhost:{}/api/'.format(port)
+
+        latency_list = []
+        error_list = []
+        lock = threading.Lock()
+
+        def client():
+            try:
+                conduit = phlsys_conduit.Conduit(proxy_uri, 'client', _SECRET)
+                for _ in xrange(args.requests):
+                    start = time.time()
+                    conduit('differential.query', {'ids': [1]})
+                    with lock:
+                        latency_list.append(time.time() - start)
+            except Exception as e:
+                with lock:
+                    error_list.append(repr(e))
+
+        thread_list = [
+            threading.Thread(target=client) for _ in xrange(args.clients)
+        ]
+        start = time.time()
+        for thread in thread_list:
+            thread.start()
+        for thread in thread_list:
+            thread.join()
+        elapsed = time.time() - start
+
+        proxy_stats = json.load(urllib2.urlopen(
+            'http://localhost:{}/stats'.format(port)))
+    finally:
+        proxy.terminate()
+        proxy.wait()
+        upstream.shutdown()
+        upstream.server_close()
+        shutil.rmtree(tmp_dir)
+
+    latency_list.sort()
+    results = {
+        'clients': args.clients,
+        'requests_per_client': args.requests,
+        'max_sessions': args.max_sessions,
+        'cache_ttl_secs': args.cache_ttl,
+        'upstream_delay_secs': args.upstream_delay,
+        'elapsed_secs': elapsed,
+        'requests_completed': len(latency_list),
+        'requests_per_sec': len(latency_list) / elapsed,
+        'latency_p50_secs': (
+            _percentile(latency_list, 50) if latency_list else None),
+        'latency_p99_secs': (
+            _percentile(latency_list, 99) if latency_list else None),
+        'client_errors': error_list[:10],
+        'upstream_connects': upstream.connects,
+        'upstream_calls': upstream.calls,
+        'upstream_session_errors': upstream.session_errors,
+        'upstream_max_concurrent_calls': upstream.max_in_flight,
+        'proxy_stats': proxy_stats,
+    }
+    print(json.dumps(results, sort_keys=True, indent=2))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------
@@ -0,0 +1,162 @@
+"""Compare the cost of reducing a large diff, with and without asking git.
+
+'abdt_differ.make_raw_diff' asks git for the diff once with the maximum
+amount of context and derives the smaller amounts from that. Previously it
+would ask git again for each amount of context, decoding and re-encoding the
+whole diff each time to measure it.
+
+This makes a repository with a multi-megabyte diff and times both approaches
+for limits that require each level of reduction. The results are the same,
+but the number of git processes and the time taken are not.
+
+Usage:
+
+    python benchmark_differ.py [--files N] [--lines N] [--repeats N]
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+# append our module dirs to sys.path, which is the list of paths to search
+# for modules this is so we can import our libraries directly
+# N.B. this magic is only really passable up-front in the entrypoint module
+PARENT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+BASE_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(os.path.join(BASE_DIR, "py", "abd"))
+sys.path.append(os.path.join(BASE_DIR, "py", "phl"))
+
+import abdt_differ  # noqa: E402
+import phlgit_diff  # noqa: E402
+import phlgitu_fixture  # noqa: E402
+
+_CONTEXT_LINES_LIST = [100000, 1000, 100, None]
+
+
+class _CountingRepo(object):
+
+    def __init__(self, repo):
+        self._repo = repo
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+        return self._repo(*args, **kwargs)
+
+
+def _multi_pass_diff(repo, base, branch, max_diff_size_utf8_bytes):
+    """Return the unicode diff, asking git again for each amount of context.
+
+    This is how 'abdt_differ.make_raw_diff' used to reduce diffs, without
+    the final reduction to a diffstat.
+
+    """
+    for context_lines in _CONTEXT_LINES_LIST:
+        raw_diff = phlgit_diff.raw_diff_range(
+            repo, base, branch, context_lines)
+        new_raw_diff = unicode(raw_diff, errors='replace')
+        if len(new_raw_diff.encode('utf-8')) <= max_diff_size_utf8_bytes:
+            break
+    return new_raw_diff
+
+
+def _make_repo(worker, file_count, line_count):
+    for i in xrange(file_count):
+        name = 'file{}'.format(i)
+        content = ''.join(
+            'def function{}():\n'.format(j) if j % 50 == 0 else
+            '    statement_{}_{} = {}\n'.format(i, j, j)
+            for j in xrange(line_count))
+        worker.commit_new_file('add ' + name, name, content)
+
+    worker.repo('checkout', '-b', 'diff_branch')
+    for i in xrange(file_count):
+        name = 'file{}'.format(i)
+        path = os.path.join(worker.repo.working_dir, name)
+        with open(path) as f:
+            lines = f.readlines()
+        for j in xrange(0, line_count, 997):
+            lines[j] = '    changed_{}_{} = None\n'.format(i, j)
+        with open(path, 'w') as f:
+            f.writelines(lines)
+    worker.repo('commit', '-a', '-m', 'change all the files')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=10)
+    parser.add_argument('--lines', type=int, default=20000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    with phlgitu_fixture.lone_worker_context() as worker:
+        _make_repo(worker, args.files, args.lines)
+        base = 'master'
+        branch = 'diff_branch'
+
+        sizes = []
+        for context_lines in _CONTEXT_LINES_LIST:
+            raw_diff = phlgit_diff.raw_diff_range(
+                worker.repo, base, branch, context_lines)
+            sizes.append(len(raw_diff))
+
+        print('diff sizes for context {}:'.format(_CONTEXT_LINES_LIST))
+        print('  ' + ', '.join('{:.2f} MB'.format(s / 1e6) for s in sizes))
+        print()
+        print('{:>12} {:>14} {:>14} {:>10} {:>10}'.format(
+            'limit', 'multi-pass', 'single-pass', 'git (mp)', 'git (sp)'))
+
+        for limit in sizes:
+            multi_repo = _CountingRepo(worker.repo)
+            single_repo = _CountingRepo(worker.repo)
+
+            multi_diff = _multi_pass_diff(multi_repo, base, branch, limit)
+            single_diff = abdt_differ.make_raw_diff(
+                single_repo, base, branch, limit).diff
+            assert multi_diff == single_diff
+
+            multi_time = min(timeit.repeat(
+                lambda: _multi_pass_diff(worker.repo, base, branch, limit),
+                number=1,
+                repeat=args.repeats))
+            single_time = min(timeit.repeat(
+                lambda: abdt_differ.make_raw_diff(
+                    worker.repo, base, branch, limit),
+                number=1,
+                repeat=args.repeats))
+
+            print('{:>12} {:>13.3f}s {:>13.3f}s {:>10} {:>10}'.format(
+                limit,
+                multi_time,
+                single_time,
+                multi_repo.count,
+                single_repo.count))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+
+# -----------------------------------------------------------------------------
+# Copyright (C) 2017 Bloomberg Finance L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------ END-OF-FILE ----------------------------------